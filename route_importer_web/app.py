@@ -5,14 +5,22 @@
 主应用文件
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session, stream_with_context
 from flask_cors import CORS
 import json
 import os
 from datetime import datetime
 from note_parser import XiaohongshuNoteParser
 from route_planner import RoutePlanner
+from route_simplifier import build_lod_tiers, select_tier
+from gmaps_links import MAX_WAYPOINTS, RouteLinkCache
+from route_ids import new_route_id
+from route_fingerprint import canonical_note_id
+from job_queue import JobQueue, SUCCEEDED, FAILED
+from route_exporter import EXPORT_FORMATS, EXPORTERS
 from database import Database
+from session_store import SessionStore
+from server_session import ServerSideSessionInterface
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
@@ -22,6 +30,30 @@ CORS(app)
 note_parser = XiaohongshuNoteParser()
 route_planner = RoutePlanner()
 db = Database()
+# 解析结果和规划路线保存在服务端，Cookie只保存会话ID（多天行程超过Cookie 4KB的限制）
+app.session_interface = ServerSideSessionInterface(
+    SessionStore(db.db_path, ttl=int(os.environ.get('SESSION_TTL', 86400)))
+)
+route_links = RouteLinkCache()
+# 笔记解析在后台任务队列中执行，任务与路线共用同一个数据库文件
+jobs = JobQueue(db.db_path, workers=int(os.environ.get('PARSE_WORKERS', 2)))
+# 进度事件流的每个连接都占用一个web worker：连接最长保持 JOB_EVENTS_MAX_SECONDS 秒后由浏览器重连；
+# 使用同步worker部署时设置 JOB_EVENTS_STREAM=0，前端改为轮询任务状态
+JOB_EVENTS_STREAM = os.environ.get('JOB_EVENTS_STREAM', '1') != '0'
+JOB_EVENTS_MAX_SECONDS = float(os.environ.get('JOB_EVENTS_MAX_SECONDS', 30))
+
+def _parse_note_job(payload, progress):
+    """后台任务：抓取并解析笔记"""
+    note_data = note_parser.parse_note(payload['url'], progress=progress)
+    if not note_data:
+        raise ValueError('无法解析该笔记')
+    for place in note_data['places']:
+        progress('place', {'place': place})
+    return note_data
+
+jobs.register('parse_note', _parse_note_job)
+# 服务重启后继续执行未完成的任务
+jobs.start()
 
 @app.route('/')
 def index():
@@ -55,24 +87,79 @@ def parse_note():
         if not url:
             return jsonify({'error': '请提供有效的链接'}), 400
         
-        # 解析笔记
-        note_data = note_parser.parse_note(url)
-        
-        if not note_data:
-            return jsonify({'error': '无法解析该笔记'}), 400
+        # 已导入过的笔记不再抓取和解析（force=true 时强制重新解析）
+        existing_id = db.find_route_by_note(url)
+        if existing_id and not data.get('force'):
+            return jsonify({'error': '该笔记已导入', 'duplicate': True, 'route_id': existing_id}), 409
         
-        # 保存到session
-        session['parsed_note'] = note_data
+        # 抓取和解析可能耗时数分钟，提交后台任务后立即返回，客户端轮询任务状态
+        # 同一笔记正在解析时合并到已有任务，共享一次抓取和AI解析
+        job_id = jobs.submit('parse_note', {'url': url}, key=canonical_note_id(url))
+        status_url = f'/api/jobs/{job_id}'
         
         return jsonify({
             'success': True,
-            'data': note_data
-        })
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': status_url
+        }), 202, {'Location': status_url}
         
     except Exception as e:
         app.logger.error(f"解析笔记失败: {str(e)}")
         return jsonify({'error': f'解析失败: {str(e)}'}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询后台任务状态；解析完成时保存结果到session"""
+    try:
+        job = jobs.get(job_id)
+        if not job:
+            return jsonify({'error': '任务不存在'}), 404
+        
+        response = {
+            'success': job['status'] != FAILED,
+            'job_id': job_id,
+            'status': job['status'],
+            'created_at': job['created_at'],
+            'started_at': job['started_at'],
+            'finished_at': job['finished_at']
+        }
+        if 'position' in job:
+            response['position'] = job['position']
+        if job['status'] == SUCCEEDED:
+            session['parsed_note'] = job['result']
+            response['data'] = job['result']
+        elif job['status'] == FAILED:
+            response['error'] = f"解析失败: {job['error']}"
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        app.logger.error(f"查询任务失败: {str(e)}")
+        return jsonify({'error': f'查询失败: {str(e)}'}), 500
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """以Server-Sent Events推送任务各阶段的进度，任务结束后关闭"""
+    try:
+        if not jobs.get(job_id):
+            return jsonify({'error': '任务不存在'}), 404
+        if not JOB_EVENTS_STREAM:
+            # 不提供事件流：EventSource收到204后不再重连，前端改为轮询 /api/jobs/<job_id>
+            return '', 204
+        
+        # 浏览器断线重连时通过Last-Event-ID从断点继续
+        after = request.headers.get('Last-Event-ID', type=int) or request.args.get('after', 0, type=int)
+        return Response(
+            stream_with_context(jobs.stream_events(job_id, after=after, max_duration=JOB_EVENTS_MAX_SECONDS)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        app.logger.error(f"获取任务进度失败: {str(e)}")
+        return jsonify({'error': f'获取进度失败: {str(e)}'}), 500
+
 @app.route('/api/plan-route', methods=['POST'])
 def plan_route():
     """规划路线"""
@@ -116,20 +203,21 @@ def save_route():
         
         # 构建完整的路线信息
         route_info = {
-            'id': f"route_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            'id': new_route_id(),
             'name': data.get('name', parsed_note.get('title', '未命名路线')),
             'description': data.get('description', parsed_note.get('content', '')),
             'source': '小红书',
-            'source_url': data.get('source_url', ''),
+            'source_url': data.get('source_url') or parsed_note.get('source_url', ''),
             'places': parsed_note.get('places', []),
             'route': planned_route.get('route', []),
+            'route_lod': build_lod_tiers(planned_route.get('route', []), parsed_note.get('places', [])),
             'distance': planned_route.get('distance', 0),
             'duration': planned_route.get('duration', 0),
             'created_at': datetime.now().isoformat(),
             'tags': parsed_note.get('tags', [])
         }
         
-        # 保存到数据库
+        # 保存到数据库（同一笔记、相同地点顺序的路线已存在时返回已有路线ID）
         db.save_route(route_info)
         
         # 清除session
@@ -148,17 +236,96 @@ def save_route():
 
 @app.route('/api/routes', methods=['GET'])
 def get_routes():
-    """获取所有保存的路线"""
+    """分页获取保存的路线摘要，使用返回的 next_cursor 获取下一页"""
     try:
-        routes = db.get_all_routes()
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        page = db.list_routes(limit=limit, cursor=request.args.get('cursor'))
         return jsonify({
             'success': True,
-            'data': routes
+            'data': page['routes'],
+            'next_cursor': page['next_cursor']
         })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         app.logger.error(f"获取路线列表失败: {str(e)}")
         return jsonify({'error': f'获取失败: {str(e)}'}), 500
 
+@app.route('/api/routes/nearby', methods=['GET'])
+def get_nearby_routes():
+    """查找附近的路线（按最近地点的距离排序）"""
+    try:
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return jsonify({'error': '请提供有效的lat和lng'}), 400
+        radius = min(max(request.args.get('radius', 1000, type=float), 1), 50000)
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        
+        results = db.find_nearby_routes(lat, lng, radius=radius, limit=limit)
+        return jsonify({
+            'success': True,
+            'data': results,
+            'radius': radius
+        })
+    except Exception as e:
+        app.logger.error(f"查找附近路线失败: {str(e)}")
+        return jsonify({'error': f'查找失败: {str(e)}'}), 500
+
+def _with_route_ids(routes):
+    """为缺少ID的导入路线生成ID"""
+    for route in routes:
+        if isinstance(route, dict) and not route.get('id'):
+            route['id'] = new_route_id()
+        yield route
+
+def _read_ndjson(stream):
+    """逐行读取NDJSON请求体，无法解析的行原样返回（由校验报告错误）"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line.decode('utf-8', 'replace')
+
+@app.route('/api/routes/bulk', methods=['POST'])
+def bulk_save_routes():
+    """
+    批量导入路线
+    
+    请求体为JSON数组；或使用 application/x-ndjson 每行一条路线，
+    此时流式读取请求并逐行返回每条路线的结果，最后一行为汇总。
+    """
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            def generate():
+                saved = failed = duplicates = 0
+                for result in db.iter_save_routes(_with_route_ids(_read_ndjson(request.stream))):
+                    if result['success']:
+                        saved += 1
+                    else:
+                        failed += 1
+                    if result['duplicate']:
+                        duplicates += 1
+                    yield json.dumps(result, ensure_ascii=False) + '\n'
+                yield json.dumps({'summary': True, 'saved': saved, 'failed': failed, 'duplicates': duplicates}) + '\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        routes = request.get_json(silent=True)
+        if not isinstance(routes, list):
+            return jsonify({'error': '请求体必须是路线数组'}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': db.save_routes(_with_route_ids(routes))
+        })
+    except Exception as e:
+        app.logger.error(f"批量导入路线失败: {str(e)}")
+        return jsonify({'error': f'导入失败: {str(e)}'}), 500
+
 @app.route('/api/route/<route_id>', methods=['GET'])
 def get_route(route_id):
     """获取特定路线详情"""
@@ -167,6 +334,10 @@ def get_route(route_id):
         if not route:
             return jsonify({'error': '路线不存在'}), 404
         
+        # 按地图缩放级别返回对应的简化几何，未指定zoom时返回完整路线
+        zoom = request.args.get('zoom', type=int)
+        route['route'] = select_tier(route.get('route'), route.pop('route_lod', None), zoom)
+        
         return jsonify({
             'success': True,
             'data': route
@@ -175,6 +346,114 @@ def get_route(route_id):
         app.logger.error(f"获取路线详情失败: {str(e)}")
         return jsonify({'error': f'获取失败: {str(e)}'}), 500
 
+@app.route('/api/route/<route_id>/links', methods=['GET'])
+def get_route_links(route_id):
+    """获取路线的Google Maps步行导航链接，途经点过多时拆分为多段"""
+    try:
+        route = db.get_route(route_id)
+        if not route:
+            return jsonify({'error': '路线不存在'}), 404
+        
+        round_trip = request.args.get('round_trip', 'false').lower() in ('1', 'true')
+        max_waypoints = request.args.get('max_waypoints', MAX_WAYPOINTS, type=int)
+        if max_waypoints < 1:
+            return jsonify({'error': 'max_waypoints必须大于0'}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': route_links.get_links(route, round_trip, max_waypoints)
+        })
+    except Exception as e:
+        app.logger.error(f"生成导航链接失败: {str(e)}")
+        return jsonify({'error': f'生成失败: {str(e)}'}), 500
+
+@app.route('/api/search', methods=['GET'])
+def search_routes():
+    """全文搜索路线，按相关度排序并返回高亮摘要"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': '请提供搜索关键词'}), 400
+        
+        results = db.search(
+            query,
+            limit=min(request.args.get('limit', 20, type=int), 100),
+            offset=request.args.get('offset', 0, type=int)
+        )
+        return jsonify({
+            'success': True,
+            'data': results
+        })
+    except Exception as e:
+        app.logger.error(f"搜索路线失败: {str(e)}")
+        return jsonify({'error': f'搜索失败: {str(e)}'}), 500
+
+@app.route('/api/statistics', methods=['GET'])
+def get_statistics():
+    """获取路线库统计信息，包含按标签和城市的排行"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': db.get_statistics(top=request.args.get('top', 10, type=int))
+        })
+    except Exception as e:
+        app.logger.error(f"获取统计信息失败: {str(e)}")
+        return jsonify({'error': f'获取失败: {str(e)}'}), 500
+
+@app.route('/api/places/popular', methods=['GET'])
+def get_popular_places():
+    """获取被路线收录最多的地点，可按类别过滤"""
+    try:
+        places = db.get_popular_places(
+            limit=request.args.get('limit', 20, type=int),
+            category=request.args.get('category')
+        )
+        return jsonify({
+            'success': True,
+            'data': places
+        })
+    except Exception as e:
+        app.logger.error(f"获取热门地点失败: {str(e)}")
+        return jsonify({'error': f'获取失败: {str(e)}'}), 500
+
+@app.route('/api/places/<place_name>/routes', methods=['GET'])
+def get_place_routes(place_name):
+    """获取经过某个地点的路线"""
+    try:
+        routes = db.find_routes_by_place(place_name)
+        return jsonify({
+            'success': True,
+            'data': routes
+        })
+    except Exception as e:
+        app.logger.error(f"按地点查找路线失败: {str(e)}")
+        return jsonify({'error': f'查找失败: {str(e)}'}), 500
+
+@app.route('/api/export', methods=['GET'])
+def export_routes():
+    """导出路线为GPX / KML / GeoJSON（流式输出）；指定id或ids时导出部分路线，否则导出全部"""
+    try:
+        export_format = request.args.get('format', 'gpx').lower()
+        if export_format not in EXPORTERS:
+            return jsonify({'error': f'不支持的导出格式: {export_format}'}), 400
+        
+        route_id = request.args.get('id')
+        route_ids = [route_id] if route_id else [i for i in request.args.get('ids', '').split(',') if i]
+        if route_id and not db.get_route(route_id):
+            return jsonify({'error': '路线不存在'}), 404
+        
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        filename = f"{route_id or 'routes'}.{extension}"
+        chunks = EXPORTERS[export_format](lambda: db.iter_routes(route_ids or None))
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    except Exception as e:
+        app.logger.error(f"导出路线失败: {str(e)}")
+        return jsonify({'error': f'导出失败: {str(e)}'}), 500
+
 @app.route('/api/route/<route_id>', methods=['DELETE'])
 def delete_route(route_id):
     """删除路线"""
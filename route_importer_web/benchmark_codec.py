@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储编码性能测试
+对比JSON文本与压缩编码的数据库大小、单条读取和全表读取耗时
+
+用法: python benchmark_codec.py [路线数量，默认20000]
+"""
+
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+from payload_codec import available_codecs
+from polyline import encode
+
+CITIES = ['东京', '京都', '大阪', '上海', '成都', '杭州']
+CATEGORIES = ['景点', '美食', '咖啡', '购物', '寺庙', '公园']
+WORDS = ['安静', '热闹', '老字号', '排队', '拍照', '夜景', '小众', '推荐', '步行', '营业到很晚']
+
+
+def _route(rng: random.Random, i: int) -> dict:
+    """生成接近真实数据的路线（8个地点 + 编码折线）"""
+    city = rng.choice(CITIES)
+    lat, lng = 35.6 + rng.random() * 0.2, 139.6 + rng.random() * 0.2
+    places = []
+    for j in range(8):
+        places.append({
+            'name': f"{city}{rng.choice(WORDS)}{rng.choice(CATEGORIES)}{rng.randint(1, 500)}",
+            'address': f"{city}市{rng.choice(['中央', '东', '西', '北'])}区{rng.randint(1, 9)}丁目{rng.randint(1, 30)}番",
+            'category': rng.choice(CATEGORIES),
+            'city': city,
+            'coordinates': {'lat': round(lat + j * 0.002, 6), 'lng': round(lng + j * 0.002, 6)},
+            'description': '，'.join(rng.sample(WORDS, 4)),
+            'order': j + 1
+        })
+    points = [(lat + k * 0.0001, lng + rng.random() * 0.0005) for k in range(300)]
+    return {
+        'id': f'route_{i}',
+        'name': f'{city}散步路线{i}',
+        'description': '，'.join(rng.sample(WORDS, 5)),
+        'places': places,
+        'route': {'polyline': encode(points)},
+        'route_lod': {'10': encode(points[::30]), '13': encode(points[::10])},
+        'distance': round(rng.random() * 10, 2),
+        'duration': rng.randint(30, 300),
+        'tags': [city, rng.choice(WORDS)]
+    }
+
+
+def _timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def _measure(db_path: str, count: int) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = Database(db_path)
+        conn = db.connections.get()
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('VACUUM')
+    payload_bytes = conn.execute('SELECT SUM(LENGTH(CAST(places AS BLOB)) + LENGTH(CAST(route AS BLOB)) + LENGTH(CAST(route_lod AS BLOB))) FROM routes').fetchone()[0]
+    ids = [f'route_{random.randrange(count)}' for _ in range(2000)]
+    get_ms = _timed(lambda: [db.get_route(route_id) for route_id in ids]) / len(ids)
+    scan_ms = _timed(lambda: sum(1 for _ in db.iter_routes()), repeat=1)
+    db.connections.close_all()
+    return {'size': os.path.getsize(db_path), 'payload': payload_bytes, 'get_ms': get_ms, 'scan_ms': scan_ms}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = os.path.join(tmp, 'source.db')
+        print(f"📦 生成 {count} 条路线...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(base_path)
+            db.save_routes(_route(rng, i) for i in range(count))
+            db.connections.close_all()
+
+        print(f"{'编码':<14}{'数据库大小':>12}{'字段总大小':>12}{'单条读取':>12}{'全表读取':>12}")
+        for codec in available_codecs():
+            path = os.path.join(tmp, f"{codec.replace('+', '_')}.db")
+            shutil.copy(base_path, path)
+            if codec != 'json':
+                with contextlib.redirect_stdout(io.StringIO()):
+                    db = Database(path)
+                    db.migrate_codec(codec)
+                    db.connections.close_all()
+            result = _measure(path, count)
+            print(f"{codec:<14}{result['size'] / 1048576:>10.1f}MB{result['payload'] / 1048576:>10.1f}MB"
+                  f"{result['get_ms']:>10.3f}ms{result['scan_ms']:>10.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
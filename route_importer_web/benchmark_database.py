@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接性能测试
+模拟多个gunicorn工作进程并发读写，对比“每次操作新建连接 + 回滚日志”与连接管理器（长连接 + WAL）
+
+用法: python benchmark_database.py [工作进程数] [每进程操作数] [写操作比例]
+"""
+
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+
+SEED_ROUTES = 500
+
+
+def _route(i: int) -> dict:
+    """生成测试路线"""
+    return {
+        'id': f'route_{i}',
+        'name': f'测试路线{i}',
+        'description': '谷中银座散步路线',
+        'places': [{'name': f'地点{j}', 'coordinates': {'lat': 35.72 + j * 0.001, 'lng': 139.77}} for j in range(8)],
+        'route': [],
+        'distance': 3.2,
+        'duration': 40,
+        'tags': ['东京', '散步'],
+        'created_at': datetime.now().isoformat()
+    }
+
+
+def _is_write(k: int, write_ratio: float) -> bool:
+    """按比例均匀穿插写操作"""
+    if write_ratio <= 0:
+        return False
+    return k % max(1, round(1 / write_ratio)) == 0
+
+
+def _legacy_worker(db_path, worker, operations, write_ratio, queue):
+    """原实现：每次操作新建连接，默认回滚日志模式"""
+    latencies = []
+    for k in range(operations):
+        started = time.perf_counter()
+        if _is_write(k, write_ratio):
+            route = _route(SEED_ROUTES + worker * operations + k)
+            with sqlite3.connect(db_path) as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO routes (id, name, description, places, route, distance, duration, tags, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (route['id'], route['name'], route['description'], json.dumps(route['places'], ensure_ascii=False),
+                     '[]', route['distance'], route['duration'], json.dumps(route['tags'], ensure_ascii=False),
+                     route['created_at'], datetime.now().isoformat())
+                )
+                conn.commit()
+        else:
+            with sqlite3.connect(db_path) as conn:
+                row = conn.execute('SELECT * FROM routes WHERE id = ?', (f'route_{k % SEED_ROUTES}',)).fetchone()
+                json.loads(row[5])
+        latencies.append(time.perf_counter() - started)
+    queue.put(latencies)
+
+
+def _managed_worker(db_path, worker, operations, write_ratio, queue):
+    """连接管理器：每个进程一个长连接，WAL模式"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = Database(db_path)
+        latencies = []
+        for k in range(operations):
+            started = time.perf_counter()
+            if _is_write(k, write_ratio):
+                db.save_route(_route(SEED_ROUTES + worker * operations + k))
+            else:
+                db.get_route(f'route_{k % SEED_ROUTES}')
+            latencies.append(time.perf_counter() - started)
+    queue.put(latencies)
+
+
+def run(target, db_path, workers, operations, write_ratio):
+    """启动多个进程并汇总吞吐量与延迟"""
+    queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=target, args=(db_path, w, operations, write_ratio, queue))
+        for w in range(workers)
+    ]
+    started = time.perf_counter()
+    for p in processes:
+        p.start()
+    latencies = []
+    for _ in processes:
+        latencies.extend(queue.get())
+    for p in processes:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'ops_per_second': len(latencies) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000
+    }
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    write_ratio = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+
+    print(f"🚀 {workers} 个工作进程，每进程 {operations} 次操作，写操作比例 {write_ratio:.0%}")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        managed_path = os.path.join(tmp, 'managed.db')
+
+        # 原实现使用回滚日志模式的数据库
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute('''CREATE TABLE routes (id TEXT PRIMARY KEY, name TEXT NOT NULL, description TEXT,
+                source TEXT, source_url TEXT, places TEXT, route TEXT, distance REAL, duration INTEGER,
+                tags TEXT, created_at TEXT, updated_at TEXT)''')
+        with contextlib.redirect_stdout(io.StringIO()):
+            managed = Database(managed_path)
+            for i in range(SEED_ROUTES):
+                managed.save_route(_route(i))
+            managed.connections.close_all()
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute('ATTACH DATABASE ? AS seed', (managed_path,))
+            conn.execute('INSERT INTO routes SELECT id, name, description, source, source_url, places, route, '
+                         'distance, duration, tags, created_at, updated_at FROM seed.routes')
+            conn.commit()
+            conn.execute('DETACH DATABASE seed')
+
+        for label, target, path in (('每次新建连接', _legacy_worker, legacy_path),
+                                    ('连接管理器(WAL)', _managed_worker, managed_path)):
+            result = run(target, path, workers, operations, write_ratio)
+            print(f"{label:<16} {result['ops_per_second']:>9.0f} ops/s   "
+                  f"p50 {result['p50_ms']:.3f}ms   p95 {result['p95_ms']:.3f}ms   p99 {result['p99_ms']:.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+路线ID性能测试
+1. 批量导入：原来按秒命名的ID与ULID分别导入，统计被覆盖的路线数
+2. 多线程、多进程并发生成ULID，检查是否重复
+3. 主键插入局部性：ULID与随机UUID作为主键的插入耗时和页数
+
+用法: python benchmark_route_ids.py [导入路线数，默认20000] [并发生成数，默认200000]
+"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+from route_ids import new_route_id, new_ulid
+
+WORKERS = 4
+
+
+def _legacy_id() -> str:
+    """原实现：按秒命名"""
+    return f"route_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+
+def _route(route_id: str, i: int) -> dict:
+    return {
+        'id': route_id,
+        'name': f'导入路线{i}',
+        'places': [{'name': f'地点{i % 50}', 'coordinates': {'lat': 35.7, 'lng': 139.7}}],
+        'tags': ['导入']
+    }
+
+
+def bulk_import(db_path: str, make_id, count: int) -> dict:
+    """批量导入并统计实际保存的路线数"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = Database(db_path)
+        started = time.perf_counter()
+        result = db.save_routes(_route(make_id(), i) for i in range(count))
+        elapsed = time.perf_counter() - started
+    stored = db.connections.get().execute('SELECT COUNT(*) FROM routes').fetchone()[0]
+    db.connections.close_all()
+    return {'saved': result['saved'], 'stored': stored, 'rate': count / elapsed}
+
+
+def _generate(count: int, queue):
+    queue.put([new_ulid() for _ in range(count)])
+
+
+def concurrent_ids(count: int) -> dict:
+    """多线程和多进程同时生成ULID"""
+    per_worker = count // (WORKERS * 2)
+    results = []
+    lock = threading.Lock()
+
+    def thread_worker():
+        ids = [new_ulid() for _ in range(per_worker)]
+        with lock:
+            results.append(ids)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=thread_worker) for _ in range(WORKERS)]
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_generate, args=(per_worker, queue)) for _ in range(WORKERS)]
+    for worker in threads + processes:
+        worker.start()
+    for _ in processes:
+        results.append(queue.get())
+    for worker in threads + processes:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(ids) for ids in results)
+    unique = len(set(id_ for ids in results for id_ in ids))
+    monotonic = all(all(a < b for a, b in zip(ids, ids[1:])) for ids in results)
+    return {'total': total, 'duplicates': total - unique, 'monotonic': monotonic, 'rate': total / elapsed}
+
+
+def insert_locality(db_path: str, make_id, count: int) -> dict:
+    """按生成顺序插入主键表"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE items (id TEXT PRIMARY KEY, payload TEXT) WITHOUT ROWID')
+    ids = [make_id() for _ in range(count)]
+    started = time.perf_counter()
+    for start in range(0, count, 1000):
+        with conn:
+            conn.executemany('INSERT INTO items VALUES (?, ?)', [(id_, 'x' * 100) for id_ in ids[start:start + 1000]])
+    elapsed = time.perf_counter() - started
+    pages = conn.execute('PRAGMA page_count').fetchone()[0]
+    conn.close()
+    return {'ms': elapsed * 1000, 'pages': pages}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    generated = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"📦 批量导入 {count} 条路线")
+        for label, make_id in (('按秒命名', _legacy_id), ('ULID', new_route_id)):
+            result = bulk_import(os.path.join(tmp, f'{make_id.__name__}.db'), make_id, count)
+            print(f"{label:<10} {result['rate']:>8.0f} 条/秒   保存 {result['saved']}   "
+                  f"实际存储 {result['stored']}   被覆盖 {result['saved'] - result['stored']}")
+
+        result = concurrent_ids(generated)
+        print(f"🔀 {WORKERS}线程 + {WORKERS}进程生成 {result['total']} 个ULID："
+              f"重复 {result['duplicates']}，各自单调递增 {'是' if result['monotonic'] else '否'}，"
+              f"{result['rate']:.0f} 个/秒")
+
+        print(f"🌲 主键插入 {generated} 行")
+        for label, make_id in (('随机UUID', lambda: uuid.uuid4().hex), ('ULID', new_ulid)):
+            result = insert_locality(os.path.join(tmp, f'{label}.db'), make_id, generated)
+            print(f"{label:<10} {result['ms']:>8.0f}ms   {result['pages']} 页")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+路线搜索性能测试
+对比原 LIKE '%关键词%' 全表扫描与FTS5 trigram全文索引
+
+用法: python benchmark_search.py [路线数量，默认1000000] [数据库路径]
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+
+CITIES = ['东京', '京都', '大阪', '上海', '成都', '杭州', '首尔', '曼谷']
+PLACES = ['浅草寺', '谷中银座商业街', '猫猫神社', '朝仓雕塑馆', '晴空塔', '外滩', '宽窄巷子', '西湖断桥',
+          '伏见稻荷大社', '道顿堀', '明洞', '大皇宫', '天妇罗店', '拉面馆', '咖啡馆', '美术馆']
+WORDS = ['散步', '美食', '拍照', '小众', '古着', '夜景', '寺庙', '购物', '亲子', '一日游', '周末', '路线']
+
+QUERIES = ['浅草寺', '谷中银座', '伏见稻荷', '东京 夜景', '不存在的地点名称']
+
+
+def _fill(db: Database, count: int, seed: int = 1):
+    """批量生成路线数据（全文索引由触发器同步）"""
+    rng = random.Random(seed)
+    conn = db.connections.get()
+    batch = []
+    for i in range(count):
+        city = rng.choice(CITIES)
+        places = [{'name': name} for name in rng.sample(PLACES, 4)]
+        words = rng.sample(WORDS, 3)
+        batch.append((
+            f'route_{i}',
+            f"{city}{words[0]}{words[1]}路线{i}",
+            f"{city}{''.join(words)}，途经{'、'.join(p['name'] for p in places)}",
+            json.dumps(places, ensure_ascii=False),
+            ' '.join(p['name'] for p in places),
+            json.dumps([city, words[2]], ensure_ascii=False),
+            f'2024-01-01T00:00:{i:07d}'
+        ))
+        if len(batch) == 10000:
+            _insert(conn, batch)
+            batch = []
+    if batch:
+        _insert(conn, batch)
+
+
+def _insert(conn, batch):
+    with conn:
+        conn.executemany(
+            'INSERT INTO routes (id, name, description, places, place_names, tags, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            batch
+        )
+
+
+def _like_search(db: Database, keyword: str):
+    """原实现的LIKE查询"""
+    pattern = f'%{keyword}%'
+    return db.connections.get().execute('''
+        SELECT * FROM routes
+        WHERE name LIKE ? OR description LIKE ? OR tags LIKE ?
+        ORDER BY created_at DESC
+        LIMIT 20
+    ''', (pattern, pattern, pattern)).fetchall()
+
+
+def _timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tmp, 'search.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(db_path)
+        existing = db.connections.get().execute('SELECT COUNT(*) FROM routes').fetchone()[0]
+        if existing < count:
+            print(f"📦 生成 {count - existing} 条路线...")
+            started = time.perf_counter()
+            _fill(db, count - existing, seed=existing)
+            print(f"   写入耗时 {time.perf_counter() - started:.1f}s（含全文索引触发器）")
+
+        print(f"🔍 {count} 条路线，每个查询取3次最快值，返回前20条")
+        for query in QUERIES:
+            like_ms = _timed(lambda: _like_search(db, query.split()[0]))
+            fts_ms = _timed(lambda: db.search(query, limit=20))
+            print(f"{query:<12} LIKE {like_ms:>9.1f}ms   FTS5 {fts_ms:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+附近路线查询性能测试
+对比逐行解析places JSON计算距离与R*Tree空间索引
+
+用法: python benchmark_spatial.py [路线数量，默认100000]
+"""
+
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+
+# 东京23区附近
+CENTER = (35.68, 139.76)
+SPREAD = 0.15
+
+QUERIES = [((35.7148, 139.7967), 500), ((35.7148, 139.7967), 2000), ((35.6586, 139.7454), 5000)]
+
+
+def _route(rng: random.Random, i: int) -> dict:
+    lat = CENTER[0] + (rng.random() - 0.5) * SPREAD * 2
+    lng = CENTER[1] + (rng.random() - 0.5) * SPREAD * 2
+    return {
+        'id': f'route_{i}',
+        'name': f'路线{i}',
+        'places': [
+            {'name': f'地点{i}_{j}',
+             'coordinates': {'lat': round(lat + rng.gauss(0, 0.005), 6), 'lng': round(lng + rng.gauss(0, 0.005), 6)}}
+            for j in range(6)
+        ]
+    }
+
+
+def _scan_nearby(db: Database, lat: float, lng: float, radius: float, limit: int = 20):
+    """原方式：逐行解析places JSON并计算距离"""
+    nearest = {}
+    for route_id, places_json in db.connections.get().execute('SELECT id, places FROM routes'):
+        for place in json.loads(places_json or '[]'):
+            coords = place.get('coordinates') or {}
+            if coords.get('lat') is None:
+                continue
+            distance = Database._distance_m(lat, lng, coords['lat'], coords['lng'])
+            if distance <= radius and distance < nearest.get(route_id, math.inf):
+                nearest[route_id] = distance
+    return sorted(nearest.items(), key=lambda item: item[1])[:limit]
+
+
+def _timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(os.path.join(tmp, 'spatial.db'))
+        print(f"📦 生成 {count} 条路线（每条6个地点）...")
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.save_routes(_route(rng, i) for i in range(count))
+        print(f"   写入耗时 {time.perf_counter() - started:.1f}s（含空间索引）")
+
+        print(f"📍 每个查询取3次最快值，返回前20条")
+        for (lat, lng), radius in QUERIES:
+            scan_ms, scanned = _timed(lambda: _scan_nearby(db, lat, lng, radius), repeat=1)
+            index_ms, indexed = _timed(lambda: db.find_nearby_routes(lat, lng, radius=radius))
+            same = [route_id for route_id, _ in scanned] == [r['route']['id'] for r in indexed]
+            print(f"半径 {radius:>5}m   JSON扫描 {scan_ms:>8.1f}ms   R*Tree {index_ms:>7.2f}ms   "
+                  f"结果一致 {'是' if same else '否'}")
+
+
+if __name__ == '__main__':
+    main()
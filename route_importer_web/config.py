@@ -17,6 +17,7 @@ class Config:
     
     # 地图服务配置
     MAP_SERVICE = 'google_maps'  # 支持: google_maps, baidu_maps, amap
+    ROAD_GRAPH_PATH = os.environ.get('ROAD_GRAPH_PATH')  # 离线步行路网文件（由 road_router.py build 生成）
     
     # 数据库配置
     DATABASE_PATH = 'routes.db'
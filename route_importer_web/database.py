@@ -4,20 +4,298 @@
 数据库操作模块
 """
 
-import sqlite3
+import base64
 import json
-from typing import List, Dict, Optional
+import math
+from collections import Counter
+from typing import Iterable, Iterator, List, Dict, Optional
 from datetime import datetime
+from db_connection import ConnectionManager
+from leg_cache import poi_id
+import payload_codec
+from route_fingerprint import canonical_note_id, route_fingerprint
+
+# 当前数据库结构版本（PRAGMA user_version）
+SCHEMA_VERSION = 7
+
+# 规范化的地点/标签表，用于按地点、类别、标签的索引查询
+NORMALIZED_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS places (
+        id INTEGER PRIMARY KEY,
+        poi_key TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL,
+        category TEXT,
+        address TEXT,
+        lat REAL,
+        lng REAL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_places_name ON places(name)',
+    'CREATE INDEX IF NOT EXISTS idx_places_category ON places(category)',
+    '''
+    CREATE TABLE IF NOT EXISTS route_places (
+        route_id TEXT NOT NULL REFERENCES routes(id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        place_id INTEGER NOT NULL REFERENCES places(id),
+        PRIMARY KEY (route_id, position)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_route_places_place ON route_places(place_id, route_id)',
+    '''
+    CREATE TABLE IF NOT EXISTS tags (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS route_tags (
+        route_id TEXT NOT NULL REFERENCES routes(id) ON DELETE CASCADE,
+        tag_id INTEGER NOT NULL REFERENCES tags(id),
+        PRIMARY KEY (route_id, tag_id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_route_tags_tag ON route_tags(tag_id, route_id)'
+]
+
+# 空间索引（R*Tree）：地点坐标点和路线范围（所有地点的外包矩形），id分别对应 places.id 和 routes.rowid
+SPATIAL_SCHEMA = [
+    'CREATE VIRTUAL TABLE IF NOT EXISTS place_points USING rtree(id, min_lat, max_lat, min_lng, max_lng)',
+    'CREATE VIRTUAL TABLE IF NOT EXISTS route_bounds USING rtree(id, min_lat, max_lat, min_lng, max_lng)',
+    '''
+    CREATE TRIGGER IF NOT EXISTS place_points_insert AFTER INSERT ON places
+    WHEN new.lat IS NOT NULL AND new.lng IS NOT NULL BEGIN
+        INSERT OR REPLACE INTO place_points VALUES (new.id, new.lat, new.lat, new.lng, new.lng);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS place_points_update AFTER UPDATE OF lat, lng ON places BEGIN
+        DELETE FROM place_points WHERE id = old.id;
+        INSERT INTO place_points SELECT new.id, new.lat, new.lat, new.lng, new.lng
+        WHERE new.lat IS NOT NULL AND new.lng IS NOT NULL;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS route_bounds_delete AFTER DELETE ON routes BEGIN
+        DELETE FROM route_bounds WHERE id = old.rowid;
+    END
+    '''
+]
+
+# 按路线的地点重新计算路线范围（路线没有带坐标的地点时不写入）
+ROUTE_BOUNDS_SQL = '''
+    INSERT INTO route_bounds (id, min_lat, max_lat, min_lng, max_lng)
+    SELECT r.rowid, MIN(p.lat), MAX(p.lat), MIN(p.lng), MAX(p.lng)
+    FROM routes r
+    JOIN route_places rp ON rp.route_id = r.id
+    JOIN places p ON p.id = rp.place_id
+    WHERE r.id = ? AND p.lat IS NOT NULL AND p.lng IS NOT NULL
+    GROUP BY r.rowid
+'''
+
+# 纬度1度对应的距离（米）
+METERS_PER_DEGREE = 111320.0
+
+EARTH_RADIUS_M = 6371000.0
+
+# 附近路线的默认搜索半径（米）
+NEARBY_RADIUS = 1000.0
+
+# 附近路线逐步扩大搜索范围时的初始半径（米）
+NEARBY_INITIAL_RADIUS = 250.0
+
+# 全文索引：trigram分词支持中文任意子串匹配；标签由JSON字段展开为空格分隔的文本，
+# 地点名称取自 place_names 列（places 可能是压缩存储，触发器中无法解析）
+_FTS_VALUES = '''
+    new.rowid, new.name, new.description,
+    CASE WHEN json_valid(new.tags) THEN (SELECT group_concat(value, ' ') FROM json_each(new.tags)) END,
+    new.place_names
+'''
+
+# 由JSON文本的places计算 place_names（仅用于迁移旧数据）
+_PLACE_NAMES_FROM_JSON = '''
+    CASE WHEN json_valid(places) THEN (SELECT group_concat(json_extract(value, '$.name'), ' ') FROM json_each(places)) END
+'''
+
+FTS_SCHEMA = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS routes_fts USING fts5(
+        name, description, tags, places, tokenize = 'trigram'
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS routes_fts_insert AFTER INSERT ON routes BEGIN
+        INSERT INTO routes_fts (rowid, name, description, tags, places) VALUES ({_FTS_VALUES});
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS routes_fts_delete AFTER DELETE ON routes BEGIN
+        DELETE FROM routes_fts WHERE rowid = old.rowid;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS routes_fts_update AFTER UPDATE OF name, description, tags, place_names ON routes BEGIN
+        DELETE FROM routes_fts WHERE rowid = old.rowid;
+        INSERT INTO routes_fts (rowid, name, description, tags, places) VALUES ({_FTS_VALUES});
+    END
+    '''
+]
+
+# 插入或更新路线（使用UPSERT保持rowid不变，全文索引由触发器同步）
+UPSERT_ROUTE_SQL = '''
+    INSERT INTO routes 
+    (id, name, description, source, source_url, places, route, distance, duration, tags, created_at, updated_at, route_lod, city, place_names,
+     note_id, fingerprint)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name, description = excluded.description, source = excluded.source,
+        source_url = excluded.source_url, places = excluded.places, route = excluded.route,
+        distance = excluded.distance, duration = excluded.duration, tags = excluded.tags,
+        created_at = excluded.created_at, updated_at = excluded.updated_at, route_lod = excluded.route_lod,
+        city = excluded.city, place_names = excluded.place_names, note_id = excluded.note_id,
+        fingerprint = excluded.fingerprint
+'''
+
+UPSERT_PLACE_SQL = '''
+    INSERT INTO places (poi_key, name, category, address, lat, lng) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(poi_key) DO UPDATE SET
+        category = COALESCE(excluded.category, category),
+        address = COALESCE(excluded.address, address)
+'''
+
+# 批量写入时每个事务包含的路线数
+BULK_CHUNK_SIZE = 500
+
+# 路线列表的摘要字段（不读取JSON字段）
+SUMMARY_COLUMNS = ['id', 'name', 'distance', 'duration', 'created_at']
+
+# 统计表：scope为 all（全部路线）/ tag（按标签）/ city（按城市），由触发器增量维护，读取为O(1)
+def _stats_change(scope: str, key: str, sign: str, distance: str, duration: str, where: str = 'true') -> str:
+    """生成累加（sign为空）或扣减（sign为'-'）一条路线统计的语句"""
+    return f'''
+        INSERT INTO route_stats (scope, key, route_count, total_distance, total_duration)
+        SELECT '{scope}', {key}, {sign}1, {sign}COALESCE({distance}, 0), {sign}COALESCE({duration}, 0) WHERE {where}
+        ON CONFLICT(scope, key) DO UPDATE SET
+            route_count = route_count + excluded.route_count,
+            total_distance = total_distance + excluded.total_distance,
+            total_duration = total_duration + excluded.total_duration;
+    '''
+
+_CLEAN_STATS = "DELETE FROM route_stats WHERE scope != 'all' AND route_count <= 0;"
+
+STATS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS route_stats (
+        scope TEXT NOT NULL,
+        key TEXT NOT NULL,
+        route_count INTEGER NOT NULL DEFAULT 0,
+        total_distance REAL NOT NULL DEFAULT 0,
+        total_duration INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (scope, key)
+    ) WITHOUT ROWID
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS route_stats_insert AFTER INSERT ON routes BEGIN
+        {_stats_change('all', "''", '', 'new.distance', 'new.duration')}
+        {_stats_change('city', 'new.city', '', 'new.distance', 'new.duration', 'new.city IS NOT NULL')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS route_stats_update AFTER UPDATE OF distance, duration, city ON routes BEGIN
+        {_stats_change('all', "''", '-', 'old.distance', 'old.duration')}
+        {_stats_change('city', 'old.city', '-', 'old.distance', 'old.duration', 'old.city IS NOT NULL')}
+        {_stats_change('all', "''", '', 'new.distance', 'new.duration')}
+        {_stats_change('city', 'new.city', '', 'new.distance', 'new.duration', 'new.city IS NOT NULL')}
+        UPDATE route_stats SET
+            total_distance = total_distance - COALESCE(old.distance, 0) + COALESCE(new.distance, 0),
+            total_duration = total_duration - COALESCE(old.duration, 0) + COALESCE(new.duration, 0)
+        WHERE scope = 'tag' AND key IN (
+            SELECT t.name FROM route_tags rt JOIN tags t ON t.id = rt.tag_id WHERE rt.route_id = new.id
+        );
+        {_CLEAN_STATS}
+    END
+    ''',
+    # 先删除标签关联，使标签统计在路线行仍存在时扣减
+    '''
+    CREATE TRIGGER IF NOT EXISTS route_stats_before_delete BEFORE DELETE ON routes BEGIN
+        DELETE FROM route_tags WHERE route_id = old.id;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS route_stats_delete AFTER DELETE ON routes BEGIN
+        {_stats_change('all', "''", '-', 'old.distance', 'old.duration')}
+        {_stats_change('city', 'old.city', '-', 'old.distance', 'old.duration', 'old.city IS NOT NULL')}
+        {_CLEAN_STATS}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS route_stats_tag_insert AFTER INSERT ON route_tags BEGIN
+        {_stats_change('tag', '(SELECT name FROM tags WHERE id = new.tag_id)', '',
+                       '(SELECT distance FROM routes WHERE id = new.route_id)',
+                       '(SELECT duration FROM routes WHERE id = new.route_id)')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS route_stats_tag_delete AFTER DELETE ON route_tags BEGIN
+        {_stats_change('tag', '(SELECT name FROM tags WHERE id = old.tag_id)', '-',
+                       '(SELECT distance FROM routes WHERE id = old.route_id)',
+                       '(SELECT duration FROM routes WHERE id = old.route_id)')}
+        {_CLEAN_STATS}
+    END
+    '''
+]
+
+# 存储编码设置和压缩字典（编码按数据库选择，见 payload_codec）
+PAYLOAD_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS payload_dictionaries (
+        id INTEGER PRIMARY KEY,
+        codec TEXT NOT NULL,
+        data BLOB NOT NULL,
+        created_at TEXT
+    )
+    '''
+]
+
+# 按存储编码保存的字段（tags 较小且被触发器使用，始终为JSON文本）
+PAYLOAD_COLUMNS = ['places', 'route', 'route_lod']
+
+# 训练压缩字典时抽取的路线数
+DICTIONARY_SAMPLE_SIZE = 1000
+
+# bm25列权重：名称 > 标签 > 地点 > 描述
+FTS_WEIGHTS = (10.0, 2.0, 5.0, 3.0)
+
+# trigram分词的最短可索引长度
+FTS_MIN_TERM_LENGTH = 3
 
 class Database:
-    def __init__(self, db_path: str = 'routes.db'):
+    def __init__(self, db_path: str = 'routes.db', codec: Optional[str] = None):
+        """
+        Args:
+            db_path: 数据库文件路径
+            codec: places/route字段的存储编码（见 payload_codec.CODECS），
+                   不指定时使用数据库中保存的设置；指定的编码与设置不同时切换并保存
+        """
         self.db_path = db_path
+        # 每个线程复用一个WAL模式的长连接
+        self.connections = ConnectionManager(db_path)
+        self._dictionaries = {}
         self.init_database()
+        self.codec = self._load_codec()
+        if codec and codec != self.codec.name:
+            self.set_codec(codec)
     
     def init_database(self):
         """初始化数据库"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.connection() as conn:
                 cursor = conn.cursor()
                 
                 # 创建路线表
@@ -34,10 +312,52 @@ class Database:
                         duration INTEGER,
                         tags TEXT,
                         created_at TEXT,
-                        updated_at TEXT
+                        updated_at TEXT,
+                        route_lod TEXT,
+                        city TEXT,
+                        place_names TEXT,
+                        note_id TEXT,
+                        fingerprint TEXT
                     )
                 ''')
                 
+                # 旧数据库补充简化几何列
+                columns = [row[1] for row in cursor.execute('PRAGMA table_info(routes)')]
+                if 'route_lod' not in columns:
+                    cursor.execute('ALTER TABLE routes ADD COLUMN route_lod TEXT')
+                if 'city' not in columns:
+                    cursor.execute('ALTER TABLE routes ADD COLUMN city TEXT')
+                if 'place_names' not in columns:
+                    cursor.execute('ALTER TABLE routes ADD COLUMN place_names TEXT')
+                    cursor.execute(f'UPDATE routes SET place_names = {_PLACE_NAMES_FROM_JSON}')
+                if 'note_id' not in columns:
+                    cursor.execute('ALTER TABLE routes ADD COLUMN note_id TEXT')
+                if 'fingerprint' not in columns:
+                    cursor.execute('ALTER TABLE routes ADD COLUMN fingerprint TEXT')
+                
+                # 创建规范化的地点和标签表及空间索引
+                for statement in NORMALIZED_SCHEMA + SPATIAL_SCHEMA:
+                    cursor.execute(statement)
+                
+                # 按版本执行迁移
+                version = cursor.execute('PRAGMA user_version').fetchone()[0]
+                if version < 1:
+                    self._migrate_normalized(conn)
+                if version < 2:
+                    self._migrate_fts(conn)
+                if version < 3:
+                    self._migrate_list_index(conn)
+                if version < 4:
+                    self._migrate_stats(conn)
+                if version < 5:
+                    self._migrate_payload(conn)
+                if version < 6:
+                    self._migrate_spatial(conn)
+                if version < 7:
+                    self._migrate_fingerprints(conn)
+                if version < SCHEMA_VERSION:
+                    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+                
                 conn.commit()
                 print("数据库初始化成功")
                 
@@ -45,35 +365,29 @@ class Database:
             print(f"数据库初始化失败: {e}")
     
     def save_route(self, route_info: Dict) -> bool:
-        """保存路线"""
+        """
+        保存路线
+        
+        同一笔记、相同地点顺序的路线已经以其他ID保存过时不再新建，只更新已有路线的时间，
+        并将 route_info['id'] 改为已有路线的ID。
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.connection() as conn:
                 cursor = conn.cursor()
                 
-                # 准备数据
-                places_json = json.dumps(route_info.get('places', []), ensure_ascii=False)
-                route_json = json.dumps(route_info.get('route', []), ensure_ascii=False)
-                tags_json = json.dumps(route_info.get('tags', []), ensure_ascii=False)
+                row = self._route_row(route_info)
+                duplicate = self._find_duplicates(cursor, [row]).get(0)
+                if duplicate:
+                    cursor.execute('UPDATE routes SET updated_at = ? WHERE id = ?', (datetime.now().isoformat(), duplicate))
+                    route_info['id'] = duplicate
+                    conn.commit()
+                    print(f"路线已存在，跳过保存: {route_info.get('name')}")
+                    return True
                 
-                # 插入或更新路线
-                cursor.execute('''
-                    INSERT OR REPLACE INTO routes 
-                    (id, name, description, source, source_url, places, route, distance, duration, tags, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    route_info.get('id'),
-                    route_info.get('name'),
-                    route_info.get('description'),
-                    route_info.get('source'),
-                    route_info.get('source_url'),
-                    places_json,
-                    route_json,
-                    route_info.get('distance'),
-                    route_info.get('duration'),
-                    tags_json,
-                    route_info.get('created_at'),
-                    datetime.now().isoformat()
-                ))
+                cursor.execute(UPSERT_ROUTE_SQL, row)
+                
+                # 同步规范化的地点和标签
+                self._save_relations(cursor, [route_info])
                 
                 conn.commit()
                 print(f"路线保存成功: {route_info.get('name')}")
@@ -83,10 +397,153 @@ class Database:
             print(f"保存路线失败: {e}")
             return False
     
+    def save_routes(self, routes: Iterable[Dict], chunk_size: int = BULK_CHUNK_SIZE) -> Dict:
+        """
+        批量保存路线
+        
+        Returns:
+            {'saved': 成功数, 'failed': 失败数, 'duplicates': 其中已存在的路线数, 'results': 每条路线的结果}
+        """
+        results = list(self.iter_save_routes(routes, chunk_size))
+        saved = sum(1 for result in results if result['success'])
+        duplicates = sum(1 for result in results if result['duplicate'])
+        print(f"批量保存路线完成: 成功 {saved} 条（已存在 {duplicates} 条），失败 {len(results) - saved} 条")
+        return {'saved': saved, 'failed': len(results) - saved, 'duplicates': duplicates, 'results': results}
+    
+    def iter_save_routes(self, routes: Iterable[Dict], chunk_size: int = BULK_CHUNK_SIZE) -> Iterator[Dict]:
+        """
+        批量保存路线（生成器），逐块读取输入，每块在一个事务中用executemany写入
+        
+        某一块写入失败时回滚该块并逐条重试，只有出错的路线失败。
+        
+        Yields:
+            {'index': 输入序号, 'id': 路线ID（重复时为已有路线ID）, 'success': 是否成功, 'error': 错误信息,
+             'duplicate': 是否为已导入过的路线}
+        """
+        chunk = []
+        for index, route_info in enumerate(routes):
+            error = self._validate_route(route_info)
+            if error:
+                yield {'index': index, 'id': route_info.get('id') if isinstance(route_info, dict) else None,
+                       'success': False, 'error': error, 'duplicate': False}
+                continue
+            chunk.append((index, route_info))
+            if len(chunk) >= chunk_size:
+                yield from self._save_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._save_chunk(chunk)
+    
+    def _save_chunk(self, chunk) -> Iterator[Dict]:
+        """在一个事务中写入一块路线，失败时逐条重试；已保存过的笔记路线只更新时间"""
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                rows = [self._route_row(route_info) for _, route_info in chunk]
+                duplicates = self._find_duplicates(cursor, rows)
+                fresh = [i for i in range(len(chunk)) if i not in duplicates]
+                cursor.executemany(UPSERT_ROUTE_SQL, [rows[i] for i in fresh])
+                self._save_relations(cursor, [chunk[i][1] for i in fresh])
+                now = datetime.now().isoformat()
+                cursor.executemany('UPDATE routes SET updated_at = ? WHERE id = ?',
+                                   [(now, route_id) for route_id in set(duplicates.values())])
+            for i, (index, route_info) in enumerate(chunk):
+                yield {'index': index, 'id': duplicates.get(i, route_info['id']), 'success': True, 'error': None,
+                       'duplicate': i in duplicates}
+            return
+        except Exception as e:
+            if len(chunk) == 1:
+                index, route_info = chunk[0]
+                yield {'index': index, 'id': route_info.get('id'), 'success': False, 'error': str(e),
+                       'duplicate': False}
+                return
+        
+        for item in chunk:
+            yield from self._save_chunk([item])
+    
+    @staticmethod
+    def _validate_route(route_info) -> Optional[str]:
+        """检查路线数据，返回错误信息；不合法时不写入数据库"""
+        if not isinstance(route_info, dict):
+            return '路线数据必须是对象'
+        if not route_info.get('id'):
+            return '缺少路线ID'
+        if not route_info.get('name'):
+            return '缺少路线名称'
+        if not isinstance(route_info.get('places', []), list) or not isinstance(route_info.get('tags', []), list):
+            return 'places和tags必须是数组'
+        return None
+    
+    def _route_row(self, route_info: Dict) -> tuple:
+        """将路线数据转换为 UPSERT_ROUTE_SQL 的参数（places/route按当前存储编码编码）"""
+        now = datetime.now().isoformat()
+        places = route_info.get('places', [])
+        note_id = canonical_note_id(route_info.get('source_url'))
+        return (
+            route_info.get('id'),
+            route_info.get('name'),
+            route_info.get('description'),
+            route_info.get('source'),
+            route_info.get('source_url'),
+            self.codec.encode(places),
+            self.codec.encode(route_info.get('route', [])),
+            route_info.get('distance'),
+            route_info.get('duration'),
+            json.dumps(route_info.get('tags', []), ensure_ascii=False),
+            route_info.get('created_at') or now,
+            now,
+            self.codec.encode(route_info.get('route_lod', {})),
+            route_info.get('city') or Database._route_city(places),
+            ' '.join(str(place['name']) for place in places if isinstance(place, dict) and place.get('name')) or None,
+            note_id,
+            route_fingerprint(note_id, places)
+        )
+    
+    def _find_duplicates(self, cursor, rows: List[tuple]) -> Dict[int, str]:
+        """
+        查找指纹已被其他路线占用的行（包括同一批次中靠前的路线）
+        
+        Returns:
+            {行序号: 已有路线ID}
+        """
+        fingerprints = [fingerprint for fingerprint in dict.fromkeys(row[-1] for row in rows) if fingerprint]
+        if not fingerprints:
+            return {}
+        known = self._lookup_ids(cursor, 'routes', 'fingerprint', fingerprints)
+        duplicates = {}
+        for i, row in enumerate(rows):
+            route_id, fingerprint = row[0], row[-1]
+            if not fingerprint:
+                continue
+            existing = known.setdefault(fingerprint, route_id)
+            if existing != route_id:
+                duplicates[i] = existing
+        return duplicates
+    
+    def find_route_by_note(self, url: str) -> Optional[str]:
+        """按笔记链接查找已导入的路线ID（链接先归一为笔记ID），用于在抓取和解析笔记前跳过已导入的笔记"""
+        note_id = canonical_note_id(url)
+        if not note_id:
+            return None
+        try:
+            row = self.connections.get().execute(
+                'SELECT id FROM routes WHERE note_id = ? ORDER BY created_at LIMIT 1', (note_id,)
+            ).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"按笔记查找路线失败: {e}")
+            return None
+    
+    @staticmethod
+    def _route_city(places: List[Dict]) -> Optional[str]:
+        """路线所在城市：地点中出现最多的城市"""
+        cities = Counter(place.get('city') for place in places if isinstance(place, dict) and place.get('city'))
+        return cities.most_common(1)[0][0] if cities else None
+    
     def get_route(self, route_id: str) -> Optional[Dict]:
         """获取特定路线"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('SELECT * FROM routes WHERE id = ?', (route_id,))
@@ -103,7 +560,7 @@ class Database:
     def get_all_routes(self) -> List[Dict]:
         """获取所有路线"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('SELECT * FROM routes ORDER BY created_at DESC')
@@ -114,11 +571,93 @@ class Database:
         except Exception as e:
             print(f"获取所有路线失败: {e}")
             return []
-    
+
+    def list_routes(self, limit: int = 20, cursor: Optional[str] = None) -> Dict:
+        """
+        分页获取路线摘要（按创建时间倒序）
+        
+        使用 (created_at, id) 游标分页，只读取摘要字段，开销与页大小成正比而与路线总数无关。
+        
+        Args:
+            limit: 每页数量
+            cursor: 上一页返回的 next_cursor，为空时从第一页开始
+        
+        Returns:
+            {'routes': [摘要], 'next_cursor': 下一页游标（没有更多时为None）}
+        """
+        try:
+            with self.connections.connection() as conn:
+                cursor_obj = conn.cursor()
+                
+                columns = ', '.join(SUMMARY_COLUMNS)
+                place_count = '(SELECT COUNT(*) FROM route_places rp WHERE rp.route_id = routes.id)'
+                if cursor:
+                    created_at, route_id = self._decode_cursor(cursor)
+                    cursor_obj.execute(f'''
+                        SELECT {columns}, {place_count} FROM routes
+                        WHERE (created_at, id) < (?, ?)
+                        ORDER BY created_at DESC, id DESC
+                        LIMIT ?
+                    ''', (created_at, route_id, limit + 1))
+                else:
+                    cursor_obj.execute(f'''
+                        SELECT {columns}, {place_count} FROM routes
+                        ORDER BY created_at DESC, id DESC
+                        LIMIT ?
+                    ''', (limit + 1,))
+                
+                rows = cursor_obj.fetchall()
+                routes = [dict(zip(SUMMARY_COLUMNS + ['place_count'], row)) for row in rows[:limit]]
+                next_cursor = None
+                if len(rows) > limit:
+                    last = routes[-1]
+                    next_cursor = self._encode_cursor(last['created_at'], last['id'])
+                
+                return {'routes': routes, 'next_cursor': next_cursor}
+                
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"分页获取路线失败: {e}")
+            return {'routes': [], 'next_cursor': None}
+
+    def iter_routes(self, route_ids: Optional[List[str]] = None, chunk_size: int = 500) -> Iterator[Dict]:
+        """逐行读取路线（生成器），导出大量路线时内存占用与路线总数无关
+
+        指定路线ID时分批查询（避免超出SQL参数数量限制），整体仍按创建时间倒序输出。
+        """
+        try:
+            cursor = self.connections.get().cursor()
+            if not route_ids:
+                cursor.execute('SELECT * FROM routes ORDER BY created_at DESC')
+                for row in cursor:
+                    yield self._row_to_dict(row)
+                return
+
+            # 先分批取出存在的路线的排序键，排序后再按顺序分批读取完整行
+            ids = list(dict.fromkeys(route_ids))
+            keys = []
+            for start in range(0, len(ids), chunk_size):
+                batch = ids[start:start + chunk_size]
+                placeholders = ', '.join('?' for _ in batch)
+                keys.extend(cursor.execute(f'SELECT created_at, id FROM routes WHERE id IN ({placeholders})', batch))
+            keys.sort(reverse=True)
+
+            for start in range(0, len(keys), chunk_size):
+                batch = [key[1] for key in keys[start:start + chunk_size]]
+                placeholders = ', '.join('?' for _ in batch)
+                for row in cursor.execute(
+                    f'SELECT * FROM routes WHERE id IN ({placeholders}) ORDER BY created_at DESC, id DESC', batch
+                ):
+                    yield self._row_to_dict(row)
+
+        except Exception as e:
+            print(f"读取路线失败: {e}")
+
     def delete_route(self, route_id: str) -> bool:
         """删除路线"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('DELETE FROM routes WHERE id = ?', (route_id,))
@@ -136,35 +675,537 @@ class Database:
             return False
     
     def search_routes(self, keyword: str) -> List[Dict]:
-        """搜索路线"""
+        """搜索路线（按相关度排序）"""
+        return [result['route'] for result in self.search(keyword, limit=-1)]
+    
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+        """
+        全文搜索路线
+        
+        长度不少于3个字的关键词走FTS5索引并按BM25排序；
+        更短的关键词（如两个字的中文词）无法用trigram索引，改为子串匹配。
+        
+        Args:
+            query: 搜索词，多个关键词用空格分隔（需同时匹配）
+            limit: 返回数量，-1表示不限制
+            offset: 跳过的数量
+        
+        Returns:
+            [{'route': 路线, 'snippet': 高亮摘要, 'score': 相关度}]
+        """
+        terms = [term for term in (query or '').split() if term]
+        if not terms:
+            return []
+        
+        long_terms = [t for t in terms if len(t) >= FTS_MIN_TERM_LENGTH]
+        short_terms = [t for t in terms if len(t) < FTS_MIN_TERM_LENGTH]
+        
+        conditions = []
+        params = []
+        if long_terms:
+            conditions.append('routes_fts MATCH ?')
+            params.append(' AND '.join('"' + t.replace('"', '""') + '"' for t in long_terms))
+        for term in short_terms:
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append("(r.name LIKE ? ESCAPE '\\' OR r.description LIKE ? ESCAPE '\\' "
+                              "OR r.tags LIKE ? ESCAPE '\\' OR r.place_names LIKE ? ESCAPE '\\')")
+            params.extend([pattern] * 4)
+        
+        if long_terms:
+            weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+            ranking = f"snippet(routes_fts, -1, '<mark>', '</mark>', '…', 16), bm25(routes_fts, {weights})"
+            source = 'routes_fts f JOIN routes r ON r.rowid = f.rowid'
+            order = 'ORDER BY 2'
+        else:
+            # 只有短关键词时无法使用索引，直接在路线表上匹配，按时间倒序
+            ranking = 'NULL, NULL'
+            source = 'routes r'
+            order = 'ORDER BY r.created_at DESC'
+        
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                    SELECT {ranking}, r.* FROM {source}
+                    WHERE {' AND '.join(conditions)}
+                    {order}
+                    LIMIT ? OFFSET ?
+                ''', params + [limit, offset])
+                
+                return [
+                    {
+                        'route': self._row_to_dict(row[2:]),
+                        'snippet': row[0],
+                        'score': -row[1] if row[1] is not None else None
+                    }
+                    for row in cursor.fetchall()
+                ]
+                
+        except Exception as e:
+            print(f"搜索路线失败: {e}")
+            return []
+    
+    def find_routes_by_place(self, place_name: str) -> List[Dict]:
+        """查找经过某个地点的路线"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.connection() as conn:
                 cursor = conn.cursor()
                 
-                search_pattern = f'%{keyword}%'
                 cursor.execute('''
-                    SELECT * FROM routes 
-                    WHERE name LIKE ? OR description LIKE ? OR tags LIKE ?
+                    SELECT * FROM routes WHERE id IN (
+                        SELECT rp.route_id FROM places p
+                        JOIN route_places rp ON rp.place_id = p.id
+                        WHERE p.name = ?
+                    )
                     ORDER BY created_at DESC
-                ''', (search_pattern, search_pattern, search_pattern))
+                ''', (place_name,))
                 
-                rows = cursor.fetchall()
-                return [self._row_to_dict(row) for row in rows]
+                return [self._row_to_dict(row) for row in cursor.fetchall()]
                 
         except Exception as e:
-            print(f"搜索路线失败: {e}")
+            print(f"按地点查找路线失败: {e}")
+            return []
+    
+    def find_nearby_routes(self, lat: float, lng: float, radius: float = NEARBY_RADIUS,
+                           limit: int = 20) -> List[Dict]:
+        """
+        查找附近的路线：路线中任一地点在半径范围内，按最近地点的距离排序
+        
+        先用地点坐标的R*Tree索引取出外接矩形内的地点，再按球面距离精确过滤。
+        搜索范围从较小的半径开始逐步扩大，找到足够的路线即停止，地点密集时也只需计算少量距离。
+        
+        Args:
+            lat, lng: 中心点坐标
+            radius: 搜索半径（米）
+            limit: 返回数量
+        
+        Returns:
+            [{'route': 路线摘要, 'distance': 最近地点的距离（米）, 'place': 最近地点名称}]
+        """
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                search_radius = min(radius, NEARBY_INITIAL_RADIUS)
+                while True:
+                    nearest = self._nearest_places(cursor, lat, lng, search_radius)
+                    if len(nearest) >= limit or search_radius >= radius:
+                        break
+                    search_radius = min(radius, search_radius * 4)
+                
+                ranked = sorted(nearest.items(), key=lambda item: (item[1][0], item[0]))[:limit]
+                if not ranked:
+                    return []
+                
+                placeholders = ', '.join('?' for _ in ranked)
+                cursor.execute(
+                    f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM routes WHERE id IN ({placeholders})",
+                    [route_id for route_id, _ in ranked]
+                )
+                summaries = {row[0]: dict(zip(SUMMARY_COLUMNS, row)) for row in cursor.fetchall()}
+                
+                return [
+                    {'route': summaries[route_id], 'distance': round(distance, 1), 'place': name}
+                    for route_id, (distance, name) in ranked if route_id in summaries
+                ]
+        
+        except Exception as e:
+            print(f"查找附近路线失败: {e}")
+            return []
+    
+    def _nearest_places(self, cursor, lat: float, lng: float, radius: float) -> Dict[str, tuple]:
+        """半径内每条路线最近的地点：{路线ID: (距离, 地点名称)}"""
+        lat_delta = radius / METERS_PER_DEGREE
+        lng_delta = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        cursor.execute('''
+            SELECT rp.route_id, p.name, p.lat, p.lng FROM place_points pp
+            JOIN places p ON p.id = pp.id
+            JOIN route_places rp ON rp.place_id = p.id
+            WHERE pp.min_lat <= ? AND pp.max_lat >= ? AND pp.min_lng <= ? AND pp.max_lng >= ?
+        ''', (lat + lat_delta, lat - lat_delta, lng + lng_delta, lng - lng_delta))
+        
+        nearest = {}
+        for route_id, name, place_lat, place_lng in cursor.fetchall():
+            distance = self._distance_m(lat, lng, place_lat, place_lng)
+            if distance <= radius and (route_id not in nearest or distance < nearest[route_id][0]):
+                nearest[route_id] = (distance, name)
+        return nearest
+    
+    def find_routes_in_bounds(self, south: float, west: float, north: float, east: float,
+                              limit: int = 100) -> List[Dict]:
+        """查找范围与地图视野相交的路线（路线范围的R*Tree索引），返回路线摘要"""
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                    SELECT {', '.join('r.' + c for c in SUMMARY_COLUMNS)} FROM route_bounds b
+                    JOIN routes r ON r.rowid = b.id
+                    WHERE b.min_lat <= ? AND b.max_lat >= ? AND b.min_lng <= ? AND b.max_lng >= ?
+                    ORDER BY r.created_at DESC
+                    LIMIT ?
+                ''', (north, south, east, west, limit))
+                
+                return [dict(zip(SUMMARY_COLUMNS, row)) for row in cursor.fetchall()]
+        
+        except Exception as e:
+            print(f"按范围查找路线失败: {e}")
+            return []
+    
+    @staticmethod
+    def _distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+        """计算两点间球面距离（米）"""
+        lat1_rad = math.radians(lat1)
+        lat2_rad = math.radians(lat2)
+        a = (math.sin((lat2_rad - lat1_rad) / 2) ** 2 +
+             math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+        return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+    
+    def get_popular_places(self, limit: int = 20, category: Optional[str] = None) -> List[Dict]:
+        """按被路线收录次数统计热门地点，可按类别过滤"""
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT p.name, p.category, p.address, p.lat, p.lng, COUNT(DISTINCT rp.route_id) AS route_count
+                    FROM places p
+                    JOIN route_places rp ON rp.place_id = p.id
+                    WHERE ? IS NULL OR p.category = ?
+                    GROUP BY p.id
+                    ORDER BY route_count DESC, p.name
+                    LIMIT ?
+                ''', (category, category, limit))
+                
+                return [
+                    {'name': name, 'category': cat, 'address': address,
+                     'coordinates': {'lat': lat, 'lng': lng} if lat is not None else None,
+                     'route_count': count}
+                    for name, cat, address, lat, lng, count in cursor.fetchall()
+                ]
+                
+        except Exception as e:
+            print(f"获取热门地点失败: {e}")
+            return []
+    
+    def get_routes_by_tag(self, tag: str) -> List[Dict]:
+        """获取带有某个标签的路线"""
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT * FROM routes WHERE id IN (
+                        SELECT rt.route_id FROM tags t
+                        JOIN route_tags rt ON rt.tag_id = t.id
+                        WHERE t.name = ?
+                    )
+                    ORDER BY created_at DESC
+                ''', (tag,))
+                
+                return [self._row_to_dict(row) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            print(f"按标签获取路线失败: {e}")
             return []
     
+    def _save_relations(self, cursor, routes: List[Dict]):
+        """批量写入路线的地点顺序和标签（先清除旧数据）"""
+        # 同一批次中重复的路线以最后一条为准
+        routes = list({route_info.get('id'): route_info for route_info in routes}.values())
+        route_ids = [(route_info.get('id'),) for route_info in routes]
+        cursor.executemany('DELETE FROM route_places WHERE route_id = ?', route_ids)
+        cursor.executemany('DELETE FROM route_tags WHERE route_id = ?', route_ids)
+        
+        place_rows = {}
+        route_places = []
+        route_tags = []
+        for route_info in routes:
+            position = 0
+            for place in route_info.get('places') or []:
+                row = self._place_row(place)
+                if row is None:
+                    continue
+                place_rows[row[0]] = row
+                route_places.append((route_info.get('id'), position, row[0]))
+                position += 1
+            for tag in dict.fromkeys(t for t in route_info.get('tags') or [] if t):
+                route_tags.append((route_info.get('id'), str(tag)))
+        
+        cursor.executemany(UPSERT_PLACE_SQL, list(place_rows.values()))
+        place_ids = self._lookup_ids(cursor, 'places', 'poi_key', list(place_rows))
+        cursor.executemany('INSERT INTO route_places (route_id, position, place_id) VALUES (?, ?, ?)',
+                           [(route_id, position, place_ids[key]) for route_id, position, key in route_places])
+        
+        # 更新路线范围索引
+        cursor.executemany('DELETE FROM route_bounds WHERE id = (SELECT rowid FROM routes WHERE id = ?)', route_ids)
+        cursor.executemany(ROUTE_BOUNDS_SQL, route_ids)
+        
+        tag_names = list(dict.fromkeys(tag for _, tag in route_tags))
+        cursor.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(tag,) for tag in tag_names])
+        tag_ids = self._lookup_ids(cursor, 'tags', 'name', tag_names)
+        cursor.executemany('INSERT OR IGNORE INTO route_tags (route_id, tag_id) VALUES (?, ?)',
+                           [(route_id, tag_ids[tag]) for route_id, tag in route_tags])
+    
+    @staticmethod
+    def _place_row(place: Dict) -> Optional[tuple]:
+        """将地点转换为 UPSERT_PLACE_SQL 的参数；没有名称也没有坐标的地点返回None"""
+        if not isinstance(place, dict):
+            return None
+        name = place.get('name')
+        key = poi_id(place) or (f"name:{name}" if name else None)
+        if key is None:
+            return None
+        coords = place.get('coordinates') or {}
+        lat = coords.get('lat', coords.get('latitude'))
+        lng = coords.get('lng', coords.get('longitude'))
+        return (key, name or '', place.get('category'), place.get('address'), lat, lng)
+    
+    @staticmethod
+    def _lookup_ids(cursor, table: str, column: str, values: List[str]) -> Dict[str, int]:
+        """按唯一列批量查询ID（分批避免超出SQL参数数量限制）"""
+        ids = {}
+        for start in range(0, len(values), 500):
+            batch = values[start:start + 500]
+            placeholders = ', '.join('?' for _ in batch)
+            for row_id, value in cursor.execute(f'SELECT id, {column} FROM {table} WHERE {column} IN ({placeholders})', batch):
+                ids[value] = row_id
+        return ids
+    
+    def _migrate_normalized(self, conn):
+        """迁移：根据routes表中的JSON字段填充规范化的地点和标签表"""
+        cursor = conn.cursor()
+        migrated = 0
+        batch = []
+        for route_id, places_json, tags_json in conn.execute('SELECT id, places, tags FROM routes'):
+            try:
+                places = json.loads(places_json) if places_json else []
+                tags = json.loads(tags_json) if tags_json else []
+            except ValueError:
+                places, tags = [], []
+            batch.append({'id': route_id, 'places': places, 'tags': tags})
+            if len(batch) >= BULK_CHUNK_SIZE:
+                self._save_relations(cursor, batch)
+                batch = []
+            migrated += 1
+        if batch:
+            self._save_relations(cursor, batch)
+        if migrated:
+            print(f"已迁移 {migrated} 条路线的地点和标签")
+    
+    def _migrate_fts(self, conn):
+        """迁移：创建全文索引及同步触发器，并为已有路线建立索引"""
+        for statement in FTS_SCHEMA:
+            conn.execute(statement)
+        conn.execute('DELETE FROM routes_fts')
+        conn.execute(f'''
+            INSERT INTO routes_fts (rowid, name, description, tags, places)
+            SELECT {_FTS_VALUES.replace('new.', '')} FROM routes
+        ''')
+    
+    def _migrate_list_index(self, conn):
+        """迁移：补全创建时间并建立分页索引"""
+        conn.execute("UPDATE routes SET created_at = COALESCE(updated_at, '') WHERE created_at IS NULL")
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_routes_created ON routes(created_at, id)')
+    
+    def _migrate_stats(self, conn):
+        """迁移：根据地点补全路线城市，创建统计表和触发器并按现有数据初始化"""
+        conn.execute('''
+            UPDATE routes SET city = (
+                SELECT json_extract(value, '$.city') AS place_city FROM json_each(routes.places)
+                WHERE place_city IS NOT NULL AND place_city != ''
+                GROUP BY place_city ORDER BY COUNT(*) DESC LIMIT 1
+            )
+            WHERE city IS NULL AND json_valid(places)
+        ''')
+        for statement in STATS_SCHEMA:
+            conn.execute(statement)
+        conn.execute('DELETE FROM route_stats')
+        conn.execute('''
+            INSERT INTO route_stats (scope, key, route_count, total_distance, total_duration)
+            SELECT 'all', '', COUNT(*), COALESCE(SUM(distance), 0), COALESCE(SUM(duration), 0) FROM routes
+        ''')
+        conn.execute('''
+            INSERT INTO route_stats (scope, key, route_count, total_distance, total_duration)
+            SELECT 'city', city, COUNT(*), COALESCE(SUM(distance), 0), COALESCE(SUM(duration), 0)
+            FROM routes WHERE city IS NOT NULL GROUP BY city
+        ''')
+        conn.execute('''
+            INSERT INTO route_stats (scope, key, route_count, total_distance, total_duration)
+            SELECT 'tag', t.name, COUNT(*), COALESCE(SUM(r.distance), 0), COALESCE(SUM(r.duration), 0)
+            FROM route_tags rt JOIN tags t ON t.id = rt.tag_id JOIN routes r ON r.id = rt.route_id
+            GROUP BY t.name
+        ''')
+    
+    def _migrate_payload(self, conn):
+        """迁移：创建存储编码设置表，全文索引触发器改为使用 place_names 列"""
+        for statement in PAYLOAD_SCHEMA:
+            conn.execute(statement)
+        for trigger in ('routes_fts_insert', 'routes_fts_delete', 'routes_fts_update'):
+            conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        for statement in FTS_SCHEMA:
+            conn.execute(statement)
+    
+    def _migrate_spatial(self, conn):
+        """迁移：为已有地点和路线建立空间索引"""
+        conn.execute('DELETE FROM place_points')
+        conn.execute('''
+            INSERT INTO place_points SELECT id, lat, lat, lng, lng FROM places
+            WHERE lat IS NOT NULL AND lng IS NOT NULL
+        ''')
+        conn.execute('DELETE FROM route_bounds')
+        conn.execute(ROUTE_BOUNDS_SQL.replace('r.id = ?', 'true'))
+    
+    def _migrate_fingerprints(self, conn):
+        """迁移：为已有路线计算笔记ID和指纹并建立唯一索引（重复的路线只保留最早一条的指纹）"""
+        seen = set()
+        updates = []
+        for rowid, source_url, places in conn.execute(
+                'SELECT rowid, source_url, places FROM routes ORDER BY created_at, rowid'):
+            note_id = canonical_note_id(source_url)
+            try:
+                fingerprint = route_fingerprint(note_id, self._decode_payload(places) or [])
+            except Exception:
+                fingerprint = None
+            if fingerprint in seen:
+                fingerprint = None
+            seen.add(fingerprint)
+            updates.append((note_id, fingerprint, rowid))
+        conn.executemany('UPDATE routes SET note_id = ?, fingerprint = ? WHERE rowid = ?', updates)
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_routes_fingerprint ON routes(fingerprint)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_routes_note ON routes(note_id)')
+    
+    def _load_codec(self):
+        """读取数据库保存的存储编码及其压缩字典"""
+        try:
+            settings = dict(self.connections.get().execute(
+                "SELECT key, value FROM settings WHERE key IN ('payload_codec', 'payload_dictionary')"
+            ))
+            name = settings.get('payload_codec') or payload_codec.JsonCodec.name
+            dictionary_id = int(settings.get('payload_dictionary') or 0)
+            dictionary = self._dictionary(dictionary_id) if dictionary_id else None
+            return payload_codec.get_codec(name, dictionary, dictionary_id)
+        except Exception as e:
+            print(f"读取存储编码失败，使用JSON文本: {e}")
+            return payload_codec.JsonCodec()
+    
+    def _dictionary(self, dictionary_id: int) -> Optional[bytes]:
+        """读取压缩字典（缓存）"""
+        if dictionary_id not in self._dictionaries:
+            row = self.connections.get().execute(
+                'SELECT data FROM payload_dictionaries WHERE id = ?', (dictionary_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._dictionaries[dictionary_id] = bytes(row[0])
+        return self._dictionaries[dictionary_id]
+    
+    def _decode_payload(self, value):
+        """解码 places/route 字段：JSON文本或压缩的BLOB"""
+        if isinstance(value, bytes):
+            self._dictionary(payload_codec.dictionary_id(value))
+        return payload_codec.decode(value, self._dictionaries)
+    
+    def set_codec(self, name: str, dictionary_size: int = payload_codec.ZLIB_MAX_DICTIONARY):
+        """
+        切换本数据库的存储编码，之后写入的路线使用新编码（已有数据不变，仍可正常读取）
+        
+        压缩编码会从已有路线中抽样训练字典。
+        
+        Raises:
+            ValueError: 编码不存在或依赖未安装
+        """
+        codec = payload_codec.get_codec(name)
+        samples = []
+        if name != payload_codec.JsonCodec.name:
+            rows = self.connections.get().execute(
+                f"SELECT {', '.join(PAYLOAD_COLUMNS)} FROM routes ORDER BY random() LIMIT ?",
+                (DICTIONARY_SAMPLE_SIZE,)
+            ).fetchall()
+            samples = [codec.serialize(self._decode_payload(value)) for row in rows for value in row if value]
+        dictionary = payload_codec.train_dictionary(name, samples, dictionary_size)
+        
+        dictionary_id = 0
+        with self.connections.connection() as conn:
+            if dictionary:
+                dictionary_id = conn.execute(
+                    'INSERT INTO payload_dictionaries (codec, data, created_at) VALUES (?, ?, ?) RETURNING id',
+                    (name, dictionary, datetime.now().isoformat())
+                ).fetchone()[0]
+                self._dictionaries[dictionary_id] = dictionary
+            conn.executemany(
+                'INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+                [('payload_codec', name), ('payload_dictionary', str(dictionary_id))]
+            )
+        self.codec = payload_codec.get_codec(name, dictionary, dictionary_id)
+        print(f"存储编码已切换为 {name}" + (f"（字典 {len(dictionary)} 字节）" if dictionary else ''))
+    
+    def migrate_codec(self, name: str, dictionary_size: int = payload_codec.ZLIB_MAX_DICTIONARY,
+                      chunk_size: int = BULK_CHUNK_SIZE) -> int:
+        """
+        切换存储编码并按新编码重写所有路线的 places/route 字段
+        
+        按rowid分块，每块一个事务，可以在服务运行时执行。
+        
+        Returns:
+            重写的路线数
+        """
+        self.set_codec(name, dictionary_size)
+        migrated = 0
+        last_rowid = 0
+        while True:
+            with self.connections.connection() as conn:
+                rows = conn.execute(
+                    f"SELECT rowid, {', '.join(PAYLOAD_COLUMNS)} FROM routes WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, chunk_size)
+                ).fetchall()
+                if not rows:
+                    break
+                conn.executemany(
+                    f"UPDATE routes SET {', '.join(c + ' = ?' for c in PAYLOAD_COLUMNS)} WHERE rowid = ?",
+                    [
+                        tuple(None if value is None else self.codec.encode(self._decode_payload(value))
+                              for value in row[1:]) + (row[0],)
+                        for row in rows
+                    ]
+                )
+            last_rowid = rows[-1][0]
+            migrated += len(rows)
+        print(f"已按 {name} 编码重写 {migrated} 条路线")
+        return migrated
+    
+    @staticmethod
+    def _encode_cursor(created_at: str, route_id: str) -> str:
+        """生成分页游标"""
+        raw = json.dumps([created_at, route_id], ensure_ascii=False).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        """解析分页游标，格式错误时抛出ValueError"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            created_at, route_id = json.loads(raw)
+            return str(created_at), str(route_id)
+        except Exception:
+            raise ValueError('无效的分页游标')
+    
     def _row_to_dict(self, row) -> Dict:
         """将数据库行转换为字典"""
-        columns = ['id', 'name', 'description', 'source', 'source_url', 'places', 'route', 'distance', 'duration', 'tags', 'created_at', 'updated_at']
+        columns = ['id', 'name', 'description', 'source', 'source_url', 'places', 'route', 'distance', 'duration', 'tags', 'created_at', 'updated_at', 'route_lod', 'city']
         
         route_dict = {}
         for i, column in enumerate(columns):
             value = row[i]
             
-            # 解析JSON字段
-            if column in ['places', 'route', 'tags'] and value:
+            # 解析JSON字段和按存储编码保存的字段
+            if column in PAYLOAD_COLUMNS and value:
+                try:
+                    route_dict[column] = self._decode_payload(value)
+                except:
+                    route_dict[column] = []
+            elif column == 'tags' and value:
                 try:
                     route_dict[column] = json.loads(value)
                 except:
@@ -174,32 +1215,39 @@ class Database:
         
         return route_dict
     
-    def get_statistics(self) -> Dict:
-        """获取统计信息"""
+    def get_statistics(self, top: int = 10) -> Dict:
+        """获取统计信息（读取触发器维护的统计表），包含按标签和城市的路线数排行"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.connection() as conn:
                 cursor = conn.cursor()
                 
-                # 总路线数
-                cursor.execute('SELECT COUNT(*) FROM routes')
-                total_routes = cursor.fetchone()[0]
-                
-                # 总距离
-                cursor.execute('SELECT SUM(distance) FROM routes')
-                total_distance = cursor.fetchone()[0] or 0
-                
-                # 总时间
-                cursor.execute('SELECT SUM(duration) FROM routes')
-                total_duration = cursor.fetchone()[0] or 0
+                row = cursor.execute(
+                    "SELECT route_count, total_distance, total_duration FROM route_stats WHERE scope = 'all'"
+                ).fetchone()
+                total_routes, total_distance, total_duration = row or (0, 0, 0)
                 
                 # 平均距离
                 avg_distance = total_distance / total_routes if total_routes > 0 else 0
                 
+                breakdown = {}
+                for scope in ('tag', 'city'):
+                    cursor.execute('''
+                        SELECT key, route_count, total_distance, total_duration FROM route_stats
+                        WHERE scope = ? ORDER BY route_count DESC, key LIMIT ?
+                    ''', (scope, top))
+                    breakdown[scope] = [
+                        {'name': key, 'total_routes': count, 'total_distance': round(distance, 2),
+                         'total_duration': duration}
+                        for key, count, distance, duration in cursor.fetchall()
+                    ]
+                
                 return {
                     'total_routes': total_routes,
                     'total_distance': round(total_distance, 2),
                     'total_duration': total_duration,
-                    'avg_distance': round(avg_distance, 2)
+                    'avg_distance': round(avg_distance, 2),
+                    'by_tag': breakdown['tag'],
+                    'by_city': breakdown['city']
                 }
                 
         except Exception as e:
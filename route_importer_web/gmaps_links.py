@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Google Maps导航链接生成
+根据规划好的路线生成步行导航链接，途经点超过上限时拆分为首尾相接的多段链接
+"""
+
+import threading
+import urllib.parse
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+DIRECTIONS_URL = 'https://www.google.com/maps/dir/'
+SEARCH_URL = 'https://www.google.com/maps/search/'
+
+# Google Maps URL 每个链接最多支持的途经点数量（不含起点和终点）
+MAX_WAYPOINTS = 9
+
+
+def place_location(place: Dict) -> Optional[str]:
+    """地点在链接中的位置参数：优先使用坐标，其次地址和名称"""
+    coords = place.get('coordinates') or {}
+    lat = coords.get('lat', coords.get('latitude'))
+    lng = coords.get('lng', coords.get('longitude'))
+    if lat is not None and lng is not None:
+        return f"{float(lat):.6f},{float(lng):.6f}"
+    return place.get('address') or place.get('name')
+
+
+def directions_url(origin: str, destination: str, waypoints: Optional[List[str]] = None,
+                   travelmode: str = 'walking') -> str:
+    """生成Google Maps导航链接"""
+    params = {
+        'api': '1',
+        'origin': origin,
+        'destination': destination,
+        'travelmode': travelmode
+    }
+    if waypoints:
+        params['waypoints'] = '|'.join(waypoints)
+    return DIRECTIONS_URL + '?' + urllib.parse.urlencode(params)
+
+
+def search_url(place: Dict) -> Optional[str]:
+    """生成单个地点的搜索链接"""
+    query = place_location(place)
+    if not query:
+        return None
+    return SEARCH_URL + '?' + urllib.parse.urlencode({'api': '1', 'query': query})
+
+
+def chunk_stops(stops: List, max_waypoints: int = MAX_WAYPOINTS) -> List[List]:
+    """
+    将途经站点拆分为首尾相接的多段，每段的终点是下一段的起点
+
+    Args:
+        stops: 按顺序的站点
+        max_waypoints: 每段最多的途经点数量
+
+    Returns:
+        每段的站点列表（包含起点和终点）
+    """
+    if len(stops) < 2:
+        return []
+    size = max(max_waypoints, 0) + 1
+    return [stops[i:i + size + 1] for i in range(0, len(stops) - 1, size)]
+
+
+def build_route_links(places: List[Dict], round_trip: bool = False,
+                      max_waypoints: int = MAX_WAYPOINTS, travelmode: str = 'walking') -> Dict:
+    """
+    为路线生成导航链接
+
+    Args:
+        places: 按访问顺序排列的地点
+        round_trip: 是否回到起点
+        max_waypoints: 每个链接最多的途经点数量
+        travelmode: 出行方式
+
+    Returns:
+        分段导航链接和各地点的搜索链接
+    """
+    stops = [place for place in places if place_location(place)]
+    if round_trip and len(stops) > 1:
+        stops = stops + [stops[0]]
+
+    legs = []
+    for index, leg in enumerate(chunk_stops(stops, max_waypoints), 1):
+        legs.append({
+            'leg': index,
+            'from': leg[0].get('name'),
+            'to': leg[-1].get('name'),
+            'stops': [place.get('name') for place in leg],
+            'url': directions_url(
+                place_location(leg[0]),
+                place_location(leg[-1]),
+                [place_location(place) for place in leg[1:-1]],
+                travelmode
+            )
+        })
+
+    return {
+        'legs': legs,
+        'places': [
+            {'name': place.get('name'), 'url': search_url(place)}
+            for place in places
+        ]
+    }
+
+
+class RouteLinkCache:
+    """按路线版本缓存生成的链接，路线更新后（updated_at变化）自动失效"""
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Args:
+            capacity: 最多缓存的路线链接数
+        """
+        self.capacity = capacity
+        self._links = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_links(self, route: Dict, round_trip: bool = False,
+                  max_waypoints: int = MAX_WAYPOINTS) -> Dict:
+        """获取路线的导航链接，未缓存时生成"""
+        key = (route.get('id'), route.get('updated_at'), round_trip, max_waypoints)
+        with self._lock:
+            if key in self._links:
+                self._links.move_to_end(key)
+                return self._links[key]
+
+        links = build_route_links(route.get('places') or [], round_trip, max_waypoints)
+        with self._lock:
+            self._links[key] = links
+            while len(self._links) > self.capacity:
+                self._links.popitem(last=False)
+        return links
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多日行程聚类器
+将没有Day标记的地点列表按空间距离拆分为多天路线
+"""
+
+import math
+from typing import List, Optional
+from route_optimizer import RouteOptimizer
+
+
+def validate_split_options(n_days: Optional[int] = None, max_day_minutes: float = 180):
+    """校验天数和每天步行时间上限，无效时抛出ValueError"""
+    if n_days is not None and (isinstance(n_days, bool) or not isinstance(n_days, int) or n_days < 1):
+        raise ValueError(f'days 必须是正整数: {n_days}')
+    if (isinstance(max_day_minutes, bool) or not isinstance(max_day_minutes, (int, float))
+            or not math.isfinite(max_day_minutes) or max_day_minutes <= 0):
+        raise ValueError(f'max_day_minutes 必须是正数: {max_day_minutes}')
+
+
+class ItineraryClusterer:
+    """带容量约束的k-medoids聚类
+
+    在距离矩阵上把地点分成k组，每组即为一天的行程；
+    自动确定天数时先倍增再二分查找，找到每天按优化顺序步行的时间都不超过预算的最少天数。
+    """
+
+    def __init__(self, walking_speed: float = 5.0, max_iterations: int = 20,
+                 balance_factor: float = 1.5, optimizer: Optional[RouteOptimizer] = None,
+                 probe_time_budget: float = 0.005):
+        """
+        Args:
+            walking_speed: 步行速度（公里/小时）
+            max_iterations: k-medoids最大迭代次数
+            balance_factor: 每组地点数上限相对平均值的倍数
+            optimizer: 用于排序每天地点的顺序优化器
+            probe_time_budget: 查找天数时每天顺序优化的时间预算（秒）；
+                只有最终选定的天数按优化器的默认预算完整优化
+        """
+        self.walking_speed = walking_speed
+        self.max_iterations = max_iterations
+        self.balance_factor = balance_factor
+        self.optimizer = optimizer or RouteOptimizer(time_budget=0.1)
+        self.probe_time_budget = probe_time_budget
+
+    def split(self, matrix: List[List[float]], n_days: Optional[int] = None,
+              max_day_minutes: float = 180) -> List[List[int]]:
+        """
+        拆分为多天行程
+
+        Args:
+            matrix: n×n 距离矩阵（公里）
+            n_days: 指定天数；为空时根据步行时间预算自动确定
+            max_day_minutes: 每天步行时间上限（分钟）
+
+        Returns:
+            每天的地点下标列表（已按访问顺序排列）
+        """
+        validate_split_options(n_days, max_day_minutes)
+        n = len(matrix)
+        if n == 0:
+            return []
+        # 坐标相同的地点只能作为一个中心，天数不超过不同位置的数量
+        distinct = self._distinct_count(matrix)
+
+        if n_days:
+            return self._ordered_clusters(matrix, self._cluster(matrix, min(n_days, distinct)))
+
+        # 以整体路线长度估算初始天数
+        whole = self.optimizer.optimize(matrix, time_budget=self.probe_time_budget)
+        k = min(distinct, max(1, math.ceil(self._minutes(self.optimizer.tour_length(matrix, whole)) / max_day_minutes)))
+        tried = {}
+
+        def fits(k):
+            # 短时间预算得到的顺序不优于完整优化的结果，满足预算的天数在完整优化后仍然满足
+            clusters = self._cluster(matrix, k)
+            tried[k] = clusters
+            days = self._ordered_clusters(matrix, clusters, time_budget=self.probe_time_budget)
+            return max(self._minutes(self.optimizer.tour_length(matrix, day)) for day in days) <= max_day_minutes
+
+        if fits(k):
+            return self._ordered_clusters(matrix, tried[k])
+        # 天数倍增直到满足预算，再在最后一次不满足和满足之间二分
+        low, high = k, k
+        while high < distinct:
+            low, high = high, min(distinct, high * 2)
+            if fits(high):
+                break
+        else:
+            return self._ordered_clusters(matrix, tried[high])
+        while high - low > 1:
+            middle = (low + high) // 2
+            if fits(middle):
+                high = middle
+            else:
+                low = middle
+        return self._ordered_clusters(matrix, tried[high])
+
+    def _distinct_count(self, matrix: List[List[float]]) -> int:
+        """不同位置（互相距离不为0）的地点数"""
+        representatives = []
+        for i in range(len(matrix)):
+            if all(matrix[i][r] > 0 for r in representatives):
+                representatives.append(i)
+        return len(representatives)
+
+    def _cluster(self, matrix: List[List[float]], k: int) -> List[List[int]]:
+        """k-medoids聚类，返回每组的地点下标"""
+        n = len(matrix)
+        capacity = max(1, math.ceil(self.balance_factor * n / k))
+        medoids = self._init_medoids(matrix, k)
+
+        clusters = []
+        for _ in range(self.max_iterations):
+            clusters = self._assign(matrix, medoids, capacity)
+            new_medoids = [
+                min(members, key=lambda c: sum(matrix[c][m] for m in members))
+                for members in clusters
+            ]
+            if new_medoids == medoids:
+                break
+            medoids = new_medoids
+        return [members for members in clusters if members]
+
+    def _init_medoids(self, matrix: List[List[float]], k: int) -> List[int]:
+        """最远点优先初始化（确定性的k-medoids++）"""
+        n = len(matrix)
+        first = min(range(n), key=lambda i: sum(matrix[i]))
+        medoids = [first]
+        nearest = list(matrix[first])
+        while len(medoids) < k:
+            # 只从非中心点中选择；与已有中心重合的点距离为0，不会先于其他位置被选中
+            candidate = max((i for i in range(n) if i not in medoids), key=lambda i: nearest[i])
+            medoids.append(candidate)
+            row = matrix[candidate]
+            nearest = [min(a, b) for a, b in zip(nearest, row)]
+        return medoids
+
+    def _assign(self, matrix: List[List[float]], medoids: List[int], capacity: int) -> List[List[int]]:
+        """按后悔值从大到小依次分配到最近且未满的中心"""
+        n = len(matrix)
+        k = len(medoids)
+        preferences = []
+        for i in range(n):
+            ranked = sorted(range(k), key=lambda c: matrix[i][medoids[c]])
+            regret = matrix[i][medoids[ranked[1]]] - matrix[i][medoids[ranked[0]]] if k > 1 else 0.0
+            preferences.append((regret, i, ranked))
+
+        clusters = [[] for _ in range(k)]
+        for c, m in enumerate(medoids):
+            clusters[c].append(m)
+        assigned = set(medoids)
+
+        for _, i, ranked in sorted(preferences, key=lambda p: -p[0]):
+            if i in assigned:
+                continue
+            for c in ranked:
+                if len(clusters[c]) < capacity:
+                    clusters[c].append(i)
+                    assigned.add(i)
+                    break
+        return clusters
+
+    def _ordered_clusters(self, matrix: List[List[float]], clusters: List[List[int]],
+                          time_budget: Optional[float] = None) -> List[List[int]]:
+        """对每组地点做顺序优化，并按原始出现顺序排列各天"""
+        days = []
+        for members in clusters:
+            sub = [[matrix[a][b] for b in members] for a in members]
+            order = self.optimizer.optimize(sub, time_budget=time_budget)
+            days.append([members[i] for i in order])
+        days.sort(key=min)
+        return days
+
+    def _minutes(self, distance_km: float) -> float:
+        """步行距离换算为分钟"""
+        return distance_km / self.walking_speed * 60
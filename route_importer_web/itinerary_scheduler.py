@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行程时间安排器
+按地点类别的默认停留时间和营业时间安排到达时间，午餐推荐的餐厅安排在午餐时段
+"""
+
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+# 各类别的默认停留时间（分钟）
+DEFAULT_DWELL_MINUTES = {
+    'attraction': 60,
+    'restaurant': 60,
+    'shopping': 45,
+    'park': 40,
+    'transportation': 5,
+    'other': 30
+}
+
+# 用餐时段（到达时间窗口）及描述中的关键词
+MEAL_WINDOWS = {
+    'lunch': ('11:30', '13:30'),
+    'dinner': ('17:30', '20:00')
+}
+MEAL_KEYWORDS = {
+    'lunch': ['午餐', '午饭', '中午', 'lunch'],
+    'dinner': ['晚餐', '晚饭', '晚上吃', 'dinner']
+}
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+_TIME_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})$')
+
+DEFAULT_HOURS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'opening_hours.json')
+
+
+def parse_time(value: str) -> int:
+    """将 HH:MM 转换为当天的分钟数（00:00 到 24:00），格式无效时抛出ValueError"""
+    match = _TIME_PATTERN.match(value) if isinstance(value, str) else None
+    if match:
+        minutes = int(match.group(1)) * 60 + int(match.group(2))
+        if int(match.group(2)) < 60 and minutes <= 24 * 60:
+            return minutes
+    raise ValueError(f'时间格式应为 HH:MM: {value}')
+
+
+def validate_schedule_options(start_time: Optional[str] = None, weekday: Optional[int] = None):
+    """校验出发时间和星期几，无效时抛出ValueError"""
+    if start_time is not None:
+        parse_time(start_time)
+    if weekday is not None and (isinstance(weekday, bool) or not isinstance(weekday, int) or not 0 <= weekday <= 6):
+        raise ValueError(f'weekday 必须是0到6之间的整数（0为周一）: {weekday}')
+
+
+def format_time(minutes: float) -> str:
+    """将当天的分钟数转换为 HH:MM"""
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class ItineraryScheduler:
+    """基于插入启发式的时间窗行程安排器
+
+    每一步在所有可行的插入位置中选择使当天结束时间增加最少的地点和位置，
+    用推迟量（push-forward）检查插入后后续地点是否仍在营业时间内。
+    """
+
+    def __init__(self, hours_path: Optional[str] = None, walking_speed: float = 5.0,
+                 dwell_minutes: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            hours_path: 营业时间数据文件路径
+            walking_speed: 步行速度（公里/小时）
+            dwell_minutes: 覆盖默认的类别停留时间
+        """
+        self.walking_speed = walking_speed
+        self.dwell_minutes = dict(DEFAULT_DWELL_MINUTES)
+        if dwell_minutes:
+            self.dwell_minutes.update(dwell_minutes)
+        self.opening_hours = self.load_opening_hours(hours_path or DEFAULT_HOURS_PATH)
+
+    def load_opening_hours(self, path: str) -> Dict:
+        """加载营业时间数据，文件不存在时返回空数据"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            print(f"营业时间数据不存在: {path}")
+            return {}
+
+    def schedule(self, places: List[Dict], matrix: List[List[float]], start_time: str = '09:00',
+                 end_time: str = '21:00', weekday: Optional[int] = None,
+                 start_index: Optional[int] = None) -> Dict:
+        """
+        安排一天的行程
+
+        Args:
+            places: 地点列表
+            matrix: 地点间距离矩阵（公里）
+            start_time: 出发时间 HH:MM
+            end_time: 当天行程最晚结束时间 HH:MM
+            weekday: 星期几（0为周一），用于判断休息日
+            start_index: 固定的第一个地点下标
+
+        Returns:
+            访问顺序、每个地点的到达/离开时间和无法安排的地点
+        """
+        validate_schedule_options(start_time, weekday)
+        day_start = parse_time(start_time)
+        day_end = parse_time(end_time)
+        travel = [[d / self.walking_speed * 60 for d in row] for row in matrix]
+        dwell = [self.dwell_minutes.get(p.get('category'), self.dwell_minutes['other']) for p in places]
+        windows = [self._time_window(p, dwell[i], weekday) for i, p in enumerate(places)]
+
+        route = []
+        pending = set(range(len(places)))
+        if start_index is not None and windows[start_index] is not None:
+            route.append(start_index)
+            pending.discard(start_index)
+
+        while pending:
+            starts, latest = self._route_times(route, travel, dwell, windows, day_start, day_end)
+            best = None
+            for u in pending:
+                if windows[u] is None:
+                    continue
+                first_position = 1 if start_index is not None and route and route[0] == start_index else 0
+                for position in range(first_position, len(route) + 1):
+                    cost = self._insertion_cost(route, starts, latest, u, position, travel, dwell,
+                                                windows, day_start, day_end)
+                    # 成本相同时优先安排时间窗更紧的地点
+                    if cost is not None and (best is None or (cost, windows[u][1]) < (best[0], windows[best[1]][1])):
+                        best = (cost, u, position)
+            if best is None:
+                break
+            _, u, position = best
+            route.insert(position, u)
+            pending.discard(u)
+
+        starts, _ = self._route_times(route, travel, dwell, windows, day_start, day_end)
+        schedule = []
+        walking = 0.0
+        for k, i in enumerate(route):
+            arrival = day_start if k == 0 else starts[k - 1] + dwell[route[k - 1]] + travel[route[k - 1]][i]
+            if k > 0:
+                walking += travel[route[k - 1]][i]
+            schedule.append({
+                'index': i,
+                'name': places[i].get('name'),
+                'arrival': format_time(arrival),
+                'start': format_time(starts[k]),
+                'departure': format_time(starts[k] + dwell[i]),
+                'wait': int(round(starts[k] - arrival)),
+                'dwell': dwell[i]
+            })
+
+        finish = starts[-1] + dwell[route[-1]] if route else day_start
+        return {
+            'order': route,
+            'schedule': schedule,
+            'unscheduled': sorted(set(range(len(places))) - set(route)),
+            'walking_minutes': int(walking),
+            'total_minutes': int(round(finish - day_start))
+        }
+
+    def _time_window(self, place: Dict, dwell: int, weekday: Optional[int]) -> Optional[Tuple[int, int]]:
+        """计算地点的可开始时间窗（最早, 最晚），当天休息时返回None"""
+        hours = (self.opening_hours.get('places') or {}).get(place.get('name'))
+        if hours is None:
+            defaults = self.opening_hours.get('category_defaults') or {}
+            hours = defaults.get(place.get('category')) or defaults.get('other') or {'open': '00:00', 'close': '24:00'}
+
+        if weekday is not None and WEEKDAYS[weekday] in hours.get('closed_days', []):
+            return None
+
+        earliest = parse_time(hours['open'])
+        latest = parse_time(hours['close']) - dwell
+
+        # 用餐推荐的餐厅限定在用餐时段到达
+        if place.get('category') == 'restaurant':
+            text = f"{place.get('description', '')} {place.get('name', '')}".lower()
+            for meal, keywords in MEAL_KEYWORDS.items():
+                if any(keyword in text for keyword in keywords):
+                    meal_start, meal_end = (parse_time(t) for t in MEAL_WINDOWS[meal])
+                    earliest, latest = max(earliest, meal_start), min(latest, meal_end)
+                    break
+
+        return (earliest, latest) if earliest <= latest else None
+
+    def _route_times(self, route: List[int], travel, dwell, windows, day_start: int,
+                     day_end: int) -> Tuple[List[float], List[float]]:
+        """计算当前路线每个地点的开始时间与不影响后续地点的最晚开始时间"""
+        starts = []
+        previous = None
+        for i in route:
+            arrival = day_start if previous is None else starts[-1] + dwell[previous] + travel[previous][i]
+            starts.append(max(arrival, windows[i][0]))
+            previous = i
+
+        latest = [0.0] * len(route)
+        for k in range(len(route) - 1, -1, -1):
+            i = route[k]
+            bound = min(windows[i][1], day_end - dwell[i])
+            if k + 1 < len(route):
+                bound = min(bound, latest[k + 1] - dwell[i] - travel[i][route[k + 1]])
+            latest[k] = bound
+        return starts, latest
+
+    def _insertion_cost(self, route, starts, latest, u, position, travel, dwell, windows,
+                        day_start: int, day_end: int) -> Optional[float]:
+        """计算将u插入position处使结束时间增加的分钟数，不可行时返回None"""
+        if position == 0:
+            arrival = day_start
+        else:
+            prev = route[position - 1]
+            arrival = starts[position - 1] + dwell[prev] + travel[prev][u]
+        start_u = max(arrival, windows[u][0])
+        if start_u > windows[u][1] or start_u + dwell[u] > day_end:
+            return None
+
+        old_finish = starts[-1] + dwell[route[-1]] if route else day_start
+        if position == len(route):
+            return start_u + dwell[u] - old_finish
+
+        nxt = route[position]
+        new_start = max(start_u + dwell[u] + travel[u][nxt], windows[nxt][0])
+        if new_start > latest[position]:
+            return None
+
+        # 推迟量沿后续地点传播，遇到等待时间会被吸收
+        shift = new_start - starts[position]
+        k = position
+        while shift > 0 and k + 1 < len(route):
+            i, j = route[k], route[k + 1]
+            next_start = max(starts[k] + shift + dwell[i] + travel[i][j], windows[j][0])
+            shift = next_start - starts[k + 1]
+            k += 1
+        if k + 1 < len(route):
+            shift = 0.0
+        return max(shift, 0.0)
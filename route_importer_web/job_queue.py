@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台任务队列
+耗时的笔记抓取和AI解析不再占用Web工作进程：提交后立即返回任务ID，由固定数量的后台线程执行，
+客户端轮询任务状态，或通过Server-Sent Events接收各阶段的进度事件。
+任务保存在SQLite中，服务重启后未完成的任务会继续执行。
+
+多个进程（如gunicorn的多个工作进程）可以共用同一个任务表：领取任务是一条原子的UPDATE，
+执行中的任务定期续租，进程退出后租约过期，任务由其他工作线程重新领取。
+进度事件同样写入数据库，事件流请求可以由任意进程处理。
+
+提交时可指定合并键（如笔记ID）：同一合并键已有排队或执行中的任务时不再新建，
+直接返回该任务ID，同时提交的请求共享一次抓取和AI解析。未完成任务上的部分唯一索引
+充当跨进程的锁表，多个线程、多个进程同时提交也只会产生一个任务。
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+
+from db_connection import ConnectionManager
+from route_ids import new_ulid
+
+JOBS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL,
+        payload TEXT,
+        result TEXT,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        worker TEXT,
+        lease_until TEXT,
+        dedup_key TEXT,
+        created_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_jobs_pending ON jobs(status, lease_until)',
+    '''
+    CREATE TABLE IF NOT EXISTS job_events (
+        job_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        stage TEXT NOT NULL,
+        data TEXT,
+        created_at TEXT NOT NULL,
+        PRIMARY KEY (job_id, seq)
+    ) WITHOUT ROWID
+    '''
+]
+
+# 同一类型、同一合并键最多一个未完成的任务
+_INFLIGHT_INDEX = '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_inflight ON jobs(kind, dedup_key)
+    WHERE dedup_key IS NOT NULL AND status IN ('queued', 'running')
+'''
+
+# 任务状态
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# 任务结束的事件，事件流在此之后关闭
+FINAL_STAGES = (SUCCEEDED, FAILED)
+
+# 追加一条进度事件，序号在任务内递增
+_EVENT_SQL = '''
+    INSERT INTO job_events (job_id, seq, stage, data, created_at)
+    SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ? FROM job_events WHERE job_id = ?
+'''
+
+# 领取任务：排队中的任务，或租约已过期（执行进程已退出）的任务，按提交顺序
+_CLAIM_SQL = '''
+    UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1,
+        started_at = COALESCE(started_at, ?)
+    WHERE id = (
+        SELECT id FROM jobs
+        WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)
+        ORDER BY id
+        LIMIT 1
+    )
+    RETURNING id, kind, payload, attempts
+'''
+
+
+class JobQueue:
+    """基于SQLite的持久化任务队列 + 固定大小的工作线程池"""
+
+    def __init__(self, db_path: str, workers: int = 2, lease_seconds: float = 60.0,
+                 max_attempts: int = 3, poll_interval: float = 1.0, retention_days: int = 7):
+        """
+        Args:
+            db_path: 数据库文件路径（可与路线数据库共用）
+            workers: 每个进程的工作线程数
+            lease_seconds: 任务租约时长，执行期间每1/3租约续租一次
+            max_attempts: 进程异常退出导致任务中断时的最多执行次数
+            poll_interval: 空闲时检查新任务的间隔（秒），本进程提交的任务会立即唤醒工作线程
+            retention_days: 已完成任务的保留天数
+        """
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retention_days = retention_days
+        self.connections = ConnectionManager(db_path)
+        self._handlers: Dict[str, Callable[[Dict, Callable], Dict]] = {}
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+        with self.connections.connection() as conn:
+            for statement in JOBS_SCHEMA:
+                conn.execute(statement)
+            # 早期版本的任务表没有合并键
+            if 'dedup_key' not in {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}:
+                conn.execute('ALTER TABLE jobs ADD COLUMN dedup_key TEXT')
+            conn.execute(_INFLIGHT_INDEX)
+
+    def register(self, kind: str, handler: Callable[[Dict, Callable], Dict]):
+        """
+        注册任务处理函数
+
+        处理函数接收任务参数和进度回调 progress(stage, data=None)，返回可JSON序列化的结果，失败时抛出异常
+        """
+        self._handlers[kind] = handler
+
+    def start(self):
+        """启动工作线程（每个进程一次；fork后的子进程重新启动）"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+        self.purge()
+
+    def stop(self, timeout: float = 5.0):
+        """停止工作线程（执行中的任务会在租约过期后被重新领取）"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._pid = None
+
+    def submit(self, kind: str, payload: Dict, key: Optional[str] = None) -> str:
+        """
+        提交任务，返回任务ID
+
+        Args:
+            kind: 任务类型
+            payload: 任务参数
+            key: 合并键；同一类型、同一合并键已有未完成的任务时返回该任务的ID，不新建任务
+        """
+        if kind not in self._handlers:
+            raise ValueError(f'未知的任务类型: {kind}')
+        self.start()
+        job_id = new_ulid()
+        with self.connections.connection() as conn:
+            inserted = conn.execute(
+                'INSERT OR IGNORE INTO jobs (id, kind, status, payload, dedup_key, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, kind, QUEUED, json.dumps(payload, ensure_ascii=False), key, datetime.now().isoformat())
+            ).rowcount
+            if not inserted:
+                # 插入已取得写锁，这里读到的未完成任务在提交前不会结束
+                return conn.execute(
+                    "SELECT id FROM jobs WHERE kind = ? AND dedup_key = ? AND status IN ('queued', 'running')",
+                    (kind, key)
+                ).fetchone()[0]
+            # 与任务在同一事务中写入，保证 queued 总是第一条事件
+            self._insert_event(conn, job_id, QUEUED)
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """查询任务状态和结果，任务不存在时返回None"""
+        row = self.connections.get().execute(
+            'SELECT id, kind, status, result, error, attempts, created_at, started_at, finished_at FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(['id', 'kind', 'status', 'result', 'error', 'attempts', 'created_at', 'started_at', 'finished_at'], row))
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        if job['status'] == QUEUED:
+            job['position'] = self.connections.get().execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?", (job_id,)
+            ).fetchone()[0]
+        return job
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict]:
+        """查询任务序号大于after的进度事件"""
+        rows = self.connections.get().execute(
+            'SELECT seq, stage, data, created_at FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq',
+            (job_id, after)
+        ).fetchall()
+        return [
+            {'seq': seq, 'stage': stage, 'data': json.loads(data) if data else None, 'created_at': created_at}
+            for seq, stage, data, created_at in rows
+        ]
+
+    def stream_events(self, job_id: str, after: int = 0, poll_interval: float = 0.5,
+                      keepalive: float = 15.0, max_duration: Optional[float] = 30.0) -> Iterator[str]:
+        """
+        以Server-Sent Events格式输出任务的进度事件，任务结束后关闭
+
+        每个连接在整个输出期间占用一个web worker，连接最长保持 max_duration 秒，
+        之后关闭，由浏览器按 Last-Event-ID 自动重连继续。
+
+        Args:
+            job_id: 任务ID
+            after: 从该序号之后开始（断线重连时为Last-Event-ID）
+            poll_interval: 检查新事件的间隔（秒）
+            keepalive: 没有新事件时发送注释行的间隔（秒），防止代理断开空闲连接
+            max_duration: 单个连接的最长时间（秒），为空时直到任务结束
+        """
+        # 告诉浏览器断线后的重连间隔
+        yield 'retry: 3000\n\n'
+        deadline = time.monotonic() + max_duration if max_duration is not None else None
+        idle = 0.0
+        while True:
+            events = self.events(job_id, after)
+            for event in events:
+                after = event['seq']
+                data = json.dumps(event['data'] or {}, ensure_ascii=False)
+                yield f"id: {event['seq']}\nevent: {event['stage']}\ndata: {data}\n\n"
+                if event['stage'] in FINAL_STAGES:
+                    return
+            if events:
+                idle = 0.0
+                continue
+            # 没有结束事件的已结束任务（如早期版本完成的任务）：按任务状态补发结束事件
+            job = self.connections.get().execute('SELECT status, error FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if job is None or job[0] in FINAL_STAGES:
+                if self.events(job_id, after):
+                    continue
+                status, error = job or (FAILED, '任务不存在')
+                data = json.dumps({'error': error} if error else {}, ensure_ascii=False)
+                yield f"event: {status}\ndata: {data}\n\n"
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                # 主动关闭时让浏览器尽快重连
+                yield 'retry: 500\n\n'
+                return
+            time.sleep(poll_interval)
+            idle += poll_interval
+            if idle >= keepalive:
+                idle = 0.0
+                yield ': keep-alive\n\n'
+
+    def purge(self):
+        """删除超过保留期的已完成任务"""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        with self.connections.connection() as conn:
+            conn.execute("DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?", (cutoff,))
+            conn.execute('DELETE FROM job_events WHERE job_id NOT IN (SELECT id FROM jobs)')
+
+    def run_pending(self) -> int:
+        """在当前线程中执行所有可领取的任务（用于测试和命令行），返回执行的任务数"""
+        count = 0
+        while self._run_one():
+            count += 1
+        return count
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                if self._run_one():
+                    continue
+            except Exception as e:
+                print(f"任务队列出错: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _run_one(self) -> bool:
+        """领取并执行一个任务，没有可执行的任务时返回False"""
+        now = datetime.now()
+        worker = f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+        with self.connections.connection() as conn:
+            row = conn.execute(_CLAIM_SQL, (
+                worker, (now + timedelta(seconds=self.lease_seconds)).isoformat(), now.isoformat(), now.isoformat()
+            )).fetchone()
+            if row is not None:
+                self._insert_event(conn, row[0], RUNNING, {'attempt': row[3]})
+        if row is None:
+            return False
+
+        job_id, kind, payload, attempts = row
+        if attempts > self.max_attempts:
+            self._finish(job_id, worker, FAILED, error='任务多次中断，已放弃')
+            return True
+        handler = self._handlers.get(kind)
+        if handler is None:
+            self._finish(job_id, worker, FAILED, error=f'未知的任务类型: {kind}')
+            return True
+
+        renewing = threading.Event()
+        renewer = threading.Thread(target=self._renew, args=(job_id, worker, renewing), daemon=True)
+        renewer.start()
+        try:
+            result = handler(json.loads(payload) if payload else {},
+                             lambda stage, data=None: self._record(job_id, stage, data))
+            self._finish(job_id, worker, SUCCEEDED, result=result)
+        except Exception as e:
+            self._finish(job_id, worker, FAILED, error=str(e))
+        finally:
+            renewing.set()
+            renewer.join()
+        return True
+
+    def _renew(self, job_id: str, worker: str, done: threading.Event):
+        """任务执行期间定期续租"""
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                with self.connections.connection() as conn:
+                    conn.execute(
+                        "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                        ((datetime.now() + timedelta(seconds=self.lease_seconds)).isoformat(), job_id, worker)
+                    )
+            except Exception as e:
+                print(f"任务续租失败: {e}")
+
+    @staticmethod
+    def _insert_event(conn, job_id: str, stage: str, data: Optional[Dict] = None):
+        """在调用方的事务中追加进度事件"""
+        conn.execute(_EVENT_SQL, (job_id, stage, json.dumps(data, ensure_ascii=False) if data is not None else None,
+                                  datetime.now().isoformat(), job_id))
+
+    def _record(self, job_id: str, stage: str, data: Optional[Dict] = None):
+        """记录处理函数报告的进度事件；记录失败不影响任务执行"""
+        try:
+            with self.connections.connection() as conn:
+                self._insert_event(conn, job_id, stage, data)
+        except Exception as e:
+            print(f"记录任务进度失败: {e}")
+
+    def _finish(self, job_id: str, worker: str, status: str, result=None, error: Optional[str] = None) -> bool:
+        """
+        写入任务结果；租约已过期并被其他工作线程重新领取（或任务已结束）时不写入
+
+        Returns:
+            是否写入了结果
+        """
+        # 状态和结束事件在同一事务中写入，事件流总能读到结束事件
+        with self.connections.connection() as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, finished_at = ? '
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+                 datetime.now().isoformat(), job_id, worker)
+            )
+            if cursor.rowcount == 0:
+                print(f"任务租约已失效，丢弃结果: {job_id}")
+                return False
+            self._insert_event(conn, job_id, status, {'error': error} if error else None)
+        return True
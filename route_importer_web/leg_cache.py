@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+路段距离缓存
+进程内LRU + SQLite持久化存储，热门区域的地点对距离只需计算一次
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from db_connection import ConnectionManager
+
+
+def poi_id(place: Dict) -> Optional[str]:
+    """
+    生成地点的稳定ID：优先使用地点自带的poi_id，否则由名称和坐标（约1米精度）计算
+    """
+    if place.get('poi_id'):
+        return str(place['poi_id'])
+    coords = place.get('coordinates') or {}
+    lat = coords.get('lat', coords.get('latitude'))
+    lng = coords.get('lng', coords.get('longitude'))
+    if lat is None or lng is None:
+        return None
+    key = f"{place.get('name', '')}|{float(lat):.5f}|{float(lng):.5f}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+class LegCache:
+    """路段距离缓存
+
+    以 (poi_id_a, poi_id_b, mode) 为键，步行距离对称，内部按ID排序后存储。
+    """
+
+    def __init__(self, db_path: str = 'leg_cache.db', capacity: int = 100000):
+        """
+        Args:
+            db_path: SQLite持久化文件路径
+            capacity: 进程内LRU缓存的最大条数
+        """
+        self.db_path = db_path
+        self.capacity = capacity
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.connections = ConnectionManager(db_path)
+        self.init_database()
+
+    def init_database(self):
+        """初始化缓存表"""
+        with self.connections.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS legs (
+                    mode TEXT NOT NULL,
+                    poi_a TEXT NOT NULL,
+                    poi_b TEXT NOT NULL,
+                    distance REAL NOT NULL,
+                    PRIMARY KEY (mode, poi_a, poi_b)
+                ) WITHOUT ROWID
+            ''')
+            conn.commit()
+
+    def get(self, poi_a: str, poi_b: str, mode: str) -> Optional[float]:
+        """读取单个路段距离（公里），未缓存时返回None"""
+        if poi_a == poi_b:
+            return 0.0
+        key = self._key(poi_a, poi_b, mode)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+
+        with self.connections.connection() as conn:
+            row = conn.execute(
+                'SELECT distance FROM legs WHERE mode = ? AND poi_a = ? AND poi_b = ?',
+                (key[2], key[0], key[1])
+            ).fetchone()
+        if row is None:
+            return None
+        self._remember({key: row[0]})
+        return row[0]
+
+    def put(self, poi_a: str, poi_b: str, mode: str, distance: float):
+        """写入单个路段距离（公里）"""
+        self.put_many({(poi_a, poi_b): distance}, mode)
+
+    def put_many(self, legs: Dict[Tuple[str, str], float], mode: str):
+        """批量写入路段距离"""
+        entries = {self._key(a, b, mode): d for (a, b), d in legs.items() if a != b and d is not None}
+        if not entries:
+            return
+        self._remember(entries)
+        with self.connections.connection() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO legs (mode, poi_a, poi_b, distance) VALUES (?, ?, ?, ?)',
+                [(m, a, b, d) for (a, b, m), d in entries.items()]
+            )
+            conn.commit()
+
+    def get_matrix(self, poi_ids: List[str], mode: str,
+                   compute: Callable[[List[Tuple[int, int]]], Dict[Tuple[int, int], float]]) -> List[List[float]]:
+        """
+        获取距离矩阵，只计算缺失的单元
+
+        Args:
+            poi_ids: 地点ID列表
+            mode: 距离模式（如 straight / road）
+            compute: 计算缺失单元的回调，参数为缺失的 (i, j) 下标对（i < j），返回 {(i, j): 公里}
+
+        Returns:
+            n×n 对称距离矩阵（公里）
+        """
+        n = len(poi_ids)
+        matrix = [[0.0] * n for _ in range(n)]
+        known = self._lookup_many(set(poi_ids), mode)
+
+        missing = []
+        for i in range(n):
+            for j in range(i + 1, n):
+                d = 0.0 if poi_ids[i] == poi_ids[j] else known.get(self._key(poi_ids[i], poi_ids[j], mode))
+                if d is None:
+                    missing.append((i, j))
+                else:
+                    matrix[i][j] = matrix[j][i] = d
+
+        if missing:
+            computed = compute(missing)
+            for (i, j), d in computed.items():
+                matrix[i][j] = matrix[j][i] = d
+            self.put_many({(poi_ids[i], poi_ids[j]): d for (i, j), d in computed.items()}, mode)
+
+        return matrix
+
+    def _lookup_many(self, ids: Iterable[str], mode: str) -> Dict[Tuple[str, str, str], float]:
+        """批量读取一组地点之间的所有已缓存路段"""
+        ids = sorted(ids)
+        found = {}
+        with self._lock:
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    key = (a, b, mode)
+                    if key in self._lru:
+                        self._lru.move_to_end(key)
+                        found[key] = self._lru[key]
+
+        pair_count = len(ids) * (len(ids) - 1) // 2
+        if len(found) == pair_count:
+            return found
+
+        # 通过临时表连接查询 poi_a 与 poi_b 都在集合内的路段，不受SQL参数数量限制
+        from_db = {}
+        with self.connections.connection() as conn:
+            # 连接是长连接，临时表会保留，使用前先清空
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (id TEXT PRIMARY KEY)')
+            conn.execute('DELETE FROM wanted')
+            conn.executemany('INSERT INTO wanted (id) VALUES (?)', [(i,) for i in ids])
+            rows = conn.execute('''
+                SELECT l.poi_a, l.poi_b, l.distance FROM legs l
+                JOIN wanted a ON l.poi_a = a.id
+                JOIN wanted b ON l.poi_b = b.id
+                WHERE l.mode = ?
+            ''', (mode,))
+            for a, b, d in rows:
+                from_db[(a, b, mode)] = d
+
+        self._remember(from_db)
+        found.update(from_db)
+        return found
+
+    def _remember(self, entries: Dict[Tuple[str, str, str], float]):
+        """写入进程内LRU，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            for key, d in entries.items():
+                self._lru[key] = d
+                self._lru.move_to_end(key)
+            while len(self._lru) > self.capacity:
+                self._lru.popitem(last=False)
+
+    @staticmethod
+    def _key(poi_a: str, poi_b: str, mode: str) -> Tuple[str, str, str]:
+        """距离对称，按ID排序生成规范键"""
+        return (poi_a, poi_b, mode) if poi_a <= poi_b else (poi_b, poi_a, mode)
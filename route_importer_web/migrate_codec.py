@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储编码迁移工具
+切换数据库的存储编码，训练压缩字典并按新编码重写所有路线的 places/route 字段
+
+用法: python migrate_codec.py [数据库路径，默认routes.db] [编码，默认json+zlib] [--vacuum]
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+from payload_codec import available_codecs
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    db_path = args[0] if args else 'routes.db'
+    codec = args[1] if len(args) > 1 else 'json+zlib'
+
+    if codec not in available_codecs():
+        print(f"❌ 不支持的编码: {codec}，当前可用: {', '.join(available_codecs())}")
+        sys.exit(1)
+    if not os.path.exists(db_path):
+        print(f"❌ 数据库不存在: {db_path}")
+        sys.exit(1)
+
+    size_before = os.path.getsize(db_path)
+    db = Database(db_path)
+    print(f"🔄 {db.codec.name} → {codec}")
+    db.migrate_codec(codec)
+
+    if '--vacuum' in sys.argv:
+        # VACUUM释放重写后空出的页面，需要独占数据库
+        conn = db.connections.get()
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('VACUUM')
+        print(f"📦 数据库大小: {size_before / 1024:.0f}KB → {os.path.getsize(db_path) / 1024:.0f}KB")
+    db.connections.close_all()
+
+
+if __name__ == '__main__':
+    main()
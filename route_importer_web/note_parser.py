@@ -8,7 +8,7 @@
 import requests
 from bs4 import BeautifulSoup
 import re
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import logging
 
 class XiaohongshuNoteParser:
@@ -27,16 +27,33 @@ class XiaohongshuNoteParser:
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
     
-    def parse_note(self, url: str) -> Optional[Dict]:
+    def parse_note(self, url: str, progress: Optional[Callable] = None) -> Optional[Dict]:
         """
         解析小红书笔记
         
         Args:
             url: 小红书笔记链接
+            progress: 进度回调 progress(stage, data)，报告 fetched、text_extracted 阶段
             
         Returns:
             解析后的笔记数据，包含地点、标签等信息
         """
+        text = self.fetch_text(url, progress=progress)
+        if not text:
+            return None
+        return self.parse_text(text, url)
+    
+    def fetch_text(self, url: str, progress: Optional[Callable] = None) -> Optional[str]:
+        """
+        获取小红书笔记网页并提取全部文本
+        
+        Args:
+            url: 小红书笔记链接
+            progress: 进度回调 progress(stage, data)，报告 fetched、text_extracted 阶段
+            
+        Returns:
+            提取的文本，获取失败时返回None
+        """
         try:
             self.logger.info(f"开始解析小红书笔记: {url}")
             
@@ -46,6 +63,8 @@ class XiaohongshuNoteParser:
             
             self.logger.info(f"获取网页成功，状态码: {response.status_code}")
             self.logger.info(f"最终URL: {response.url}")
+            if progress:
+                progress('fetched', {'status': response.status_code, 'url': response.url})
             
             # 解析HTML
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -53,14 +72,27 @@ class XiaohongshuNoteParser:
             # 使用get_text()方法提取所有文本（与测试脚本保持一致）
             all_text = soup.get_text()
             self.logger.info(f"提取的文本长度: {len(all_text)} 字符")
+            if progress:
+                progress('text_extracted', {'length': len(all_text)})
+            return all_text
+                
+        except Exception as e:
+            self.logger.error(f"获取小红书笔记失败: {str(e)}")
+            return None
+    
+    def parse_text(self, text: str, url: str = "") -> Optional[Dict]:
+        """
+        从已提取的笔记文本中解析笔记数据
+        
+        Args:
+            text: fetch_text 提取的文本
+            url: 原始链接
             
-            # 保存提取的文本用于调试
-            with open('debug_extracted_text.txt', 'w', encoding='utf-8') as f:
-                f.write(all_text)
-            self.logger.info("已保存提取的文本到 debug_extracted_text.txt")
-            
-            # 提取笔记信息
-            note_data = self._extract_note_data(all_text, url)
+        Returns:
+            解析后的笔记数据，没有地点时返回None
+        """
+        try:
+            note_data = self._extract_note_data(text, url)
             
             if note_data:
                 self.logger.info(f"成功解析笔记: {note_data.get('title', '未知标题')}")
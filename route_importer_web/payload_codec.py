@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+路线数据的存储编码
+places / route 等较大的字段可以选择压缩存储：
+- json：原始JSON文本（默认，兼容旧数据）
+- json+zlib：JSON + zlib预设字典压缩（只依赖标准库）
+- msgpack+zstd：MessagePack + zstd训练字典压缩（需要安装 msgpack 和 zstandard）
+
+压缩后的值为BLOB，首字节标识编码、随后两个字节为字典ID，因此同一数据库中新旧编码的行可以混合存在。
+"""
+
+import json
+import struct
+import zlib
+from typing import Dict, List, Optional
+
+try:
+    import msgpack
+    import zstandard
+except ImportError:
+    msgpack = None
+    zstandard = None
+
+# BLOB头部：编码标识(1字节) + 字典ID(2字节，0表示无字典)
+_HEADER = struct.Struct('<cH')
+_ZLIB_TAG = b'Z'
+_ZSTD_TAG = b'M'
+
+# zlib预设字典最多使用32KB
+ZLIB_MAX_DICTIONARY = 32768
+
+
+class JsonCodec:
+    """原始JSON文本"""
+
+    name = 'json'
+
+    def __init__(self, dictionary: Optional[bytes] = None, dictionary_id: int = 0):
+        self.dictionary_id = 0
+
+    def encode(self, value):
+        return json.dumps(value, ensure_ascii=False)
+
+    def serialize(self, value) -> bytes:
+        """训练字典使用的未压缩字节"""
+        return self.encode(value).encode('utf-8')
+
+
+class ZlibJsonCodec:
+    """JSON + zlib（raw deflate），可使用预设字典"""
+
+    name = 'json+zlib'
+    tag = _ZLIB_TAG
+
+    def __init__(self, dictionary: Optional[bytes] = None, dictionary_id: int = 0, level: int = 6):
+        self.dictionary = dictionary[-ZLIB_MAX_DICTIONARY:] if dictionary else None
+        self.dictionary_id = dictionary_id if dictionary else 0
+        self.level = level
+
+    def serialize(self, value) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def encode(self, value) -> bytes:
+        if self.dictionary:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=self.dictionary)
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        body = compressor.compress(self.serialize(value)) + compressor.flush()
+        return _HEADER.pack(self.tag, self.dictionary_id) + body
+
+    @staticmethod
+    def decode_body(body: bytes, dictionary: Optional[bytes]):
+        if dictionary:
+            decompressor = zlib.decompressobj(-15, zdict=dictionary[-ZLIB_MAX_DICTIONARY:])
+        else:
+            decompressor = zlib.decompressobj(-15)
+        return json.loads(decompressor.decompress(body) + decompressor.flush())
+
+
+class MsgpackZstdCodec:
+    """MessagePack + zstd，可使用训练得到的字典"""
+
+    name = 'msgpack+zstd'
+    tag = _ZSTD_TAG
+
+    def __init__(self, dictionary: Optional[bytes] = None, dictionary_id: int = 0, level: int = 9):
+        if msgpack is None or zstandard is None:
+            raise ValueError('msgpack+zstd 编码需要安装 msgpack 和 zstandard')
+        self.dictionary_id = dictionary_id if dictionary else 0
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        self._compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+
+    def serialize(self, value) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def encode(self, value) -> bytes:
+        return _HEADER.pack(self.tag, self.dictionary_id) + self._compressor.compress(self.serialize(value))
+
+    @staticmethod
+    def decode_body(body: bytes, dictionary: Optional[bytes]):
+        if msgpack is None or zstandard is None:
+            raise ValueError('读取msgpack+zstd编码的数据需要安装 msgpack 和 zstandard')
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        data = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(body)
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    ZlibJsonCodec.name: ZlibJsonCodec,
+    MsgpackZstdCodec.name: MsgpackZstdCodec
+}
+
+_DECODERS = {
+    _ZLIB_TAG: ZlibJsonCodec.decode_body,
+    _ZSTD_TAG: MsgpackZstdCodec.decode_body
+}
+
+
+def available_codecs() -> List[str]:
+    """当前环境可用的编码"""
+    names = [JsonCodec.name, ZlibJsonCodec.name]
+    if msgpack is not None and zstandard is not None:
+        names.append(MsgpackZstdCodec.name)
+    return names
+
+
+def get_codec(name: str, dictionary: Optional[bytes] = None, dictionary_id: int = 0):
+    """按名称创建编码器"""
+    if name not in CODECS:
+        raise ValueError(f'不支持的存储编码: {name}')
+    return CODECS[name](dictionary, dictionary_id)
+
+
+def dictionary_id(value) -> int:
+    """压缩值使用的字典ID，JSON文本或无字典时为0"""
+    if isinstance(value, (bytes, bytearray, memoryview)) and len(value) >= _HEADER.size:
+        return _HEADER.unpack_from(value)[1]
+    return 0
+
+
+def decode(value, dictionaries: Optional[Dict[int, bytes]] = None):
+    """
+    解码字段值：文本按JSON解析，BLOB按头部标识的编码和字典解码
+
+    Args:
+        value: 数据库中的字段值
+        dictionaries: {字典ID: 字典数据}
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return json.loads(value)
+    value = bytes(value)
+    tag, dictionary_id = _HEADER.unpack_from(value)
+    decoder = _DECODERS.get(tag)
+    if decoder is None:
+        raise ValueError(f'未知的存储编码标识: {tag!r}')
+    dictionary = None
+    if dictionary_id:
+        dictionary = (dictionaries or {}).get(dictionary_id)
+        if dictionary is None:
+            raise ValueError(f'缺少压缩字典: {dictionary_id}')
+    return decoder(value[_HEADER.size:], dictionary)
+
+
+def train_dictionary(name: str, samples: List[bytes], size: int = ZLIB_MAX_DICTIONARY) -> Optional[bytes]:
+    """
+    根据样本训练压缩字典
+
+    zstd使用自带的字典训练；zlib的预设字典为样本中出现最频繁的片段，
+    按频率升序排列（deflate引用距离越近越省空间，最常用的片段放在字典末尾）。
+    """
+    samples = [s for s in samples if s]
+    if not samples:
+        return None
+    if name == MsgpackZstdCodec.name:
+        if zstandard is None:
+            raise ValueError('训练zstd字典需要安装 zstandard')
+        return zstandard.train_dictionary(size, samples).as_bytes()
+    if name != ZlibJsonCodec.name:
+        return None
+
+    counts = {}
+    for sample in samples:
+        seen = set()
+        for fragment in _fragments(sample):
+            if fragment not in seen:
+                seen.add(fragment)
+                counts[fragment] = counts.get(fragment, 0) + 1
+    # 至少在两个样本中出现的片段才有用
+    ranked = sorted((f for f, c in counts.items() if c > 1), key=lambda f: (counts[f] * len(f), f))
+    dictionary = bytearray()
+    for fragment in reversed(ranked):
+        if len(dictionary) + len(fragment) > size:
+            continue
+        dictionary[:0] = fragment
+    return bytes(dictionary) or None
+
+
+def _fragments(sample: bytes, min_length: int = 4, max_length: int = 64):
+    """将JSON切分为键、值等片段，用于统计常用片段"""
+    start = 0
+    for i, byte in enumerate(sample):
+        if byte in b',{}[]':
+            fragment = sample[start:i + 1]
+            if min_length <= len(fragment) <= max_length:
+                yield fragment
+            start = i + 1
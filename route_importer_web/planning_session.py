@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量路线规划会话
+保留距离矩阵和当前访问顺序，用户插入/删除/移动地点时只做局部重新优化并返回变化部分
+"""
+
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from leg_cache import poi_id
+
+
+def _has_coordinates(place) -> bool:
+    """地点是否为带有效数值坐标的对象（兼容lat/lng与latitude/longitude两种格式）"""
+    coords = place.get('coordinates') if isinstance(place, dict) else None
+    if not isinstance(coords, dict):
+        return False
+    try:
+        values = [float(coords.get('lat', coords.get('latitude'))), float(coords.get('lng', coords.get('longitude')))]
+    except (TypeError, ValueError):
+        return False
+    return all(math.isfinite(value) for value in values)
+
+
+class PlanningSession:
+    """有状态的路线规划会话
+
+    每个地点分配稳定的 place_id；距离以字典按需扩展，插入新地点只计算一行距离。
+    插入使用最便宜插入，之后在变动位置附近做局部2-opt。
+    """
+
+    def __init__(self, places: List[Dict], planner, round_trip: bool = False,
+                 optimize: bool = True, window: int = 8):
+        """
+        Args:
+            places: 初始地点列表（必须都有坐标）
+            planner: RoutePlanner实例，用于计算距离和初始顺序
+            round_trip: 是否为环形路线
+            optimize: 是否先对初始顺序做全局优化
+            window: 局部2-opt的搜索半径（位置数）
+        """
+        self.planner = planner
+        self.round_trip = round_trip
+        self.window = window
+        self.version = 0
+        self.lock = threading.Lock()
+
+        if not isinstance(places, list):
+            raise ValueError('places 必须是地点数组')
+        if not all(_has_coordinates(place) for place in places):
+            raise ValueError('存在缺少坐标的地点，无法创建规划会话')
+        coords = [planner._get_coordinates(place) for place in places]
+
+        self.places = dict(enumerate(places))
+        self.coords = dict(enumerate(coords))
+        self._next_id = len(places)
+
+        matrix = planner._build_distance_matrix(coords, [poi_id(place) for place in places]) if places else []
+        self.dist = {i: dict(enumerate(row)) for i, row in enumerate(matrix)}
+
+        self.tour = list(range(len(places)))
+        if optimize and len(places) > 2:
+            self.tour = planner.optimizer.optimize(matrix, round_trip=round_trip)
+        self.length = self._full_length()
+
+    def state(self) -> Dict:
+        """返回完整的当前路线"""
+        return {
+            'version': self.version,
+            'order': list(self.tour),
+            'places': [dict(self.places[i], place_id=i) for i in self.tour],
+            'distance': self.length,
+            'duration': self.planner._estimate_duration(self.length),
+            'round_trip': self.round_trip
+        }
+
+    def insert(self, place: Dict, position: Optional[int] = None) -> Dict:
+        """
+        插入新地点
+
+        Args:
+            place: 地点数据（必须有坐标）
+            position: 指定插入位置；为空时选择使路线增加最少的位置
+
+        Returns:
+            变化量
+        """
+        if not _has_coordinates(place):
+            raise ValueError('地点缺少坐标')
+        coords = self.planner._get_coordinates(place)
+        if position is not None:
+            self._check_position(position, len(self.tour))
+
+        pid = self._next_id
+        self._next_id += 1
+        others = list(self.coords)
+        row = self.planner.distance_row(coords, [self.coords[i] for i in others])
+        self.dist[pid] = {pid: 0.0}
+        for i, d in zip(others, row):
+            self.dist[pid][i] = d
+            self.dist[i][pid] = d
+        self.places[pid] = place
+        self.coords[pid] = coords
+
+        before = self.length
+        if position is None:
+            position = self._cheapest_position(pid)
+        position = max(0, min(position, len(self.tour)))
+        self._place(pid, position)
+
+        lo, hi = self._local_two_opt(position, position)
+        return self._delta('insert', pid, before, min(lo, position), max(hi, position))
+
+    def remove(self, place_id: int) -> Dict:
+        """删除地点，并在缺口附近做局部优化"""
+        self._check_place(place_id)
+        before = self.length
+        position = self._take(place_id)
+        del self.places[place_id]
+        del self.coords[place_id]
+        for row in self.dist.values():
+            row.pop(place_id, None)
+        del self.dist[place_id]
+
+        anchor = min(position, max(len(self.tour) - 1, 0))
+        lo, hi = self._local_two_opt(anchor, anchor)
+        return self._delta('remove', place_id, before, min(lo, anchor), max(hi, anchor))
+
+    def move(self, place_id: int, position: int, reoptimize: bool = False) -> Dict:
+        """
+        将地点移动到指定位置
+
+        Args:
+            place_id: 地点ID
+            position: 目标位置
+            reoptimize: 是否在移动后对附近做局部优化（默认尊重用户指定的顺序）
+        """
+        self._check_place(place_id)
+        self._check_position(position, len(self.tour) - 1)
+        before = self.length
+        old_position = self._take(place_id)
+        self._place(place_id, position)
+
+        lo, hi = min(old_position, position), max(old_position, position)
+        if reoptimize:
+            opt_lo, opt_hi = self._local_two_opt(position, position)
+            lo, hi = min(lo, opt_lo), max(hi, opt_hi)
+        return self._delta('move', place_id, before, lo, hi)
+
+    def _check_place(self, place_id):
+        """校验地点ID存在（请求中的字符串、小数等视为不存在）"""
+        if isinstance(place_id, bool) or not isinstance(place_id, int) or place_id not in self.places:
+            raise ValueError(f'地点不存在: {place_id}')
+
+    @staticmethod
+    def _check_position(position, upper: int):
+        """校验位置是0到upper之间的整数"""
+        if isinstance(position, bool) or not isinstance(position, int) or not 0 <= position <= upper:
+            raise ValueError(f'位置必须是0到{upper}之间的整数')
+
+    def _place(self, pid: int, position: int):
+        """将pid放入position并更新路线长度"""
+        delta = self._insert_delta(pid, position)
+        self.tour.insert(position, pid)
+        self._update_length(delta)
+
+    def _take(self, pid: int) -> int:
+        """从路线中取出pid并更新路线长度，返回原位置"""
+        position = self.tour.index(pid)
+        self.tour.pop(position)
+        self._update_length(-self._insert_delta(pid, position))
+        return position
+
+    def _update_length(self, delta: float):
+        """累加长度变化；不足四个点的环形路线直接重新计算"""
+        if self.round_trip and len(self.tour) <= 3:
+            self.length = self._full_length()
+        else:
+            self.length += delta
+
+    def _delta(self, op: str, place_id: int, before: float, lo: int, hi: int) -> Dict:
+        """生成变化量：只包含发生变化的位置区间"""
+        self.version += 1
+        lo = max(lo, 0)
+        hi = min(hi, len(self.tour) - 1)
+        return {
+            'op': op,
+            'version': self.version,
+            'place_id': place_id,
+            'changed_from': lo,
+            'changed_to': hi,
+            'segment': [
+                dict(self.places[i], place_id=i) for i in self.tour[lo:hi + 1]
+            ] if hi >= lo else [],
+            'length': len(self.tour),
+            'distance': self.length,
+            'distance_delta': self.length - before,
+            'duration': self.planner._estimate_duration(self.length)
+        }
+
+    def _edge(self, a: Optional[int], b: Optional[int]) -> float:
+        """两地点之间的距离，端点为空（开放路径的两端）时为0"""
+        if a is None or b is None:
+            return 0.0
+        return self.dist[a][b]
+
+    def _neighbours(self, position: int):
+        """插入位置position两侧的地点，开放路径两端为None"""
+        tour = self.tour
+        n = len(tour)
+        if n == 0:
+            return None, None
+        if self.round_trip:
+            return tour[position - 1], tour[position % n]
+        left = tour[position - 1] if position > 0 else None
+        right = tour[position] if position < n else None
+        return left, right
+
+    def _insert_delta(self, pid: int, position: int) -> float:
+        """在当前路线（不含pid）的position处插入pid带来的长度变化"""
+        left, right = self._neighbours(position)
+        return self._edge(left, pid) + self._edge(pid, right) - self._edge(left, right)
+
+    def _cheapest_position(self, pid: int) -> int:
+        """最便宜插入位置"""
+        n = len(self.tour)
+        positions = range(1, n + 1) if self.round_trip else range(n + 1)
+        return min(positions, key=lambda p: self._insert_delta(pid, p), default=0)
+
+    def _local_two_opt(self, lo: int, hi: int):
+        """在[lo - window, hi + window]范围内做2-opt，返回实际变化的位置区间"""
+        tour = self.tour
+        n = len(tour)
+        if n < 4:
+            return lo, hi
+        start = max(0 if not self.round_trip else 1, lo - self.window) - 1
+        end = min(n - 1, hi + self.window)
+        changed_lo, changed_hi = lo, hi
+
+        improved = True
+        while improved:
+            improved = False
+            for i in range(start, end):
+                for j in range(i + 2, end + 1):
+                    # 反转 tour[i+1..j]
+                    a = tour[i] if i >= 0 else None
+                    b = tour[i + 1]
+                    c = tour[j]
+                    if j + 1 < n:
+                        d = tour[j + 1]
+                    elif self.round_trip:
+                        d = tour[0]
+                    else:
+                        d = None
+                    delta = (self._edge(a, c) + self._edge(b, d)) - (self._edge(a, b) + self._edge(c, d))
+                    if delta < -1e-9:
+                        tour[i + 1:j + 1] = reversed(tour[i + 1:j + 1])
+                        self.length += delta
+                        changed_lo, changed_hi = min(changed_lo, i + 1), max(changed_hi, j)
+                        improved = True
+        return changed_lo, changed_hi
+
+    def _full_length(self) -> float:
+        """完整计算路线长度"""
+        tour = self.tour
+        total = sum(self.dist[a][b] for a, b in zip(tour, tour[1:]))
+        if self.round_trip and len(tour) > 2:
+            total += self.dist[tour[-1]][tour[0]]
+        return total
+
+
+class PlanningSessionStore:
+    """进程内规划会话存储，超出容量或过期时淘汰
+
+    会话保存在当前进程的内存中：多进程部署（如gunicorn多个worker）时，
+    请求落到其他进程会找不到会话，需要单worker运行或按会话粘性路由。
+    """
+
+    def __init__(self, capacity: int = 1000, ttl: int = 3600):
+        """
+        Args:
+            capacity: 最多保留的会话数
+            ttl: 会话过期时间（秒）
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, places: List[Dict], planner, **kwargs) -> str:
+        """创建会话并返回会话ID"""
+        session = PlanningSession(places, planner, **kwargs)
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = (session, time.time())
+            while len(self._sessions) > self.capacity:
+                self._sessions.popitem(last=False)
+        return session_id
+
+    def get(self, session_id: str) -> Optional[PlanningSession]:
+        """获取会话，过期时返回None"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            session, created = entry
+            if time.time() - created > self.ttl:
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (session, time.time())
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str):
+        """删除会话"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Google编码折线（Encoded Polyline）工具
+将路线点压缩为字符串，显著减小JSON响应、session和数据库中的路线体积
+"""
+
+from typing import Dict, List, Tuple, Union
+
+
+def encode(points: List[Tuple[float, float]], precision: int = 5) -> str:
+    """
+    编码路线点
+
+    Args:
+        points: [(lat, lng), ...]
+        precision: 坐标精度（小数位数），Google默认5位，OSRM等使用6位
+
+    Returns:
+        编码后的折线字符串
+    """
+    factor = 10 ** precision
+    result = []
+    prev_lat = prev_lng = 0
+    for lat, lng in points:
+        lat_i = int(round(lat * factor))
+        lng_i = int(round(lng * factor))
+        _encode_value(lat_i - prev_lat, result)
+        _encode_value(lng_i - prev_lng, result)
+        prev_lat, prev_lng = lat_i, lng_i
+    return ''.join(result)
+
+
+def decode(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """
+    解码折线字符串
+
+    Returns:
+        [(lat, lng), ...]
+    """
+    factor = 10 ** precision
+    points = []
+    index = lat = lng = 0
+    length = len(encoded)
+    while index < length:
+        delta_lat, index = _decode_value(encoded, index)
+        delta_lng, index = _decode_value(encoded, index)
+        lat += delta_lat
+        lng += delta_lng
+        points.append((lat / factor, lng / factor))
+    return points
+
+
+def to_geometry(points: List[Tuple[float, float]], precision: int = 5) -> Dict:
+    """生成编码折线格式的路线几何"""
+    return {
+        'format': 'polyline',
+        'precision': precision,
+        'polyline': encode(points, precision)
+    }
+
+
+def geometry_points(route: Union[List[Dict], Dict, None]) -> List[Tuple[float, float]]:
+    """
+    读取路线几何中的坐标点，兼容点列表格式与编码折线格式
+
+    Args:
+        route: [{'latitude', 'longitude', ...}, ...] 或 {'format': 'polyline', 'polyline', 'precision'}
+    """
+    if not route:
+        return []
+    if isinstance(route, dict):
+        if route.get('format') == 'polyline':
+            return decode(route.get('polyline', ''), route.get('precision', 5))
+        return []
+    return [
+        (point.get('latitude'), point.get('longitude'))
+        for point in route
+        if point.get('latitude') is not None and point.get('longitude') is not None
+    ]
+
+
+def _encode_value(value: int, result: List[str]):
+    """按Google算法编码单个有符号整数"""
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        result.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    result.append(chr(value + 63))
+
+
+def _decode_value(encoded: str, index: int) -> Tuple[int, int]:
+    """解码单个有符号整数，返回 (值, 下一个位置)"""
+    shift = result = 0
+    while True:
+        b = ord(encoded[index]) - 63
+        index += 1
+        result |= (b & 0x1f) << shift
+        shift += 5
+        if b < 0x20:
+            break
+    value = ~(result >> 1) if result & 1 else result >> 1
+    return value, index
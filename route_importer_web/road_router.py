@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线步行路网路由器
+从本地预处理的OSM步行路网文件（内存映射的CSR数组）计算真实步行距离，不调用任何外部服务
+
+预处理：
+    python road_router.py build tokyo.osm tokyo.graph
+"""
+
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# 文件格式：头部 + 8字节对齐的数组段（小端序）
+#   lat[n] float64, lng[n] float64, offsets[n+1] int64, targets[m] int32, weights[m] float32（米）
+_MAGIC = b'XHSRGRPH'
+_VERSION = 1
+_HEADER = struct.Struct('<8sIIQQ')
+
+# 可步行的OSM道路类型
+WALKABLE_HIGHWAYS = {
+    'footway', 'pedestrian', 'path', 'steps', 'living_street', 'residential', 'service',
+    'unclassified', 'tertiary', 'tertiary_link', 'secondary', 'secondary_link',
+    'primary', 'primary_link', 'track', 'corridor', 'crossing', 'trunk', 'trunk_link'
+}
+
+_EARTH_RADIUS_M = 6371000.0
+
+
+def _haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """计算两点间球面距离（米）"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = lat2_rad - lat1_rad
+    delta_lng = math.radians(lng2 - lng1)
+    a = (math.sin(delta_lat / 2) ** 2 +
+         math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lng / 2) ** 2)
+    return 2 * _EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _padded(size: int) -> int:
+    """按8字节对齐"""
+    return (size + 7) & ~7
+
+
+class RoadRouter:
+    """基于步行路网的路由器
+
+    路网按无向图存储（每条步行道写入两个方向），点到点查询使用双向A*，
+    多对多距离矩阵对每个起点做一次提前终止的Dijkstra。
+    """
+
+    def __init__(self, path: str, max_snap_distance: float = 500.0, grid_size: float = 0.005):
+        """
+        Args:
+            path: 预处理后的路网文件路径
+            max_snap_distance: 坐标吸附到路网节点的最大距离（米），超出视为不可达
+            grid_size: 最近节点查找使用的网格大小（度）
+        """
+        self.path = path
+        self.max_snap_distance = max_snap_distance
+        self.grid_size = grid_size
+        self._grid = None
+
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        # 路网文件标识（路径、修改时间和大小），路网文件更新后路段缓存中的旧距离不再命中
+        stat = os.fstat(self._file.fileno())
+        self.identity = hashlib.sha1(
+            f'{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}'.encode('utf-8')
+        ).hexdigest()[:16]
+        view = memoryview(self._mmap)
+
+        magic, version, _, n, m = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"不支持的路网文件: {path}")
+        self.node_count = n
+        self.edge_count = m
+
+        offset = _padded(_HEADER.size)
+        self.lat = view[offset:offset + n * 8].cast('d')
+        offset += n * 8
+        self.lng = view[offset:offset + n * 8].cast('d')
+        offset += n * 8
+        self.offsets = view[offset:offset + (n + 1) * 8].cast('q')
+        offset += (n + 1) * 8
+        self.targets = view[offset:offset + m * 4].cast('i')
+        offset = _padded(offset + m * 4)
+        self.weights = view[offset:offset + m * 4].cast('f')
+
+    def close(self):
+        """释放内存映射"""
+        for name in ('lat', 'lng', 'offsets', 'targets', 'weights'):
+            getattr(self, name).release()
+        self._mmap.close()
+        self._file.close()
+
+    def route(self, lat1: float, lng1: float, lat2: float, lng2: float) -> Optional[Dict]:
+        """
+        计算两点间的步行路线
+
+        Returns:
+            {'distance': 公里, 'path': [(lat, lng), ...]}，不可达时返回None
+        """
+        source = self.nearest_node(lat1, lng1)
+        target = self.nearest_node(lat2, lng2)
+        if source is None or target is None:
+            return None
+
+        snap = (_haversine_m(lat1, lng1, self.lat[source], self.lng[source]) +
+                _haversine_m(lat2, lng2, self.lat[target], self.lng[target]))
+        result = self._bidirectional_astar(source, target)
+        if result is None:
+            return None
+
+        length, nodes = result
+        path = [(lat1, lng1)] + [(self.lat[v], self.lng[v]) for v in nodes] + [(lat2, lng2)]
+        return {'distance': (length + snap) / 1000.0, 'path': path}
+
+    def distance_matrix(self, coords: List[Tuple[float, float]]) -> List[List[Optional[float]]]:
+        """
+        计算多对多步行距离矩阵（公里），不可达的单元为None
+        """
+        n = len(coords)
+        snapped = []
+        for lat, lng in coords:
+            node = self.nearest_node(lat, lng)
+            snap = _haversine_m(lat, lng, self.lat[node], self.lng[node]) if node is not None else 0.0
+            snapped.append((node, snap))
+
+        matrix = [[None] * n for _ in range(n)]
+        for i in range(n):
+            matrix[i][i] = 0.0
+            source, source_snap = snapped[i]
+            if source is None:
+                continue
+            targets = {node for j, (node, _) in enumerate(snapped) if j != i and node is not None}
+            dist = self._dijkstra(source, targets)
+            for j, (node, snap) in enumerate(snapped):
+                if j != i and node is not None and node in dist:
+                    matrix[i][j] = (dist[node] + source_snap + snap) / 1000.0
+        return matrix
+
+    def distances_from(self, lat: float, lng: float,
+                       coords: List[Tuple[float, float]]) -> List[Optional[float]]:
+        """
+        计算一个点到多个点的步行距离（公里），只做一次Dijkstra，不可达的为None
+        """
+        source = self.nearest_node(lat, lng)
+        if source is None:
+            return [None] * len(coords)
+        source_snap = _haversine_m(lat, lng, self.lat[source], self.lng[source])
+
+        snapped = [self.nearest_node(t_lat, t_lng) for t_lat, t_lng in coords]
+        dist = self._dijkstra(source, {node for node in snapped if node is not None})
+        distances = []
+        for (t_lat, t_lng), node in zip(coords, snapped):
+            if node is None or node not in dist:
+                distances.append(None)
+            else:
+                snap = _haversine_m(t_lat, t_lng, self.lat[node], self.lng[node])
+                distances.append((dist[node] + source_snap + snap) / 1000.0)
+        return distances
+
+    def nearest_node(self, lat: float, lng: float) -> Optional[int]:
+        """查找最近的路网节点，超出吸附距离时返回None"""
+        if self._grid is None:
+            self._build_grid()
+
+        cell_lat = int(math.floor(lat / self.grid_size))
+        cell_lng = int(math.floor(lng / self.grid_size))
+        # 网格单元约500米，吸附半径内只需检查相邻单元
+        radius = max(1, int(math.ceil(self.max_snap_distance / (self.grid_size * 111000.0 *
+                                                                 max(0.1, math.cos(math.radians(lat)))))))
+        best, best_d = None, self.max_snap_distance
+        for di in range(-radius, radius + 1):
+            for dj in range(-radius, radius + 1):
+                for v in self._grid.get((cell_lat + di, cell_lng + dj), ()):
+                    d = _haversine_m(lat, lng, self.lat[v], self.lng[v])
+                    if d <= best_d:
+                        best, best_d = v, d
+        return best
+
+    def _build_grid(self):
+        """构建节点网格索引（首次查询时惰性构建）"""
+        grid = {}
+        size = self.grid_size
+        lat, lng = self.lat, self.lng
+        for v in range(self.node_count):
+            key = (int(math.floor(lat[v] / size)), int(math.floor(lng[v] / size)))
+            grid.setdefault(key, []).append(v)
+        self._grid = grid
+
+    def _dijkstra(self, source: int, targets: set) -> Dict[int, float]:
+        """单源Dijkstra，所有目标节点确定后提前终止"""
+        offsets, edge_targets, weights = self.offsets, self.targets, self.weights
+        dist = {source: 0.0}
+        settled = {}
+        remaining = set(targets)
+        heap = [(0.0, source)]
+        while heap and remaining:
+            d, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled[u] = d
+            remaining.discard(u)
+            for e in range(offsets[u], offsets[u + 1]):
+                v = edge_targets[e]
+                nd = d + weights[e]
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return settled
+
+    def _bidirectional_astar(self, source: int, target: int) -> Optional[Tuple[float, List[int]]]:
+        """双向A*（平均势函数），返回最短距离（米）与节点序列"""
+        if source == target:
+            return 0.0, [source]
+
+        offsets, edge_targets, weights = self.offsets, self.targets, self.weights
+        lat, lng = self.lat, self.lng
+        s_lat, s_lng, t_lat, t_lng = lat[source], lng[source], lat[target], lng[target]
+
+        potentials = {}
+
+        def potential(v):
+            # 正向势函数 p_f(v) = (h(v, t) - h(s, v)) / 2，反向取 -p_f(v)
+            p = potentials.get(v)
+            if p is None:
+                p = (_haversine_m(lat[v], lng[v], t_lat, t_lng) -
+                     _haversine_m(s_lat, s_lng, lat[v], lng[v])) / 2
+                potentials[v] = p
+            return p
+
+        dist = ({source: 0.0}, {target: 0.0})
+        parent = ({source: None}, {target: None})
+        settled = (set(), set())
+        heaps = ([(potential(source), source)], [(-potential(target), target)])
+        best, meeting = math.inf, None
+
+        while heaps[0] and heaps[1]:
+            # 停止条件：两侧最小键之和不小于当前最优值
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            sign = 1 if side == 0 else -1
+            _, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+
+            du = dist[side][u]
+            for e in range(offsets[u], offsets[u + 1]):
+                v = edge_targets[e]
+                nd = du + weights[e]
+                if nd < dist[side].get(v, math.inf):
+                    dist[side][v] = nd
+                    parent[side][v] = u
+                    heapq.heappush(heaps[side], (nd + sign * potential(v), v))
+                    other = dist[1 - side].get(v)
+                    if other is not None and nd + other < best:
+                        best, meeting = nd + other, v
+
+        if meeting is None:
+            return None
+
+        forward = []
+        v = meeting
+        while v is not None:
+            forward.append(v)
+            v = parent[0][v]
+        forward.reverse()
+        v = parent[1][meeting]
+        while v is not None:
+            forward.append(v)
+            v = parent[1][v]
+        return best, forward
+
+
+def write_graph(path: str, nodes: List[Tuple[float, float]], edges: List[Tuple[int, int, float]]):
+    """
+    写入路网文件
+
+    Args:
+        path: 输出文件路径
+        nodes: 节点坐标列表 [(lat, lng), ...]
+        edges: 无向边列表 [(u, v, 长度米), ...]
+    """
+    n = len(nodes)
+    adjacency = [[] for _ in range(n)]
+    for u, v, w in edges:
+        adjacency[u].append((v, w))
+        adjacency[v].append((u, w))
+
+    offsets = [0]
+    targets, weights = [], []
+    for neighbours in adjacency:
+        for v, w in neighbours:
+            targets.append(v)
+            weights.append(w)
+        offsets.append(len(targets))
+    m = len(targets)
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, n, m))
+        f.write(b'\0' * (_padded(_HEADER.size) - _HEADER.size))
+        f.write(struct.pack(f'<{n}d', *(lat for lat, _ in nodes)))
+        f.write(struct.pack(f'<{n}d', *(lng for _, lng in nodes)))
+        f.write(struct.pack(f'<{n + 1}q', *offsets))
+        f.write(struct.pack(f'<{m}i', *targets))
+        f.write(b'\0' * (_padded(m * 4) - m * 4))
+        f.write(struct.pack(f'<{m}f', *weights))
+        f.write(b'\0' * (_padded(m * 4) - m * 4))
+
+
+def build_graph_from_osm(osm_path: str, output_path: str) -> Tuple[int, int]:
+    """
+    从OSM XML导出文件构建步行路网
+
+    Returns:
+        (节点数, 无向边数)
+    """
+    import xml.etree.ElementTree as ET
+
+    coords = {}
+    ways = []
+    for _, elem in ET.iterparse(osm_path, events=('end',)):
+        if elem.tag == 'node':
+            coords[elem.get('id')] = (float(elem.get('lat')), float(elem.get('lon')))
+            elem.clear()
+        elif elem.tag == 'way':
+            tags = {tag.get('k'): tag.get('v') for tag in elem.findall('tag')}
+            if tags.get('highway') in WALKABLE_HIGHWAYS and tags.get('foot') != 'no' \
+                    and tags.get('access') != 'private':
+                ways.append([nd.get('ref') for nd in elem.findall('nd')])
+            elem.clear()
+
+    index = {}
+    nodes = []
+    edges = []
+    for refs in ways:
+        refs = [ref for ref in refs if ref in coords]
+        for a, b in zip(refs, refs[1:]):
+            for ref in (a, b):
+                if ref not in index:
+                    index[ref] = len(nodes)
+                    nodes.append(coords[ref])
+            u, v = index[a], index[b]
+            edges.append((u, v, _haversine_m(*nodes[u], *nodes[v])))
+
+    write_graph(output_path, nodes, edges)
+    return len(nodes), len(edges)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] != 'build':
+        print("用法: python road_router.py build <input.osm> <output.graph>")
+        sys.exit(1)
+
+    node_count, edge_count = build_graph_from_osm(sys.argv[2], sys.argv[3])
+    print(f"✅ 路网构建完成: {node_count} 个节点, {edge_count} 条边")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+路线导出
+将保存的路线导出为导航应用可导入的GPX / KML / GeoJSON格式。
+导出器都是生成器，逐条读取路线并逐段输出文本，内存占用与路线数量无关。
+"""
+
+import json
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from polyline import geometry_points
+
+EXPORT_FORMATS = {
+    'gpx': ('application/gpx+xml', 'gpx'),
+    'kml': ('application/vnd.google-earth.kml+xml', 'kml'),
+    'geojson': ('application/geo+json', 'geojson')
+}
+
+
+def route_track(route: Dict) -> List[Tuple[float, float]]:
+    """路线轨迹点；没有保存几何时按地点顺序连线"""
+    points = geometry_points(route.get('route'))
+    if points:
+        return points
+    return [coords for coords in (place_coordinates(p) for p in route.get('places') or []) if coords]
+
+
+def place_coordinates(place: Dict) -> Optional[Tuple[float, float]]:
+    """读取地点坐标，兼容 lat/lng 与 latitude/longitude 两种格式"""
+    coords = place.get('coordinates') or {}
+    lat = coords.get('lat', coords.get('latitude'))
+    lng = coords.get('lng', coords.get('longitude'))
+    if lat is None or lng is None:
+        return None
+    return float(lat), float(lng)
+
+
+def export_gpx(iter_routes: Callable[[], Iterable[Dict]]) -> Iterator[str]:
+    """
+    导出GPX 1.1
+
+    GPX要求所有 wpt 在 trk 之前，因此分两遍读取：第一遍输出地点，第二遍输出轨迹。
+
+    Args:
+        iter_routes: 每次调用返回一个新的路线迭代器
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield ('<gpx version="1.1" creator="xiaohongshu-route-importer" '
+           'xmlns="http://www.topografix.com/GPX/1/1">\n')
+
+    for route in iter_routes():
+        for place in route.get('places') or []:
+            coords = place_coordinates(place)
+            if coords is None:
+                continue
+            parts = [f'  <wpt lat="{coords[0]:.6f}" lon="{coords[1]:.6f}">',
+                     f'<name>{escape(str(place.get("name", "")))}</name>']
+            if place.get('description'):
+                parts.append(f'<desc>{escape(str(place["description"]))}</desc>')
+            if place.get('category'):
+                parts.append(f'<type>{escape(str(place["category"]))}</type>')
+            parts.append('</wpt>\n')
+            yield ''.join(parts)
+
+    for route in iter_routes():
+        parts = ['  <trk>', f'<name>{escape(str(route.get("name") or ""))}</name>']
+        if route.get('description'):
+            parts.append(f'<desc>{escape(str(route["description"]))}</desc>')
+        parts.append('<trkseg>\n')
+        yield ''.join(parts)
+        for lat, lng in route_track(route):
+            yield f'    <trkpt lat="{lat:.6f}" lon="{lng:.6f}"/>\n'
+        yield '  </trkseg></trk>\n'
+
+    yield '</gpx>\n'
+
+
+def export_kml(iter_routes: Callable[[], Iterable[Dict]]) -> Iterator[str]:
+    """导出KML，每条路线一个Folder，包含路线折线和地点标记"""
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n'
+
+    for route in iter_routes():
+        yield f'<Folder id={quoteattr(str(route.get("id") or ""))}><name>{escape(str(route.get("name") or ""))}</name>\n'
+        yield '  <Placemark><name>路线</name><LineString><tessellate>1</tessellate><coordinates>\n'
+        for lat, lng in route_track(route):
+            yield f'    {lng:.6f},{lat:.6f}\n'
+        yield '  </coordinates></LineString></Placemark>\n'
+
+        for place in route.get('places') or []:
+            coords = place_coordinates(place)
+            if coords is None:
+                continue
+            description = f'<description>{escape(str(place["description"]))}</description>' if place.get('description') else ''
+            yield (f'  <Placemark><name>{escape(str(place.get("name", "")))}</name>{description}'
+                   f'<Point><coordinates>{coords[1]:.6f},{coords[0]:.6f}</coordinates></Point></Placemark>\n')
+        yield '</Folder>\n'
+
+    yield '</Document>\n</kml>\n'
+
+
+def export_geojson(iter_routes: Callable[[], Iterable[Dict]]) -> Iterator[str]:
+    """导出GeoJSON FeatureCollection，每条路线一个LineString，每个地点一个Point"""
+    yield '{"type": "FeatureCollection", "features": [\n'
+    first = True
+
+    for route in iter_routes():
+        features = [{
+            'type': 'Feature',
+            'geometry': {
+                'type': 'LineString',
+                'coordinates': [[round(lng, 6), round(lat, 6)] for lat, lng in route_track(route)]
+            },
+            'properties': {
+                'route_id': route.get('id'),
+                'name': route.get('name'),
+                'distance': route.get('distance'),
+                'duration': route.get('duration'),
+                'tags': route.get('tags') or []
+            }
+        }]
+        for order, place in enumerate(route.get('places') or []):
+            coords = place_coordinates(place)
+            if coords is None:
+                continue
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [round(coords[1], 6), round(coords[0], 6)]},
+                'properties': {
+                    'route_id': route.get('id'),
+                    'name': place.get('name'),
+                    'category': place.get('category'),
+                    'order': order
+                }
+            })
+
+        for feature in features:
+            yield ('' if first else ',\n') + json.dumps(feature, ensure_ascii=False)
+            first = False
+
+    yield '\n]}\n'
+
+
+EXPORTERS = {
+    'gpx': export_gpx,
+    'kml': export_kml,
+    'geojson': export_geojson
+}
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+路线指纹
+同一篇笔记的不同链接（分享参数、http/https、explore与discovery路径等）归一为笔记ID，
+再加上规范化的地点顺序计算指纹，用于识别重复导入的路线。
+"""
+
+import hashlib
+import re
+import unicodedata
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+# 小红书笔记ID：24位十六进制
+_XHS_NOTE_ID = re.compile(r'/([0-9a-f]{24})(?=/|$)')
+_DOUBAN_NOTE_ID = re.compile(r'^/(note|group/topic)/(\d+)')
+
+# 规范化地点名称时去掉的字符（空白和常见标点）
+_NAME_NOISE = re.compile(r'[\s·・,，.。、:：;；!！?？"“”\'‘’()（）\[\]【】<>《》\-—_/|]+')
+
+
+def canonical_note_id(url: Optional[str]) -> Optional[str]:
+    """
+    将笔记链接归一为笔记ID
+
+    Returns:
+        'xhs:<笔记ID>'、'douban:<类型>:<ID>'，其他链接为 'url:<域名><路径>'；空链接返回None
+    """
+    if not url or not url.strip():
+        return None
+    url = url.strip()
+    if '://' not in url:
+        url = 'http://' + url
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/')
+
+    if host.endswith('xiaohongshu.com'):
+        # 个人主页形式的链接 /user/profile/<用户ID>/<笔记ID> 中笔记ID在最后
+        matches = _XHS_NOTE_ID.findall(path.lower() + '/')
+        if matches:
+            return f'xhs:{matches[-1]}'
+    if host.endswith('douban.com'):
+        match = _DOUBAN_NOTE_ID.match(path)
+        if match:
+            return f"douban:{match.group(1).replace('/', '_')}:{match.group(2)}"
+    if not host:
+        return None
+    # 其他链接（包括无法离线展开的短链接）：去掉协议、查询参数和锚点
+    return f'url:{host}{path}'
+
+
+def normalize_place_name(name) -> str:
+    """规范化地点名称：全角转半角、小写、去掉空白和标点"""
+    text = unicodedata.normalize('NFKC', str(name or '')).lower()
+    return _NAME_NOISE.sub('', text)
+
+
+def place_sequence_hash(places: List[Dict]) -> str:
+    """按访问顺序计算地点序列的哈希"""
+    names = [normalize_place_name(place.get('name')) for place in places or [] if isinstance(place, dict)]
+    return hashlib.sha1('\n'.join(name for name in names if name).encode('utf-8')).hexdigest()
+
+
+def route_fingerprint(note_id: Optional[str], places: List[Dict]) -> Optional[str]:
+    """路线指纹：笔记ID + 地点序列哈希；没有来源链接的路线不参与去重，返回None"""
+    if not note_id:
+        return None
+    return hashlib.sha256(f'{note_id}|{place_sequence_hash(places)}'.encode('utf-8')).hexdigest()[:32]
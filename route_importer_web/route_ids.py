@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+路线ID生成
+ULID格式：48位毫秒时间戳 + 80位随机数，Crockford Base32编码为26个字符。
+ID按生成时间排序，新路线总是插入主键B树的末尾（与原来按时间命名的ID一样），
+同一毫秒内在上一个ID的随机部分上递增，保证同一进程内严格递增且不重复。
+"""
+
+import os
+import threading
+import time
+import weakref
+from datetime import datetime
+from typing import Optional
+
+# Crockford Base32（不含 I L O U），按ASCII顺序排列，字符串顺序即数值顺序
+_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_DECODE = {char: value for value, char in enumerate(_ALPHABET)}
+
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+ULID_LENGTH = 26
+
+ROUTE_ID_PREFIX = 'route_'
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+class UlidGenerator:
+    """线程安全的单调ULID生成器
+
+    fork后的子进程会重新生成随机部分，避免与父进程或兄弟进程产生相同的序列；
+    锁也会重新创建（fork时其他线程可能正持有锁）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._last_ms = -1
+        self._last_random = 0
+        if hasattr(os, 'register_at_fork'):
+            after_fork = weakref.WeakMethod(self._after_fork)
+            os.register_at_fork(after_in_child=lambda: after_fork() and after_fork()())
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def generate(self, timestamp_ms: Optional[int] = None) -> str:
+        """生成一个ULID"""
+        with self._lock:
+            now = int(time.time() * 1000) if timestamp_ms is None else timestamp_ms
+            pid = os.getpid()
+            if pid != self._pid or now > self._last_ms:
+                self._pid = pid
+                self._last_ms = now
+                self._last_random = int.from_bytes(os.urandom(10), 'big')
+            elif self._last_random < _RANDOM_MAX:
+                # 同一毫秒（或时钟回拨）：沿用上一个时间戳，随机部分加一
+                self._last_random += 1
+            else:
+                # 随机部分用尽（概率可忽略），借用下一毫秒
+                self._last_ms += 1
+                self._last_random = int.from_bytes(os.urandom(10), 'big')
+            return _encode(self._last_ms, 10) + _encode(self._last_random, 16)
+
+
+_generator = UlidGenerator()
+
+
+def new_ulid() -> str:
+    """生成ULID"""
+    return _generator.generate()
+
+
+def new_route_id() -> str:
+    """生成路线ID，如 route_01J9Z3K6Q4V8W2X5Y7Z9A1B3C5"""
+    return ROUTE_ID_PREFIX + _generator.generate()
+
+
+def ulid_datetime(value: str) -> Optional[datetime]:
+    """解析ULID（或路线ID）中的生成时间，格式不符时返回None"""
+    if value.startswith(ROUTE_ID_PREFIX):
+        value = value[len(ROUTE_ID_PREFIX):]
+    if len(value) != ULID_LENGTH:
+        return None
+    timestamp_ms = 0
+    for char in value[:10].upper():
+        if char not in _DECODE:
+            return None
+        timestamp_ms = timestamp_ms * 32 + _DECODE[char]
+    return datetime.fromtimestamp(timestamp_ms / 1000)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+访问顺序优化器
+基于距离矩阵求解步行路线的访问顺序（TSP启发式）
+"""
+
+import random
+import time
+from typing import List, Optional
+
+# 用于约束起终点的惩罚距离（公里），远大于任何真实步行距离
+_PENALTY = 1.0e6
+
+
+class RouteOptimizer:
+    """访问顺序优化器
+
+    小规模路线使用Held-Karp动态规划求最优解；
+    大规模路线使用最近邻构造 + 2-opt / Or-opt 局部搜索，并在时间预算内做扰动迭代。
+    """
+
+    def __init__(self, time_budget: float = 0.5, exact_threshold: int = 9, seed: int = 42):
+        """
+        Args:
+            time_budget: 默认时间预算（秒）
+            exact_threshold: 地点数不超过该值时使用精确算法
+            seed: 扰动使用的随机种子，保证结果可复现
+        """
+        self.time_budget = time_budget
+        self.exact_threshold = exact_threshold
+        self.seed = seed
+
+    def optimize(self, matrix: List[List[float]], round_trip: bool = False,
+                 start: Optional[int] = None, end: Optional[int] = None,
+                 time_budget: Optional[float] = None) -> List[int]:
+        """
+        计算访问顺序
+
+        Args:
+            matrix: n×n 距离矩阵
+            round_trip: 是否为环形路线（回到起点）
+            start: 固定起点下标
+            end: 固定终点下标（环形路线忽略）
+            time_budget: 本次求解的时间预算（秒），为空时使用默认值
+
+        Returns:
+            地点下标组成的访问顺序
+        """
+        n = len(matrix)
+        if not round_trip and start is not None and start == end:
+            # 起终点相同即为环形路线
+            round_trip = True
+        if n <= 2:
+            order = list(range(n))
+            if start is not None and n == 2 and start == 1:
+                order.reverse()
+            elif end is not None and n == 2 and end == 0 and not round_trip:
+                order.reverse()
+            return order
+
+        budget = self.time_budget if time_budget is None else time_budget
+        deadline = time.perf_counter() + max(budget, 0.0)
+
+        # 开放路径通过虚拟节点转化为环：虚拟节点两侧即为路径的起点和终点
+        if round_trip:
+            cost = [row[:] for row in matrix]
+            anchor = start if start is not None else 0
+        else:
+            cost = self._augment_for_path(matrix, start, end)
+            anchor = n
+
+        size = len(cost)
+        if size <= self.exact_threshold + (0 if round_trip else 1):
+            tour = self._held_karp(cost, anchor)
+        else:
+            tour = self._nearest_neighbor(cost, anchor)
+            tour = self._local_search(cost, tour, deadline)
+            tour = self._perturb(cost, tour, deadline)
+
+        order = self._rotate(tour, anchor)
+        if not round_trip:
+            order = order[1:]
+            # 虚拟节点两侧方向对称，按约束确定路径方向
+            if (start is not None and order[0] != start) or \
+                    (start is None and end is not None and order[-1] != end):
+                order.reverse()
+        return order
+
+    @staticmethod
+    def tour_length(matrix: List[List[float]], order: List[int], round_trip: bool = False) -> float:
+        """计算访问顺序的总长度"""
+        total = 0.0
+        for i in range(len(order) - 1):
+            total += matrix[order[i]][order[i + 1]]
+        if round_trip and len(order) > 2:
+            total += matrix[order[-1]][order[0]]
+        return total
+
+    def _augment_for_path(self, matrix: List[List[float]], start: Optional[int],
+                          end: Optional[int]) -> List[List[float]]:
+        """添加虚拟节点，将开放路径问题转化为环问题"""
+        n = len(matrix)
+        allowed = set()
+        if start is not None:
+            allowed.add(start)
+        if end is not None:
+            allowed.add(end)
+
+        cost = [row[:] + [0.0] for row in matrix]
+        dummy_row = []
+        for i in range(n):
+            # 有约束时，非起终点与虚拟节点相连需要付出惩罚
+            d = 0.0 if not allowed or i in allowed else _PENALTY
+            cost[i][n] = d
+            dummy_row.append(d)
+        dummy_row.append(0.0)
+        cost.append(dummy_row)
+        return cost
+
+    def _held_karp(self, cost: List[List[float]], anchor: int) -> List[int]:
+        """Held-Karp动态规划求精确解"""
+        nodes = [i for i in range(len(cost)) if i != anchor]
+        m = len(nodes)
+        full = (1 << m) - 1
+
+        # dp[(mask, j)] = 从anchor出发访问mask中节点并停在j的最短距离
+        dp = {}
+        parent = {}
+        for j in range(m):
+            dp[(1 << j, j)] = cost[anchor][nodes[j]]
+            parent[(1 << j, j)] = None
+
+        for mask in range(1, full + 1):
+            for j in range(m):
+                if not mask & (1 << j) or (mask, j) not in dp:
+                    continue
+                base = dp[(mask, j)]
+                for k in range(m):
+                    if mask & (1 << k):
+                        continue
+                    key = (mask | (1 << k), k)
+                    value = base + cost[nodes[j]][nodes[k]]
+                    if value < dp.get(key, float('inf')):
+                        dp[key] = value
+                        parent[key] = j
+
+        best_j = min(range(m), key=lambda j: dp[(full, j)] + cost[nodes[j]][anchor])
+        tour = []
+        mask, j = full, best_j
+        while j is not None:
+            tour.append(nodes[j])
+            prev = parent[(mask, j)]
+            mask ^= 1 << j
+            j = prev
+        tour.append(anchor)
+        tour.reverse()
+        return tour
+
+    def _nearest_neighbor(self, cost: List[List[float]], anchor: int) -> List[int]:
+        """最近邻构造初始解"""
+        unvisited = set(range(len(cost)))
+        unvisited.discard(anchor)
+        tour = [anchor]
+        current = anchor
+        while unvisited:
+            row = cost[current]
+            current = min(unvisited, key=lambda k: row[k])
+            unvisited.discard(current)
+            tour.append(current)
+        return tour
+
+    def _local_search(self, cost: List[List[float]], tour: List[int], deadline: float) -> List[int]:
+        """交替执行2-opt与Or-opt，直到没有改进或超出时间预算"""
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = self._two_opt(cost, tour, deadline)
+            improved = self._or_opt(cost, tour, deadline) or improved
+        return tour
+
+    def _two_opt(self, cost: List[List[float]], tour: List[int], deadline: float) -> bool:
+        """2-opt：反转一段路径消除交叉边"""
+        n = len(tour)
+        improved = False
+        for i in range(n - 1):
+            if time.perf_counter() >= deadline:
+                break
+            a, b = tour[i], tour[i + 1]
+            d_ab = cost[a][b]
+            for j in range(i + 2, n if i > 0 else n - 1):
+                c, d = tour[j], tour[(j + 1) % n]
+                delta = cost[a][c] + cost[b][d] - d_ab - cost[c][d]
+                if delta < -1e-9:
+                    tour[i + 1:j + 1] = reversed(tour[i + 1:j + 1])
+                    improved = True
+                    b = tour[i + 1]
+                    d_ab = cost[a][b]
+        return improved
+
+    def _or_opt(self, cost: List[List[float]], tour: List[int], deadline: float) -> bool:
+        """Or-opt：将长度1~3的片段（可反向）移动到其他位置"""
+        n = len(tour)
+        improved = False
+        for seg_len in (1, 2, 3):
+            if n < seg_len + 3:
+                break
+            i = 1
+            while i + seg_len <= n:
+                if time.perf_counter() >= deadline:
+                    return improved
+                prev, first = tour[i - 1], tour[i]
+                last, nxt = tour[i + seg_len - 1], tour[(i + seg_len) % n]
+                remove_gain = cost[prev][first] + cost[last][nxt] - cost[prev][nxt]
+
+                rest = tour[:i] + tour[i + seg_len:]
+                best_delta, best_pos, best_reverse = -1e-9, None, False
+                for p in range(len(rest)):
+                    u, v = rest[p], rest[(p + 1) % len(rest)]
+                    base = cost[u][v]
+                    forward = cost[u][first] + cost[last][v] - base - remove_gain
+                    if forward < best_delta:
+                        best_delta, best_pos, best_reverse = forward, p, False
+                    backward = cost[u][last] + cost[first][v] - base - remove_gain
+                    if backward < best_delta:
+                        best_delta, best_pos, best_reverse = backward, p, True
+
+                if best_pos is not None:
+                    segment = tour[i:i + seg_len]
+                    if best_reverse:
+                        segment.reverse()
+                    tour[:] = rest[:best_pos + 1] + segment + rest[best_pos + 1:]
+                    improved = True
+                else:
+                    i += 1
+        return improved
+
+    def _perturb(self, cost: List[List[float]], tour: List[int], deadline: float,
+                 max_stall: int = 30) -> List[int]:
+        """迭代局部搜索：在剩余时间预算内做double-bridge扰动"""
+        n = len(tour)
+        if n < 8:
+            return tour
+        rng = random.Random(self.seed)
+        best = tour[:]
+        best_len = self.tour_length(cost, best, round_trip=True)
+        stall = 0
+        while stall < max_stall and time.perf_counter() < deadline:
+            a, b, c = sorted(rng.sample(range(1, n), 3))
+            candidate = best[:a] + best[b:c] + best[a:b] + best[c:]
+            candidate = self._local_search(cost, candidate, deadline)
+            candidate_len = self.tour_length(cost, candidate, round_trip=True)
+            if candidate_len < best_len - 1e-9:
+                best, best_len = candidate, candidate_len
+                stall = 0
+            else:
+                stall += 1
+        return best
+
+    @staticmethod
+    def _rotate(tour: List[int], anchor: int) -> List[int]:
+        """旋转环，使anchor位于首位"""
+        k = tour.index(anchor)
+        return tour[k:] + tour[:k]
@@ -4,19 +4,73 @@
 路线规划器
 """
 
+import copy
+import hashlib
+import json
 import math
-from typing import List, Dict, Optional
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+from route_optimizer import RouteOptimizer
+from itinerary_clusterer import ItineraryClusterer
+from road_router import RoadRouter
+from leg_cache import LegCache, poi_id
+from itinerary_scheduler import ItineraryScheduler
+from polyline import geometry_points, to_geometry
 
 class RoutePlanner:
-    def __init__(self):
-        pass
+    def __init__(self, optimizer_time_budget: float = 0.5, max_workers: int = 4,
+                 use_processes: Optional[bool] = None, cache_size: int = 256, router=None, leg_cache=None,
+                 geometry_format: str = 'points', polyline_precision: int = 5):
+        """
+        Args:
+            optimizer_time_budget: 单条路线顺序优化的默认时间预算（秒）
+            max_workers: 多路线并行规划的工作进程/线程数，为1时在当前线程依次规划
+            use_processes: 是否使用进程池（顺序优化为纯Python计算，进程池可绕开GIL），
+                为空时 max_workers 大于1即使用进程池
+            cache_size: 单条路线规划结果的缓存条数
+            router: 离线步行路网路由器（RoadRouter），为空时使用直线距离
+            leg_cache: 路段距离缓存（LegCache），只缓存路网距离，为空时每次重新计算
+            geometry_format: 路线几何格式，points 为点列表，polyline 为Google编码折线
+            polyline_precision: 编码折线的坐标精度（小数位数）
+        """
+        self.optimizer = RouteOptimizer(time_budget=optimizer_time_budget)
+        self.clusterer = ItineraryClusterer()
+        self.scheduler = ItineraryScheduler()
+        self.router = router
+        self.leg_cache = leg_cache
+        self.optimizer_time_budget = optimizer_time_budget
+        self.max_workers = max_workers
+        self.use_processes = max_workers > 1 if use_processes is None else use_processes
+        self.cache_size = cache_size
+        self.geometry_format = geometry_format
+        self.polyline_precision = polyline_precision
+        self._route_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # 多路线规划共用的进程/线程池，首次使用时创建，避免每次请求启动工作进程
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
     
-    def plan_walking_route(self, places: List[Dict]) -> Optional[Dict]:
+    def plan_walking_route(self, places: List[Dict], optimize: bool = True, round_trip: bool = False,
+                           start_index: Optional[int] = None, end_index: Optional[int] = None,
+                           time_budget: Optional[float] = None, start_time: Optional[str] = None,
+                           weekday: Optional[int] = None) -> Optional[Dict]:
         """
         规划步行路线
         
         Args:
             places: 地点列表
+            optimize: 是否优化访问顺序
+            round_trip: 是否为环形路线（回到起点）
+            start_index: 固定起点在places中的下标
+            end_index: 固定终点在places中的下标
+            time_budget: 顺序优化的时间预算（秒）
+            start_time: 出发时间 HH:MM，设置后按营业时间和停留时间安排行程
+            weekday: 出行日星期几（0为周一），用于判断休息日
             
         Returns:
             规划的路线数据
@@ -25,58 +79,339 @@ class RoutePlanner:
             return None
         
         try:
+            # 优化访问顺序
+            order = list(range(len(places)))
+            matrix = None
+            schedule = None
+            coords = [self._get_coordinates(place) for place in places]
+            if (optimize or start_time) and all(c is not None for c in coords):
+                matrix = self._build_distance_matrix(coords, [poi_id(place) for place in places])
+                if start_time:
+                    # 按时间窗安排时，访问顺序由插入启发式决定
+                    schedule = self.scheduler.schedule(places, matrix, start_time=start_time,
+                                                       weekday=weekday, start_index=start_index)
+                    order = schedule['order']
+                else:
+                    order = self.optimizer.optimize(matrix, round_trip=round_trip, start=start_index,
+                                                    end=end_index, time_budget=time_budget)
+            ordered_places = [places[i] for i in order]
+            
             # 计算路线距离和时间
-            total_distance = self._calculate_total_distance(places)
+            if matrix is not None:
+                total_distance = self.optimizer.tour_length(matrix, order, round_trip)
+            else:
+                total_distance = self._calculate_total_distance(ordered_places, round_trip)
             estimated_duration = self._estimate_duration(total_distance)
             
             # 生成路线点
-            route_points = self._generate_route_points(places)
+            route_points = self._generate_route_points(ordered_places)
             
-            return {
-                'route': route_points,
+            planned = {
+                'route': self._format_geometry(route_points),
                 'distance': total_distance,
                 'duration': estimated_duration,
-                'waypoints': len(places)
+                # 按时间安排时无法安排的地点不在路线中，单独在 unscheduled 中返回
+                'waypoints': len(ordered_places),
+                'order': order,
+                'places': ordered_places,
+                'round_trip': round_trip
             }
+            if schedule is not None:
+                planned['schedule'] = schedule['schedule']
+                planned['unscheduled'] = [places[i] for i in schedule['unscheduled']]
+                planned['total_minutes'] = schedule['total_minutes']
+            return planned
             
         except Exception as e:
             print(f"路线规划失败: {e}")
             return None
     
-    def _calculate_total_distance(self, places: List[Dict]) -> float:
+    def plan_multi_route(self, routes: List[Dict], optimize: bool = True, round_trip: bool = False,
+                         start_time: Optional[str] = None, weekday: Optional[int] = None) -> Optional[Dict]:
+        """
+        并行规划多路线笔记（如按天划分的行程），每条路线独立规划
+        
+        Args:
+            routes: 解析结果中的routes列表，每项包含route_id、route_name和places
+            optimize: 是否优化访问顺序
+            round_trip: 是否为环形路线（回到起点）
+            start_time: 每天的出发时间 HH:MM，设置后按营业时间安排行程
+            weekday: 第一天的星期几（0为周一），后续路线按天顺延
+            
+        Returns:
+            包含每条路线规划结果与汇总距离/时间的数据
+        """
+        if not routes:
+            return None
+        
+        # 每条路线的规划选项（按天划分时星期顺延）
+        route_options = [
+            {
+                'optimize': optimize,
+                'round_trip': round_trip,
+                'start_time': start_time,
+                'weekday': (weekday + index) % 7 if weekday is not None else None
+            }
+            for index in range(len(routes))
+        ]
+        
+        results = [None] * len(routes)
+        pending = {}
+        
+        # 命中缓存的路线直接复用，只重新规划被修改过的路线
+        for index, route in enumerate(routes):
+            key = self._route_cache_key(route.get('places') or [], route_options[index])
+            cached = self._get_cached_route(key)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending[index] = key
+        
+        if len(pending) == 1 or (pending and self.max_workers <= 1):
+            # 只有一条需要规划（或不并行）时直接在当前线程规划，省去进程间传输
+            for index, key in pending.items():
+                results[index] = self.plan_walking_route(routes[index].get('places') or [], **route_options[index])
+                if results[index] is not None:
+                    self._put_cached_route(key, results[index])
+        elif pending:
+            executor = self._get_executor()
+            futures = {}
+            for index in pending:
+                places = routes[index].get('places') or []
+                if self.use_processes:
+                    futures[index] = executor.submit(
+                        _plan_single_route, places, route_options[index], self._worker_config(),
+                        self.router.path if self.router else None,
+                        self.leg_cache.db_path if self.leg_cache else None
+                    )
+                else:
+                    futures[index] = executor.submit(
+                        self.plan_walking_route, places, **route_options[index]
+                    )
+            for index, future in futures.items():
+                try:
+                    results[index] = future.result()
+                except BrokenExecutor as e:
+                    # 工作进程异常退出后进程池不可再用，下次请求重新创建
+                    print(f"路线规划失败: {e}")
+                    self._reset_executor(executor)
+                    results[index] = None
+                except Exception as e:
+                    print(f"路线规划失败: {e}")
+                    results[index] = None
+                if results[index] is not None:
+                    self._put_cached_route(pending[index], results[index])
+        
+        planned_routes = []
+        all_points = []
+        total_distance = 0.0
+        total_duration = 0
+        total_waypoints = 0
+        unscheduled = []
+        for route, planned in zip(routes, results):
+            entry = {
+                'route_id': route.get('route_id'),
+                'route_name': route.get('route_name'),
+                'success': planned is not None
+            }
+            if planned is not None:
+                entry.update(planned)
+                all_points.extend(planned['route'] if self.geometry_format == 'points'
+                                  else geometry_points(planned['route']))
+                total_distance += planned['distance']
+                total_duration += planned['duration']
+                total_waypoints += planned['waypoints']
+                unscheduled.extend(planned.get('unscheduled') or [])
+            planned_routes.append(entry)
+        
+        if not any(entry['success'] for entry in planned_routes):
+            return None
+        
+        result = {
+            'routes': planned_routes,
+            'route': all_points if self.geometry_format == 'points'
+                     else to_geometry(all_points, self.polyline_precision),
+            'distance': total_distance,
+            'duration': total_duration,
+            'waypoints': total_waypoints,
+            'round_trip': round_trip
+        }
+        if start_time:
+            # 各天无法安排在营业时间内的地点
+            result['unscheduled'] = unscheduled
+        return result
+    
+    def split_into_days(self, places: List[Dict], n_days: Optional[int] = None,
+                        max_day_minutes: float = 180) -> List[Dict]:
+        """
+        将没有Day标记的地点列表按空间距离拆分为多天路线
+        
+        Args:
+            places: 地点列表
+            n_days: 指定天数；为空时根据每天步行时间预算自动确定
+            max_day_minutes: 每天步行时间上限（分钟）
+            
+        Returns:
+            与解析结果routes相同结构的多路线列表
+        """
+        coords = [self._get_coordinates(place) for place in places]
+        if not places or any(c is None for c in coords):
+            return [{'route_id': 'day1', 'route_name': 'Day1', 'places': list(places)}]
+        
+        matrix = self._build_distance_matrix(coords, [poi_id(place) for place in places])
+        days = self.clusterer.split(matrix, n_days=n_days, max_day_minutes=max_day_minutes)
+        
+        return [
+            {
+                'route_id': f'day{i}',
+                'route_name': f'Day{i}',
+                'places': [places[index] for index in day]
+            }
+            for i, day in enumerate(days, 1)
+        ]
+    
+    def _worker_config(self) -> Dict:
+        """进程池工作进程中重建RoutePlanner所需的配置"""
+        return {
+            'max_workers': 1,
+            'optimizer_time_budget': self.optimizer_time_budget,
+            'geometry_format': self.geometry_format,
+            'polyline_precision': self.polyline_precision
+        }
+    
+    def _get_executor(self):
+        """返回共用的进程/线程池，当前进程（如fork出的web worker）还没有时创建"""
+        with self._executor_lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                if self.use_processes:
+                    # web进程中有后台线程（任务队列等），fork可能复制被持有的锁，工作进程使用spawn启动
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+                self._executor_pid = os.getpid()
+            return self._executor
+    
+    def _reset_executor(self, executor):
+        """丢弃已损坏的进程池"""
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+    
+    def close(self):
+        """关闭共用的进程/线程池"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._executor_pid == os.getpid():
+            executor.shutdown()
+    
+    def _route_cache_key(self, places: List[Dict], options: Dict) -> str:
+        """根据地点和规划选项生成缓存键"""
+        payload = json.dumps({
+            # 时间安排按描述识别用餐地点，描述不同的地点结果可能不同
+            'places': [(p.get('name'), p.get('category'), p.get('description'), self._get_coordinates(p))
+                       for p in places],
+            'options': options
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    def _get_cached_route(self, key: str) -> Optional[Dict]:
+        """读取缓存的单条路线规划结果（返回副本，调用方修改结果不影响缓存）"""
+        with self._cache_lock:
+            planned = self._route_cache.get(key)
+            if planned is not None:
+                self._route_cache.move_to_end(key)
+        return copy.deepcopy(planned)
+    
+    def _put_cached_route(self, key: str, planned: Dict):
+        """写入单条路线规划结果，超出容量时淘汰最久未使用的条目"""
+        planned = copy.deepcopy(planned)
+        with self._cache_lock:
+            self._route_cache[key] = planned
+            self._route_cache.move_to_end(key)
+            while len(self._route_cache) > self.cache_size:
+                self._route_cache.popitem(last=False)
+    
+    def _build_distance_matrix(self, coords: List[Tuple[float, float]],
+                               poi_ids: Optional[List[str]] = None) -> List[List[float]]:
+        """构建两两距离矩阵（公里），使用路网且配置了路段缓存时只计算未缓存的单元
+
+        直线距离的计算比查询缓存更快，不写入缓存；路网距离以路网文件标识区分，路网更新后重新计算。
+        """
+        if self.router and self.leg_cache and poi_ids and all(poi_ids):
+            mode = f'road:{self.router.identity}'
+            return self.leg_cache.get_matrix(poi_ids, mode, lambda pairs: self._compute_legs(coords, pairs))
+        return self._compute_distance_matrix(coords)
+    
+    def _compute_legs(self, coords: List[Tuple[float, float]],
+                      pairs: List[Tuple[int, int]]) -> Dict[Tuple[int, int], float]:
+        """计算指定下标对的距离，只对涉及的地点构建子矩阵"""
+        involved = sorted({i for pair in pairs for i in pair})
+        position = {index: k for k, index in enumerate(involved)}
+        sub_matrix = self._compute_distance_matrix([coords[i] for i in involved])
+        return {(i, j): sub_matrix[position[i]][position[j]] for i, j in pairs}
+    
+    def _compute_distance_matrix(self, coords: List[Tuple[float, float]]) -> List[List[float]]:
+        """计算两两距离矩阵（公里），有路网时使用步行路网距离"""
+        n = len(coords)
+        road_matrix = self.router.distance_matrix(coords) if self.router else None
+        matrix = [[0.0] * n for _ in range(n)]
+        for i in range(n):
+            for j in range(i + 1, n):
+                if road_matrix and road_matrix[i][j] is not None and road_matrix[j][i] is not None:
+                    # 路网按无向图存储，取两个方向的较小值保持矩阵对称
+                    d = min(road_matrix[i][j], road_matrix[j][i])
+                else:
+                    d = self._calculate_distance_between_points(coords[i][0], coords[i][1],
+                                                                coords[j][0], coords[j][1])
+                matrix[i][j] = matrix[j][i] = d
+        return matrix
+    
+    def distance_row(self, origin: Tuple[float, float], targets: List[Tuple[float, float]]) -> List[float]:
+        """计算一个地点到多个地点的距离（公里），路网不可达时退回直线距离"""
+        road = self.router.distances_from(origin[0], origin[1], targets) if self.router else [None] * len(targets)
+        return [
+            d if d is not None else self._calculate_distance_between_points(origin[0], origin[1], t[0], t[1])
+            for d, t in zip(road, targets)
+        ]
+    
+    def _leg_distance(self, a: Tuple[float, float], b: Tuple[float, float]) -> float:
+        """计算相邻两点的步行距离（公里），路网不可达时退回直线距离"""
+        if self.router:
+            leg = self.router.route(a[0], a[1], b[0], b[1])
+            if leg:
+                return leg['distance']
+        return self._calculate_distance_between_points(a[0], a[1], b[0], b[1])
+    
+    def _get_coordinates(self, place: Dict) -> Optional[Tuple[float, float]]:
+        """读取地点坐标，兼容lat/lng与latitude/longitude两种格式"""
+        coords = place.get('coordinates') or {}
+        lat = coords.get('lat', coords.get('latitude'))
+        lng = coords.get('lng', coords.get('longitude'))
+        if lat is None or lng is None:
+            return None
+        return float(lat), float(lng)
+    
+    def _calculate_total_distance(self, places: List[Dict], round_trip: bool = False) -> float:
         """计算总距离（公里）"""
         total_distance = 0.0
         
         for i in range(len(places) - 1):
-            current = places[i]
-            next_place = places[i + 1]
-            
             # 获取坐标
-            current_coords = current.get('coordinates', {})
-            next_coords = next_place.get('coordinates', {})
+            current_coords = self._get_coordinates(places[i])
+            next_coords = self._get_coordinates(places[i + 1])
             
             if current_coords and next_coords:
-                distance = self._calculate_distance_between_points(
-                    current_coords.get('lat', 0),
-                    current_coords.get('lng', 0),
-                    next_coords.get('lat', 0),
-                    next_coords.get('lng', 0)
-                )
-                total_distance += distance
+                total_distance += self._leg_distance(current_coords, next_coords)
         
         # 如果是环形路线，添加回到起点的距离
-        if len(places) > 2:
-            first_coords = places[0].get('coordinates', {})
-            last_coords = places[-1].get('coordinates', {})
+        if round_trip and len(places) > 2:
+            first_coords = self._get_coordinates(places[0])
+            last_coords = self._get_coordinates(places[-1])
             
             if first_coords and last_coords:
-                final_distance = self._calculate_distance_between_points(
-                    last_coords.get('lat', 0),
-                    last_coords.get('lng', 0),
-                    first_coords.get('lat', 0),
-                    first_coords.get('lng', 0)
-                )
-                total_distance += final_distance
+                total_distance += self._leg_distance(last_coords, first_coords)
         
         return total_distance
     
@@ -103,18 +438,58 @@ class RoutePlanner:
         duration_hours = distance_km / walking_speed
         return int(duration_hours * 60)
     
+    def _format_geometry(self, route_points: List[Dict]):
+        """按配置的几何格式输出路线点"""
+        if self.geometry_format == 'polyline':
+            return to_geometry([(p['latitude'], p['longitude']) for p in route_points], self.polyline_precision)
+        return route_points
+    
     def _generate_route_points(self, places: List[Dict]) -> List[Dict]:
         """生成路线点数据"""
         route_points = []
+        previous = None
         
         for place in places:
-            coords = place.get('coordinates', {})
+            coords = self._get_coordinates(place)
             if coords:
+                # 有路网时沿道路插入中间点
+                if self.router and previous:
+                    leg = self.router.route(previous[0], previous[1], coords[0], coords[1])
+                    for lat, lng in (leg['path'][1:-1] if leg else []):
+                        route_points.append({
+                            'latitude': lat,
+                            'longitude': lng,
+                            'elevation': None,
+                            'timestamp': None
+                        })
                 route_points.append({
-                    'latitude': coords.get('lat', 0),
-                    'longitude': coords.get('lng', 0),
+                    'latitude': coords[0],
+                    'longitude': coords[1],
                     'elevation': None,
                     'timestamp': None
                 })
+                previous = coords
         
         return route_points
+
+
+# 进程池中每个工作进程各自打开的路网与路段缓存（内存映射可在进程间共享页缓存）
+_worker_routers = {}
+_worker_leg_caches = {}
+
+
+def _plan_single_route(places: List[Dict], options: Dict, planner_config: Dict,
+                       router_path: Optional[str] = None, leg_cache_path: Optional[str] = None) -> Optional[Dict]:
+    """规划单条路线（模块级函数，便于在进程池中执行）"""
+    router = None
+    if router_path:
+        router = _worker_routers.get(router_path)
+        if router is None:
+            router = _worker_routers[router_path] = RoadRouter(router_path)
+    leg_cache = None
+    if leg_cache_path:
+        leg_cache = _worker_leg_caches.get(leg_cache_path)
+        if leg_cache is None:
+            leg_cache = _worker_leg_caches[leg_cache_path] = LegCache(leg_cache_path)
+    planner = RoutePlanner(router=router, leg_cache=leg_cache, **planner_config)
+    return planner.plan_walking_route(places, **options)
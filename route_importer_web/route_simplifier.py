@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+路线几何简化
+使用Douglas-Peucker算法为路线预先生成多个缩放级别（LOD）的简化几何，
+移动端按地图缩放级别取用对应层级，避免下载完整的路网路线
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from polyline import geometry_points, to_geometry
+
+# 预生成的缩放级别，容差为该级别下约1像素对应的地面距离
+LOD_ZOOMS = (10, 13, 16)
+
+# Web墨卡托在赤道处 zoom 0 每像素对应的米数
+METERS_PER_PIXEL_Z0 = 156543.03392
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def tolerance_for_zoom(zoom: int, latitude: float = 0.0) -> float:
+    """计算缩放级别下1像素对应的地面距离（米）"""
+    return METERS_PER_PIXEL_Z0 * math.cos(math.radians(latitude)) / (2 ** zoom)
+
+
+def douglas_peucker(points: List[Tuple[float, float]], tolerance: float,
+                    keep: Iterable[int] = ()) -> List[int]:
+    """
+    Douglas-Peucker简化
+
+    使用显式栈代替递归，坐标先投影到以路线中心为基准的平面（米），
+    长路线不会触发递归深度限制。
+
+    Args:
+        points: [(lat, lng), ...]
+        tolerance: 容差（米），偏离弦线小于该值的点被删除
+        keep: 必须保留的点下标（如途经地点）
+
+    Returns:
+        保留的点下标（升序）
+    """
+    n = len(points)
+    if n <= 2:
+        return list(range(n))
+
+    lat0 = math.radians(sum(p[0] for p in points) / n)
+    kx = math.cos(lat0) * math.radians(1) * EARTH_RADIUS_M
+    ky = math.radians(1) * EARTH_RADIUS_M
+    xs = [p[1] * kx for p in points]
+    ys = [p[0] * ky for p in points]
+
+    # 必须保留的点把路线切成若干段，每段独立简化
+    anchors = sorted({0, n - 1} | {i for i in keep if 0 <= i < n})
+    kept = set(anchors)
+    tolerance_sq = tolerance * tolerance
+    stack = list(zip(anchors, anchors[1:]))
+
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        seg_sq = dx * dx + dy * dy
+
+        max_dist_sq = -1.0
+        index = first
+        for i in range(first + 1, last):
+            px, py = xs[i] - ax, ys[i] - ay
+            if seg_sq > 0:
+                t = max(0.0, min(1.0, (px * dx + py * dy) / seg_sq))
+                px -= t * dx
+                py -= t * dy
+            dist_sq = px * px + py * py
+            if dist_sq > max_dist_sq:
+                max_dist_sq = dist_sq
+                index = i
+
+        if max_dist_sq > tolerance_sq:
+            kept.add(index)
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return sorted(kept)
+
+
+def build_lod_tiers(route, places: Optional[List[Dict]] = None,
+                    zooms: Iterable[int] = LOD_ZOOMS) -> Dict[str, object]:
+    """
+    为路线生成各缩放级别的简化几何
+
+    Args:
+        route: 点列表或编码折线格式的路线几何
+        places: 途经地点，其坐标对应的路线点在所有层级中保留
+        zooms: 需要生成的缩放级别
+
+    Returns:
+        {str(zoom): 与输入格式相同的简化几何}；完整几何不重复存储
+    """
+    points = geometry_points(route)
+    if len(points) <= 2:
+        return {}
+
+    keep = _waypoint_indices(points, places or [])
+    latitude = sum(p[0] for p in points) / len(points)
+    tiers = {}
+    for zoom in sorted(zooms):
+        indices = douglas_peucker(points, tolerance_for_zoom(zoom, latitude), keep)
+        if len(indices) == len(points):
+            break
+        if isinstance(route, dict):
+            tiers[str(zoom)] = to_geometry([points[i] for i in indices], route.get('precision', 5))
+        else:
+            tiers[str(zoom)] = [route[i] for i in indices]
+    return tiers
+
+
+def select_tier(route, tiers: Optional[Dict[str, object]], zoom: Optional[int]):
+    """
+    按缩放级别选择几何：取不低于请求级别的最粗层级，超过所有层级时返回完整路线
+    """
+    if zoom is None or not tiers:
+        return route
+    for level in sorted(int(z) for z in tiers):
+        if zoom <= level:
+            return tiers[str(level)]
+    return route
+
+
+def _waypoint_indices(points: List[Tuple[float, float]], places: List[Dict]) -> List[int]:
+    """找出与途经地点坐标相同（约1米内）的路线点下标"""
+    wanted = set()
+    for place in places:
+        coords = place.get('coordinates') or {}
+        lat = coords.get('lat', coords.get('latitude'))
+        lng = coords.get('lng', coords.get('longitude'))
+        if lat is not None and lng is not None:
+            wanted.add((round(float(lat), 5), round(float(lng), 5)))
+    return [i for i, (lat, lng) in enumerate(points) if (round(lat, 5), round(lng, 5)) in wanted]
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Flask服务端会话
+替换Flask默认的Cookie会话：会话内容保存在 SessionStore 中，Cookie只保存会话ID。
+应用代码仍然通过 flask.session 读写，用法不变。
+"""
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+
+from session_store import SessionStore
+
+
+class ServerSideSession(SecureCookieSession):
+    """带会话ID的会话对象（沿用SecureCookieSession的修改和访问跟踪）"""
+
+    def __init__(self, initial=None, sid: str = None, new: bool = False):
+        super().__init__(initial)
+        self.sid = sid
+        self.new = new
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """把会话内容保存在服务端的SessionInterface"""
+
+    session_class = ServerSideSession
+    # 与Flask默认会话相同的序列化方式，支持tuple、bytes、datetime等类型
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.load(sid)
+            if data is not None:
+                return self.session_class(self.serializer.loads(data), sid=sid)
+        return self.session_class(sid=self.store.new_id(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        # 会话被清空：删除服务端记录和Cookie
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        if session.modified:
+            self.store.save(session.sid, self.serializer.dumps(dict(session)))
+        if session.new or self.should_set_cookie(app, session):
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                                httponly=httponly, domain=domain, path=path, secure=secure,
+                                samesite=samesite)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务端会话存储
+解析结果和规划路线保存在SQLite中，Cookie里只有随机的会话ID：
+多天行程不再受Cookie 4KB的限制，请求也不必每次携带并校验整段数据。
+会话在最后一次使用后 ttl 秒过期，过期记录定期清理。
+"""
+
+import secrets
+import threading
+import time
+from typing import Optional
+
+from db_connection import ConnectionManager
+
+SESSIONS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)'
+]
+
+
+class SessionStore:
+    """SQLite会话存储，按最后使用时间过期"""
+
+    def __init__(self, db_path: str, ttl: int = 86400, purge_interval: int = 600):
+        """
+        Args:
+            db_path: 数据库文件路径（可与路线数据库共用）
+            ttl: 会话过期时间（秒），读取时剩余不到一半则续期
+            purge_interval: 清理过期会话的最短间隔（秒）
+        """
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.connections = ConnectionManager(db_path)
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+
+        with self.connections.connection() as conn:
+            for statement in SESSIONS_SCHEMA:
+                conn.execute(statement)
+
+    @staticmethod
+    def new_id() -> str:
+        """生成会话ID（256位随机数，无法猜测，不需要签名）"""
+        return secrets.token_urlsafe(32)
+
+    def load(self, session_id: str) -> Optional[str]:
+        """读取会话数据，不存在或已过期时返回None"""
+        now = time.time()
+        self._maybe_purge(now)
+        row = self.connections.get().execute(
+            'SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?', (session_id, now)
+        ).fetchone()
+        if row is None:
+            return None
+        data, expires_at = row
+        # 只在过了半个有效期后续期，避免每次读取都写数据库
+        if expires_at - now < self.ttl / 2:
+            with self.connections.connection() as conn:
+                conn.execute('UPDATE sessions SET expires_at = ? WHERE id = ?', (now + self.ttl, session_id))
+        return data
+
+    def save(self, session_id: str, data: str):
+        """保存会话数据并续期"""
+        with self.connections.connection() as conn:
+            conn.execute(
+                '''
+                INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at
+                ''',
+                (session_id, data, time.time() + self.ttl)
+            )
+
+    def delete(self, session_id: str):
+        """删除会话"""
+        with self.connections.connection() as conn:
+            conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+
+    def purge(self) -> int:
+        """删除已过期的会话，返回删除数量"""
+        with self.connections.connection() as conn:
+            return conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+
+    def _maybe_purge(self, now: float):
+        with self._lock:
+            if now - self._last_purge < self.purge_interval:
+                return
+            self._last_purge = now
+        try:
+            self.purge()
+        except Exception as e:
+            print(f"清理过期会话失败: {e}")
@@ -6,7 +6,7 @@
 """
 
 import logging
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 from volcengine_douban_final import VolcengineDoubanParser
 from note_parser import XiaohongshuNoteParser
 
@@ -32,47 +32,33 @@ class SmartParser:
         self.logger.info(f"规则解析器回退: {self.fallback_to_rule}")
         self.logger.info("注意: 当前配置下，如果豆包API失败，将不会回退到规则解析器")
     
-    def parse_note(self, text: str, url: str = "") -> Optional[Dict]:
+    def parse_note(self, text: str, url: str = "", progress: Optional[Callable] = None) -> Optional[Dict]:
         """
         智能解析小红书笔记
         
         Args:
             text: 提取的文本内容（如果为空，将从URL中提取）
             url: 原始链接
+            progress: 进度回调 progress(stage, data)，依次报告抓取、文本提取、AI响应和地点解析等阶段
             
         Returns:
             解析后的笔记数据
         """
-        # 如果text为空，先从URL中提取文本
+        # 如果text为空，先从URL中提取文本（直接使用返回值，多个解析任务并发时互不影响）
         if not text and url:
             self.logger.info("文本内容为空，从URL中提取文本...")
-            try:
-                # 使用规则解析器的方法提取原始文本
-                # 先尝试解析一次，获取提取的文本
-                temp_result = self.rule_parser.parse_note(url)
-                if temp_result:
-                    # 从debug文件中读取提取的文本
-                    try:
-                        with open('debug_extracted_text.txt', 'r', encoding='utf-8') as f:
-                            raw_text = f.read()
-                        if raw_text:
-                            text = raw_text
-                            self.logger.info(f"从URL提取到文本，长度: {len(text)} 字符")
-                        else:
-                            self.logger.warning("无法从debug文件读取文本")
-                    except FileNotFoundError:
-                        self.logger.warning("debug文件不存在，无法提取文本")
-                else:
-                    self.logger.warning("无法从URL提取文本")
-            except Exception as e:
-                self.logger.error(f"从URL提取文本失败: {str(e)}")
+            text = self.rule_parser.fetch_text(url, progress=progress)
+            if text:
+                self.logger.info(f"从URL提取到文本，长度: {len(text)} 字符")
+            else:
+                self.logger.warning("无法从URL提取文本")
         
         # 策略1：优先使用火山引擎豆包AI解析器
         if self.use_ai_first and self.volcengine_parser.is_available() and text:
             self.logger.info("尝试使用火山引擎豆包AI解析器...")
             
             try:
-                result = self.volcengine_parser.parse_note(text, url)
+                result = self.volcengine_parser.parse_note(text, url, progress=progress)
                 # 检查多路线结构或单路线结构
                 places_count = 0
                 if result and result.get('routes'):
@@ -97,7 +83,8 @@ class SmartParser:
             self.logger.info("回退到规则解析器...")
             
             try:
-                result = self.rule_parser.parse_note(url)
+                # 已提取文本时直接解析，不再重复请求网页
+                result = self.rule_parser.parse_text(text, url) if text else self.rule_parser.parse_note(url, progress=progress)
                 # 检查多路线结构或单路线结构
                 places_count = 0
                 if result and result.get('routes'):
@@ -86,7 +86,12 @@ class RouteImporter {
                 body: JSON.stringify({ url: url })
             });
             
-            const result = await response.json();
+            let result = await response.json();
+            
+            // 解析在后台执行，轮询任务状态直到完成
+            if (response.status === 202) {
+                result = await this.waitForJob(result.status_url);
+            }
             
             if (result.success) {
                 this.currentRoute = result.data;
@@ -104,6 +109,17 @@ class RouteImporter {
         }
     }
     
+    async waitForJob(statusUrl, interval = 1500) {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, interval));
+            const response = await fetch(statusUrl);
+            const job = await response.json();
+            if (!response.ok || job.status === 'succeeded' || job.status === 'failed') {
+                return job;
+            }
+        }
+    }
+    
     isValidUrl(url) {
         return url.includes('xiaohongshu.com') || url.includes('xhslink.com');
     }
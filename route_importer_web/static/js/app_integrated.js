@@ -116,7 +116,12 @@ async function parseNote() {
             body: JSON.stringify({ url: extractedUrl })
         });
         
-        const result = await response.json();
+        let result = await response.json();
+        
+        // 解析在后台执行，接收进度事件直到完成
+        if (response.status === 202) {
+            result = await followJob(result.job_id, result.status_url);
+        }
         
         if (result.success) {
             currentParsedNote = result.data;
@@ -132,6 +137,99 @@ async function parseNote() {
     }
 }
 
+// 轮询后台任务，直到成功或失败
+async function waitForJob(statusUrl, interval = 1500) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, interval));
+        const response = await fetch(statusUrl);
+        const job = await response.json();
+        if (!response.ok || job.status === 'succeeded' || job.status === 'failed') {
+            return job;
+        }
+        if (job.status === 'queued' && job.position) {
+            showLoading(`排队中，前面还有 ${job.position} 个解析任务...`);
+        } else {
+            showLoading('正在使用AI解析小红书笔记...');
+        }
+    }
+}
+
+// 解析任务各阶段的提示
+const JOB_STAGE_MESSAGES = {
+    queued: '排队等待解析...',
+    running: '开始解析小红书笔记...',
+    fetched: '已获取笔记页面，正在提取文本...',
+    text_extracted: '已提取笔记文本，正在请求AI解析...',
+    ai_request: '正在使用AI解析小红书笔记...',
+    ai_tokens: 'AI正在输出解析结果...',
+    place: 'AI正在识别地点...',
+    parsed: '地点识别完成，正在整理结果...'
+};
+
+// 通过Server-Sent Events接收解析进度，逐个显示识别到的地点；浏览器不支持或连接失败时改为轮询
+function followJob(jobId, statusUrl) {
+    if (!window.EventSource) {
+        return waitForJob(statusUrl);
+    }
+    
+    return new Promise(resolve => {
+        const source = new EventSource(`/api/jobs/${jobId}/events`);
+        let places = [];
+        let finished = false;
+        
+        // 任务结束后查询一次任务状态，获取完整结果
+        const finish = () => {
+            if (finished) return;
+            finished = true;
+            source.close();
+            resolve(waitForJob(statusUrl, 0));
+        };
+        
+        Object.keys(JOB_STAGE_MESSAGES).forEach(stage => {
+            source.addEventListener(stage, event => {
+                const data = JSON.parse(event.data || '{}');
+                let message = JOB_STAGE_MESSAGES[stage];
+                if (stage === 'ai_request') {
+                    // AI请求重试时重新开始识别
+                    places = [];
+                } else if (stage === 'place' && data.place) {
+                    places.push(data.place.name);
+                    message = `AI已识别 ${places.length} 个地点...`;
+                } else if (stage === 'ai_tokens' && !places.length) {
+                    message = `AI正在输出解析结果（已接收 ${data.chars} 字）...`;
+                }
+                if (stage !== 'ai_tokens' || !places.length) {
+                    showProgress(message, places);
+                }
+            });
+        });
+        source.addEventListener('succeeded', finish);
+        source.addEventListener('failed', finish);
+        source.onerror = () => {
+            // 连接中断或服务器定时关闭时浏览器会自动重连；被服务器拒绝（如未启用事件流）时改为轮询
+            if (source.readyState === EventSource.CLOSED && !finished) {
+                finished = true;
+                resolve(waitForJob(statusUrl));
+            }
+        };
+    });
+}
+
+// 显示解析进度和已识别的地点
+function showProgress(message, places) {
+    showLoading(message);
+    if (places.length) {
+        const list = document.createElement('ul');
+        list.className = 'loading-places';
+        places.forEach(name => {
+            const item = document.createElement('li');
+            item.textContent = name;
+            list.appendChild(item);
+        });
+        loadingSection.querySelector('.loading').appendChild(list);
+    }
+}
+
 // 规划路线
 async function planRoute() {
     if (!currentParsedNote) {
@@ -418,6 +516,47 @@ function openRouteInMap(routeId) {
     window.open(mapsUrl, '_blank');
 }
 
+// 解码Google编码折线，返回 [[lat, lng], ...]
+function decodePolyline(encoded, precision = 5) {
+    const factor = Math.pow(10, precision);
+    const points = [];
+    let index = 0;
+    let lat = 0;
+    let lng = 0;
+    
+    while (index < encoded.length) {
+        const deltas = [];
+        for (let k = 0; k < 2; k++) {
+            let shift = 0;
+            let result = 0;
+            let b;
+            do {
+                b = encoded.charCodeAt(index++) - 63;
+                result |= (b & 0x1f) << shift;
+                shift += 5;
+            } while (b >= 0x20);
+            deltas.push((result & 1) ? ~(result >> 1) : (result >> 1));
+        }
+        lat += deltas[0];
+        lng += deltas[1];
+        points.push([lat / factor, lng / factor]);
+    }
+    
+    return points;
+}
+
+// 获取路线几何的坐标点（兼容点列表与编码折线两种格式）
+function getRoutePoints(route) {
+    if (!route) return [];
+    if (route.format === 'polyline') {
+        return decodePolyline(route.polyline || '', route.precision || 5);
+    }
+    if (Array.isArray(route)) {
+        return route.map(point => [point.latitude, point.longitude]);
+    }
+    return [];
+}
+
 // 显示保存路线模态框
 function showSaveModal() {
     // 功能开发中提示
@@ -445,7 +584,7 @@ async function saveRoute() {
         const result = await response.json();
         
         if (result.success) {
-            showSuccess('路线保存成功！');
+            showSuccess(result.message || '路线保存成功！');
             saveModal.style.display = 'none';
             saveForm.reset();
         } else {
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试批量保存路线
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+
+
+def _route(i):
+    return {
+        'id': f'route_{i}', 'name': f'路线{i}', 'created_at': f'2024-01-01T{i:05d}',
+        'places': [{'name': f'地点{(i + j) % 30}', 'category': 'attraction',
+                    'coordinates': {'lat': 35.7 + (i + j) % 30 * 0.001, 'lng': 139.7}} for j in range(5)],
+        'tags': ['东京', f'标签{i % 3}']
+    }
+
+
+def test_bulk_save_in_chunks():
+    """分块写入全部路线，地点、标签和全文索引同步"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'routes.db'))
+        result = db.save_routes((_route(i) for i in range(1234)), chunk_size=100)
+        assert result['saved'] == 1234 and result['failed'] == 0
+        assert len(db.find_routes_by_place('地点0')) == 5 * 1234 // 30 + 1
+        assert db.get_popular_places(1)[0]['route_count'] >= 41
+        assert len(db.get_routes_by_tag('标签1')) == 411
+        assert db.search('路线1233')[0]['route']['id'] == 'route_1233'
+    print("✅ 批量保存路线正确")
+
+
+def test_bulk_reports_per_item_errors():
+    """无效路线单独报告错误，不影响同一块中的其他路线"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'routes.db'))
+        routes = [_route(0), {'id': 'no_name'}, 'not a route', dict(_route(1), places=[object()]),
+                  _route(2), dict(_route(0), name='重复ID以最后一条为准')]
+        result = db.save_routes(routes, chunk_size=10)
+        by_index = {r['index']: r for r in result['results']}
+        assert result['saved'] == 3 and result['failed'] == 3
+        assert not by_index[1]['success'] and not by_index[2]['success'] and not by_index[3]['success']
+        assert by_index[3]['id'] == 'route_1'
+        assert db.get_route('route_0')['name'] == '重复ID以最后一条为准'
+        assert db.get_route('route_1') is None
+        assert [p['name'] for p in db.get_route('route_2')['places']] == [f'地点{j}' for j in range(2, 7)]
+    print("✅ 批量保存逐条报告错误")
+
+
+if __name__ == '__main__':
+    test_bulk_save_in_chunks()
+    test_bulk_reports_per_item_errors()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试重复导入路线的识别
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+from route_fingerprint import canonical_note_id, route_fingerprint
+
+NOTE_URL = 'https://www.xiaohongshu.com/discovery/item/68ac60e5000000001b035a0b?xsec_token=abc&xsec_source=pc_share'
+NOTE_VARIANT = 'http://xiaohongshu.com/explore/68ac60e5000000001b035a0b/'
+PLACES = [{'name': '朝仓雕塑馆'}, {'name': '谷中银座商业街'}, {'name': '猫猫神社'}]
+
+
+def _route(route_id, url=NOTE_URL, places=PLACES):
+    return {'id': route_id, 'name': '谷中散步', 'source_url': url, 'places': places, 'tags': ['东京']}
+
+
+def test_canonical_note_id():
+    """同一笔记的不同链接归一为相同ID"""
+    assert canonical_note_id(NOTE_URL) == canonical_note_id(NOTE_VARIANT) == 'xhs:68ac60e5000000001b035a0b'
+    assert canonical_note_id('https://www.xiaohongshu.com/user/profile/5f0e9a7d0000000001003c3a/'
+                             '68ac60e5000000001b035a0b') == 'xhs:68ac60e5000000001b035a0b'
+    assert canonical_note_id('http://xhslink.com/m/3ehl5ukd72F') == canonical_note_id('https://xhslink.com/m/3ehl5ukd72F?a=1')
+    assert canonical_note_id('https://www.douban.com/note/123456/?from=share') == 'douban:note:123456'
+    assert canonical_note_id('') is None and route_fingerprint(None, PLACES) is None
+
+    spaced = [{'name': ' 朝仓 雕塑馆 '}, {'name': '谷中银座・商业街'}, {'name': '猫猫神社！'}]
+    note_id = canonical_note_id(NOTE_URL)
+    assert route_fingerprint(note_id, spaced) == route_fingerprint(note_id, PLACES)
+    assert route_fingerprint(note_id, PLACES[::-1]) != route_fingerprint(note_id, PLACES)
+    print("✅ 笔记ID和指纹正确")
+
+
+def test_save_duplicates():
+    """重复保存只更新已有路线；不同地点顺序或没有来源的路线正常保存"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'routes.db'))
+        assert db.save_route(_route('r1'))
+        first = db.get_route('r1')
+
+        again = _route('r2', url=NOTE_VARIANT)
+        assert db.save_route(again) and again['id'] == 'r1'
+        assert db.get_route('r2') is None
+        assert db.get_route('r1')['updated_at'] >= first['updated_at']
+        assert db.find_route_by_note(NOTE_VARIANT) == 'r1'
+        assert db.find_route_by_note('https://www.xiaohongshu.com/explore/000000000000000000000000') is None
+
+        # 同一ID再次保存仍是普通更新
+        assert db.save_route(dict(_route('r1'), name='改名'))
+        assert db.get_route('r1')['name'] == '改名'
+
+        assert db.save_route(_route('r3', places=PLACES[::-1]))
+        assert db.save_route(_route('r4', url=''))
+        assert db.save_route(_route('r5', url=''))
+        assert db.get_statistics()['total_routes'] == 4
+    print("✅ 重复路线不新建")
+
+
+def test_bulk_duplicates():
+    """批量导入跳过已存在的和同一批次中重复的路线"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'routes.db'))
+        db.save_route(_route('existing'))
+        other = 'https://www.xiaohongshu.com/explore/111111111111111111111111'
+        result = db.save_routes([
+            _route('a'), _route('b', url=other), _route('c', url=other + '?share=1'), _route('d', places=PLACES[:2])
+        ], chunk_size=10)
+        assert result['saved'] == 4 and result['duplicates'] == 2 and result['failed'] == 0
+        assert [(r['id'], r['duplicate']) for r in result['results']] == [
+            ('existing', True), ('b', False), ('b', True), ('d', False)
+        ]
+        ids = {row[0] for row in db.connections.get().execute('SELECT id FROM routes')}
+        assert ids == {'existing', 'b', 'd'}
+    print("✅ 批量导入跳过重复路线")
+
+
+def test_migrate_existing_duplicates():
+    """旧数据库中已有的重复路线：只有最早的一条保留指纹，唯一索引可以建立"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'routes.db')
+        with sqlite3.connect(path) as conn:
+            conn.execute('''CREATE TABLE routes (id TEXT PRIMARY KEY, name TEXT NOT NULL, description TEXT,
+                source TEXT, source_url TEXT, places TEXT, route TEXT, distance REAL, duration INTEGER,
+                tags TEXT, created_at TEXT, updated_at TEXT)''')
+            for i, url in enumerate([NOTE_URL, NOTE_VARIANT]):
+                conn.execute('INSERT INTO routes (id, name, source_url, places, tags, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                             (f'old_{i}', '旧路线', url, json.dumps(PLACES, ensure_ascii=False), '[]', f'2024-01-0{i + 1}'))
+
+        db = Database(path)
+        rows = dict(db.connections.get().execute('SELECT id, fingerprint FROM routes'))
+        assert rows['old_0'] and rows['old_1'] is None
+        route = _route('new')
+        db.save_route(route)
+        assert route['id'] == 'old_0'
+    print("✅ 旧数据迁移正确")
+
+
+if __name__ == '__main__':
+    test_canonical_note_id()
+    test_save_duplicates()
+    test_bulk_duplicates()
+    test_migrate_existing_duplicates()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试规范化的地点/标签表及迁移
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+
+SENSOJI = {'name': '浅草寺', 'category': 'attraction', 'coordinates': {'lat': 35.7148, 'lng': 139.7967}}
+
+
+def _route(i, places, tags):
+    return {'id': f'route_{i}', 'name': f'路线{i}', 'places': places, 'tags': tags, 'created_at': f'2024-01-0{i + 1}'}
+
+
+def test_place_and_tag_queries():
+    """按地点、类别和标签查询"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'routes.db'))
+        db.save_route(_route(0, [SENSOJI, {'name': '天妇罗店', 'category': 'restaurant'}], ['东京', '美食']))
+        db.save_route(_route(1, [SENSOJI, {'name': '晴空塔', 'category': 'attraction'}], ['东京']))
+        db.save_route(_route(2, [{'name': '谷中银座', 'category': 'shopping'}], ['散步']))
+
+        assert [r['id'] for r in db.find_routes_by_place('浅草寺')] == ['route_1', 'route_0']
+        popular = db.get_popular_places(limit=2)
+        assert popular[0]['name'] == '浅草寺' and popular[0]['route_count'] == 2
+        assert [p['name'] for p in db.get_popular_places(category='restaurant')] == ['天妇罗店']
+        assert [r['id'] for r in db.get_routes_by_tag('东京')] == ['route_1', 'route_0']
+
+        # 重新保存时替换地点，删除路线时级联删除关联
+        db.save_route(_route(1, [{'name': '晴空塔', 'category': 'attraction'}], ['东京']))
+        assert [r['id'] for r in db.find_routes_by_place('浅草寺')] == ['route_0']
+        db.delete_route('route_0')
+        assert db.find_routes_by_place('浅草寺') == []
+        assert db.get_routes_by_tag('美食') == []
+    print("✅ 地点和标签查询正确")
+
+
+def test_migrate_existing_routes():
+    """旧数据库的JSON字段迁移到规范化表"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'routes.db')
+        with sqlite3.connect(path) as conn:
+            conn.execute('''CREATE TABLE routes (id TEXT PRIMARY KEY, name TEXT NOT NULL, description TEXT,
+                source TEXT, source_url TEXT, places TEXT, route TEXT, distance REAL, duration INTEGER,
+                tags TEXT, created_at TEXT, updated_at TEXT)''')
+            for i in range(3):
+                conn.execute('INSERT INTO routes (id, name, places, tags, created_at) VALUES (?, ?, ?, ?, ?)',
+                             (f'route_{i}', f'路线{i}', json.dumps([SENSOJI], ensure_ascii=False),
+                              json.dumps(['东京'], ensure_ascii=False), f'2024-01-0{i + 1}'))
+
+        db = Database(path)
+        assert len(db.find_routes_by_place('浅草寺')) == 3
+        assert db.get_popular_places()[0]['route_count'] == 3
+        assert db.connections.get().execute('PRAGMA user_version').fetchone()[0] >= 1
+    print("✅ 旧数据迁移正确")
+
+
+if __name__ == '__main__':
+    test_place_and_tag_queries()
+    test_migrate_existing_routes()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试路线列表的游标分页
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+
+
+def test_pages_cover_all_routes_once():
+    """逐页获取覆盖全部路线且不重复，同一创建时间按ID排序"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'routes.db'))
+        for i in range(23):
+            db.save_route({
+                'id': f'route_{i:02d}', 'name': f'路线{i}', 'distance': i,
+                'places': [{'name': '浅草寺'}], 'created_at': f'2024-01-{i // 2 + 1:02d}'
+            })
+
+        seen = []
+        cursor = None
+        while True:
+            page = db.list_routes(limit=5, cursor=cursor)
+            seen.extend(route['id'] for route in page['routes'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+        assert seen == [f'route_{i:02d}' for i in range(22, -1, -1)]
+        first = db.list_routes(limit=1)['routes'][0]
+        assert set(first) == {'id', 'name', 'distance', 'duration', 'created_at', 'place_count'}
+        assert first['place_count'] == 1
+    print("✅ 游标分页正确")
+
+
+def test_invalid_cursor():
+    """无效游标抛出ValueError"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'routes.db'))
+        try:
+            db.list_routes(cursor='不是游标')
+            assert False
+        except ValueError:
+            pass
+    print("✅ 无效游标被拒绝")
+
+
+if __name__ == '__main__':
+    test_pages_cover_all_routes_once()
+    test_invalid_cursor()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试FTS5全文搜索
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+
+
+def _save(db, route_id, name, description='', places=(), tags=()):
+    db.save_route({
+        'id': route_id, 'name': name, 'description': description,
+        'places': [{'name': p} for p in places], 'tags': list(tags), 'created_at': route_id
+    })
+
+
+def test_ranking_and_snippet():
+    """名称命中排在描述命中之前，摘要高亮关键词"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'routes.db'))
+        _save(db, 'r1', '东京散步', '最后去浅草寺附近吃天妇罗', tags=['东京'])
+        _save(db, 'r2', '浅草寺一日游', '从雷门出发', places=['浅草寺', '晴空塔'])
+        _save(db, 'r3', '京都寺庙', '伏见稻荷大社')
+
+        results = db.search('浅草寺')
+        assert [r['route']['id'] for r in results] == ['r2', 'r1']
+        assert '<mark>浅草寺</mark>' in results[0]['snippet']
+        assert results[0]['score'] > results[1]['score']
+        assert [r['id'] for r in db.search_routes('浅草寺')] == ['r2', 'r1']
+        assert [r['route']['id'] for r in db.search('晴空塔 浅草寺')] == ['r2']
+    print("✅ BM25排序与高亮摘要正确")
+
+
+def test_index_follows_updates():
+    """触发器同步更新和删除；短关键词和特殊字符可用"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'routes.db'))
+        _save(db, 'r1', '谷中银座散步', tags=['东京'])
+        _save(db, 'r1', '大阪美食路线', tags=['大阪'])
+        assert db.search('谷中银座') == []
+        assert [r['route']['id'] for r in db.search('大阪美食')] == ['r1']
+        assert [r['route']['id'] for r in db.search('大阪')] == ['r1']
+        assert db.search('"100%_') == []
+
+        db.delete_route('r1')
+        assert db.search('大阪美食') == []
+    print("✅ 全文索引随路线更新")
+
+
+def test_migrate_existing_routes():
+    """旧数据库启动时为已有路线建立全文索引"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'routes.db')
+        with sqlite3.connect(path) as conn:
+            conn.execute('''CREATE TABLE routes (id TEXT PRIMARY KEY, name TEXT NOT NULL, description TEXT,
+                source TEXT, source_url TEXT, places TEXT, route TEXT, distance REAL, duration INTEGER,
+                tags TEXT, created_at TEXT, updated_at TEXT)''')
+            conn.execute("INSERT INTO routes (id, name, places, tags) VALUES ('r1', '旧路线', "
+                         "'[{\"name\": \"朝仓雕塑馆\"}]', 'not json')")
+        db = Database(path)
+        assert [r['route']['id'] for r in db.search('朝仓雕塑')] == ['r1']
+    print("✅ 旧数据建立全文索引")
+
+
+if __name__ == '__main__':
+    test_ranking_and_snippet()
+    test_index_follows_updates()
+    test_migrate_existing_routes()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试R*Tree空间索引和附近路线查询
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+
+SENSOJI = {'name': '浅草寺', 'coordinates': {'lat': 35.7148, 'lng': 139.7967}}
+SKYTREE = {'name': '晴空塔', 'coordinates': {'lat': 35.7101, 'lng': 139.8107}}
+TOKYO_TOWER = {'name': '东京塔', 'coordinates': {'lat': 35.6586, 'lng': 139.7454}}
+
+
+def test_nearby_routes():
+    """按最近地点的距离排序，随保存和删除更新"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'routes.db'))
+        db.save_route({'id': 'asakusa', 'name': '浅草散步', 'places': [SENSOJI, SKYTREE]})
+        db.save_route({'id': 'skytree', 'name': '晴空塔周边', 'places': [SKYTREE]})
+        db.save_route({'id': 'minato', 'name': '东京塔夜景', 'places': [TOKYO_TOWER]})
+        db.save_route({'id': 'nowhere', 'name': '没有坐标', 'places': [{'name': '某家店'}]})
+
+        results = db.find_nearby_routes(35.7140, 139.7960, radius=2000)
+        assert [r['route']['id'] for r in results] == ['asakusa', 'skytree']
+        assert results[0]['place'] == '浅草寺' and results[0]['distance'] < 150
+        assert results[0]['distance'] <= results[1]['distance'] <= 2000
+        assert [r['route']['id'] for r in db.find_nearby_routes(35.7140, 139.7960, radius=2000, limit=1)] == ['asakusa']
+        assert db.find_nearby_routes(35.0, 135.0, radius=5000) == []
+
+        # 更新路线后不再经过浅草寺附近
+        db.save_route({'id': 'asakusa', 'name': '改到东京塔', 'places': [TOKYO_TOWER]})
+        assert [r['route']['id'] for r in db.find_nearby_routes(35.7140, 139.7960, radius=500)] == []
+        assert {r['id'] for r in db.find_routes_in_bounds(35.65, 139.74, 35.67, 139.75)} == {'asakusa', 'minato'}
+
+        db.delete_route('minato')
+        assert [r['route']['id'] for r in db.find_nearby_routes(35.6586, 139.7454, radius=100)] == ['asakusa']
+        assert [r['id'] for r in db.find_routes_in_bounds(35.65, 139.74, 35.67, 139.75)] == ['asakusa']
+    print("✅ 附近路线查询正确")
+
+
+def test_migrate_existing_routes():
+    """旧数据库启动时为已有地点和路线建立空间索引"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'routes.db')
+        with sqlite3.connect(path) as conn:
+            conn.execute('''CREATE TABLE routes (id TEXT PRIMARY KEY, name TEXT NOT NULL, description TEXT,
+                source TEXT, source_url TEXT, places TEXT, route TEXT, distance REAL, duration INTEGER,
+                tags TEXT, created_at TEXT, updated_at TEXT)''')
+            conn.execute('INSERT INTO routes (id, name, places, tags, created_at) VALUES (?, ?, ?, ?, ?)',
+                         ('old', '旧路线', json.dumps([SENSOJI, SKYTREE], ensure_ascii=False), '[]', '2024-01-01'))
+
+        db = Database(path)
+        assert [r['route']['id'] for r in db.find_nearby_routes(35.7101, 139.8107, radius=100)] == ['old']
+        assert [r['id'] for r in db.find_routes_in_bounds(35.711, 139.80, 35.712, 139.801)] == ['old']
+    print("✅ 旧数据建立空间索引")
+
+
+if __name__ == '__main__':
+    test_nearby_routes()
+    test_migrate_existing_routes()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试触发器维护的统计表
+"""
+
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+
+CITIES = ['东京', '京都', '香港']
+TAGS = ['散步', '美食', '拍照', '小众']
+
+
+def _expected(db):
+    """全表扫描重新计算统计，用于核对"""
+    conn = db.connections.get()
+    total = conn.execute('SELECT COUNT(*), COALESCE(SUM(distance), 0), COALESCE(SUM(duration), 0) FROM routes').fetchone()
+    by_city = {city: (count, round(distance, 2)) for city, count, distance in conn.execute(
+        'SELECT city, COUNT(*), SUM(distance) FROM routes WHERE city IS NOT NULL GROUP BY city')}
+    by_tag = {tag: (count, round(distance, 2)) for tag, count, distance in conn.execute(
+        'SELECT t.name, COUNT(*), SUM(r.distance) FROM route_tags rt JOIN tags t ON t.id = rt.tag_id '
+        'JOIN routes r ON r.id = rt.route_id GROUP BY t.name')}
+    return total, by_city, by_tag
+
+
+def _check(db):
+    stats = db.get_statistics(top=100)
+    total, by_city, by_tag = _expected(db)
+    assert stats['total_routes'] == total[0]
+    assert abs(stats['total_distance'] - round(total[1], 2)) < 0.011
+    assert stats['total_duration'] == total[2]
+    assert {c['name']: (c['total_routes'], c['total_distance']) for c in stats['by_city']} == by_city
+    assert {t['name']: (t['total_routes'], t['total_distance']) for t in stats['by_tag']} == by_tag
+
+
+def _random_route(rng, i):
+    city = rng.choice(CITIES)
+    return {
+        'id': f'route_{i}', 'name': f'路线{i}', 'distance': round(rng.uniform(1, 10), 2),
+        'duration': rng.randint(20, 200), 'tags': rng.sample(TAGS, rng.randint(0, 3)),
+        'places': [{'name': f'地点{i}-{j}', 'city': city} for j in range(3)]
+    }
+
+
+def test_stats_follow_random_edits():
+    """随机的新增、修改、删除和批量写入后统计与全表扫描一致"""
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'routes.db'))
+        for step in range(300):
+            op = rng.random()
+            i = rng.randint(0, 40)
+            if op < 0.6:
+                db.save_route(_random_route(rng, i))
+            elif op < 0.9:
+                db.delete_route(f'route_{i}')
+            else:
+                db.save_routes([_random_route(rng, rng.randint(0, 40)) for _ in range(5)])
+            if step % 25 == 0:
+                _check(db)
+        _check(db)
+    print("✅ 统计表与全表扫描一致")
+
+
+def test_migrate_existing_routes():
+    """旧数据库迁移时补全城市并初始化统计"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'routes.db')
+        with sqlite3.connect(path) as conn:
+            conn.execute('''CREATE TABLE routes (id TEXT PRIMARY KEY, name TEXT NOT NULL, description TEXT,
+                source TEXT, source_url TEXT, places TEXT, route TEXT, distance REAL, duration INTEGER,
+                tags TEXT, created_at TEXT, updated_at TEXT)''')
+            for i in range(4):
+                places = [{'name': '维港', 'city': '香港'}, {'name': '星光大道', 'city': '香港'}] if i else [{'name': 'x'}]
+                conn.execute('INSERT INTO routes (id, name, distance, duration, places, tags) VALUES (?, ?, ?, ?, ?, ?)',
+                             (f'r{i}', f'路线{i}', 2.5, 30, json.dumps(places, ensure_ascii=False),
+                              json.dumps(['夜景'], ensure_ascii=False)))
+        db = Database(path)
+        stats = db.get_statistics()
+        assert stats['total_routes'] == 4 and stats['total_distance'] == 10.0
+        assert stats['by_city'] == [{'name': '香港', 'total_routes': 3, 'total_distance': 7.5, 'total_duration': 90}]
+        assert stats['by_tag'][0]['name'] == '夜景' and stats['by_tag'][0]['total_routes'] == 4
+        _check(db)
+    print("✅ 旧数据统计初始化正确")
+
+
+if __name__ == '__main__':
+    test_stats_follow_random_edits()
+    test_migrate_existing_routes()
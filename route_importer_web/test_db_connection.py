@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试SQLite连接管理
+"""
+
+import os
+import sys
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db_connection import ConnectionManager
+
+
+def test_wal_and_reuse_per_thread():
+    """同一线程复用连接，不同线程使用不同连接，数据库为WAL模式"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ConnectionManager(os.path.join(tmp, 'test.db'))
+        conn = manager.get()
+        assert manager.get() is conn
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+
+        others = []
+        thread = threading.Thread(target=lambda: others.append(manager.get()))
+        thread.start()
+        thread.join()
+        assert others[0] is not conn
+        manager.close_all()
+    print("✅ 按线程复用WAL连接")
+
+
+def test_transaction_commit_and_rollback():
+    """正常结束时提交，异常时回滚"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ConnectionManager(os.path.join(tmp, 'test.db'))
+        with manager.connection() as conn:
+            conn.execute('CREATE TABLE t (v INTEGER)')
+            conn.execute('INSERT INTO t VALUES (1)')
+        try:
+            with manager.connection() as conn:
+                conn.execute('INSERT INTO t VALUES (2)')
+                raise RuntimeError('失败')
+        except RuntimeError:
+            pass
+        assert manager.get().execute('SELECT v FROM t').fetchall() == [(1,)]
+        manager.close_all()
+    print("✅ 事务提交与回滚正确")
+
+
+def test_reconnect_after_fork():
+    """进程号变化（fork后）重新建立连接"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ConnectionManager(os.path.join(tmp, 'test.db'))
+        conn = manager.get()
+        manager._local.pid = -1
+        assert manager.get() is not conn
+        manager.close_all()
+    print("✅ fork后重新建立连接")
+
+
+if __name__ == '__main__':
+    test_wal_and_reuse_per_thread()
+    test_transaction_commit_and_rollback()
+    test_reconnect_after_fork()
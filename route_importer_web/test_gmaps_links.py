@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试Google Maps导航链接生成
+"""
+
+import os
+import sys
+import urllib.parse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from gmaps_links import RouteLinkCache, build_route_links, chunk_stops
+
+
+def _places(n):
+    return [
+        {'name': f'地点{i}', 'coordinates': {'lat': 35.72 + i * 0.001, 'lng': 139.77}}
+        for i in range(n)
+    ]
+
+
+def test_chunk_stops_are_consecutive():
+    """分段首尾相接，且每段途经点不超过上限"""
+    stops = list(range(25))
+    legs = chunk_stops(stops, max_waypoints=9)
+    assert all(len(leg) - 2 <= 9 for leg in legs)
+    assert all(a[-1] == b[0] for a, b in zip(legs, legs[1:]))
+    assert legs[0][0] == 0 and legs[-1][-1] == 24
+    assert chunk_stops([1], 9) == [] and chunk_stops([1, 2], 9) == [[1, 2]]
+    print(f"✅ 25个站点拆分为{len(legs)}段")
+
+
+def test_walking_links():
+    """生成步行模式链接，环形路线回到起点"""
+    links = build_route_links(_places(5), round_trip=True)
+    assert len(links['legs']) == 1
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(links['legs'][0]['url']).query)
+    assert query['travelmode'] == ['walking']
+    assert query['origin'] == query['destination'] == ['35.720000,139.770000']
+    assert len(query['waypoints'][0].split('|')) == 4
+    assert len(links['places']) == 5
+    print("✅ 步行导航链接正确")
+
+
+def test_cache_per_route_version():
+    """同一版本使用缓存，路线更新后重新生成"""
+    cache = RouteLinkCache()
+    route = {'id': 'r1', 'updated_at': 'v1', 'places': _places(12)}
+    first = cache.get_links(route)
+    assert len(first['legs']) == 2
+    assert cache.get_links(route) is first
+
+    updated = dict(route, updated_at='v2', places=_places(3))
+    assert len(cache.get_links(updated)['legs']) == 1
+    print("✅ 链接按路线版本缓存")
+
+
+if __name__ == '__main__':
+    test_chunk_stops_are_consecutive()
+    test_walking_links()
+    test_cache_per_route_version()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试行程时间安排器
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from itinerary_scheduler import ItineraryScheduler, parse_time, validate_schedule_options
+from route_planner import RoutePlanner
+
+
+PLACES = [
+    {'name': '日暮里站', 'category': 'transportation', 'coordinates': {'lat': 35.7278, 'lng': 139.7708}},
+    {'name': 'Museca Times', 'category': 'restaurant', 'description': '午餐推荐，牛肉汉堡',
+     'coordinates': {'lat': 35.7280, 'lng': 139.7650}},
+    {'name': '朝仓雕塑馆', 'category': 'attraction', 'coordinates': {'lat': 35.7265, 'lng': 139.7690}},
+    {'name': '谷中银座商业街', 'category': 'shopping', 'coordinates': {'lat': 35.7260, 'lng': 139.7680}},
+    {'name': '谷中灵园', 'category': 'park', 'coordinates': {'lat': 35.7230, 'lng': 139.7710}},
+    {'name': '猫猫神社', 'category': 'attraction', 'coordinates': {'lat': 35.7255, 'lng': 139.7670}},
+]
+
+
+def test_lunch_lands_at_lunch_time():
+    """午餐推荐的餐厅安排在午餐时段，且所有地点都在营业时间内"""
+    planner = RoutePlanner()
+    result = planner.plan_walking_route(PLACES, start_time='09:00', start_index=0, weekday=2)
+
+    assert result['unscheduled'] == []
+    assert result['order'][0] == 0
+    lunch = next(item for item in result['schedule'] if item['name'] == 'Museca Times')
+    assert parse_time('11:30') <= parse_time(lunch['start']) <= parse_time('13:30')
+
+    museum = next(item for item in result['schedule'] if item['name'] == '朝仓雕塑馆')
+    assert parse_time(museum['start']) >= parse_time('09:30')
+    for item in result['schedule']:
+        print(f"  {item['start']}-{item['departure']} {item['name']}")
+    print("✅ 午餐安排在午餐时段")
+
+
+def test_closed_day_is_unscheduled():
+    """休息日的地点不安排"""
+    planner = RoutePlanner()
+    result = planner.plan_walking_route(PLACES, start_time='09:00', weekday=0)
+
+    assert [p['name'] for p in result['unscheduled']] == ['朝仓雕塑馆']
+    assert len(result['schedule']) == len(PLACES) - 1
+    assert result['waypoints'] == len(result['places']) == len(PLACES) - 1
+
+    # 多路线规划汇总各天无法安排的地点
+    multi = planner.plan_multi_route([{'route_id': 'day1', 'places': PLACES}, {'route_id': 'day2', 'places': PLACES}],
+                                     start_time='09:00', weekday=0)
+    assert [p['name'] for p in multi['unscheduled']] == ['朝仓雕塑馆']
+    assert multi['waypoints'] == 2 * len(PLACES) - 1
+    print("✅ 周一休馆的朝仓雕塑馆未被安排")
+
+
+def test_invalid_options():
+    """出发时间或星期几无效时报错，而不是规划失败或越界"""
+    validate_schedule_options('09:00', 6)
+    validate_schedule_options(None, None)
+    for start_time, weekday in (('9点', None), ('25:00', None), ('09:60', None), (900, None),
+                                ('09:00', 7), ('09:00', -1), ('09:00', '2'), ('09:00', True)):
+        try:
+            validate_schedule_options(start_time, weekday)
+            assert False, f'应报错: {start_time!r}, {weekday!r}'
+        except ValueError:
+            pass
+    try:
+        ItineraryScheduler().schedule(PLACES[:2], [[0, 1], [1, 0]], start_time='09:00', weekday=7)
+        assert False, 'weekday=7 应报错'
+    except ValueError:
+        pass
+    print("✅ 无效的出发时间和星期几被拒绝")
+
+
+def test_cache_key_includes_description():
+    """描述影响用餐时段安排，描述不同的地点不共用缓存"""
+    planner = RoutePlanner()
+    options = {'start_time': '09:00', 'weekday': 2}
+    dinner = [dict(p, description='晚餐推荐') if p['category'] == 'restaurant' else p for p in PLACES]
+    assert planner._route_cache_key(PLACES, options) != planner._route_cache_key(dinner, options)
+
+    result = planner.plan_multi_route([{'route_id': 'day1', 'places': PLACES},
+                                       {'route_id': 'day2', 'places': dinner}], **options)
+    starts = [next(s['start'] for s in route['schedule'] if s['name'] == 'Museca Times') for route in result['routes']]
+    assert parse_time(starts[0]) < parse_time('14:00') and parse_time(starts[1]) >= parse_time('17:30')
+    print("✅ 缓存键包含描述")
+
+
+if __name__ == '__main__':
+    test_lunch_lands_at_lunch_time()
+    test_closed_day_is_unscheduled()
+    test_invalid_options()
+    test_cache_key_includes_description()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试后台任务队列
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from job_queue import JobQueue, QUEUED, RUNNING, SUCCEEDED, FAILED
+
+
+def _wait(queue, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in (SUCCEEDED, FAILED):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'任务超时: {job_id}')
+
+
+def test_submit_and_complete():
+    """提交后立即返回，工作线程执行后可查询结果和错误"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.db'), workers=2)
+        release = threading.Event()
+
+        def parse(payload, progress):
+            release.wait(5)
+            if payload['url'] == 'bad':
+                raise ValueError('无法解析该笔记')
+            return {'title': payload['url'], 'places': [{'name': '浅草寺'}]}
+
+        queue.register('parse_note', parse)
+        try:
+            ok = queue.submit('parse_note', {'url': '谷中散步'})
+            bad = queue.submit('parse_note', {'url': 'bad'})
+            assert queue.get(ok)['status'] in (QUEUED, RUNNING)
+            assert ok < bad
+            release.set()
+
+            job = _wait(queue, ok)
+            assert job['status'] == SUCCEEDED and job['result']['places'][0]['name'] == '浅草寺'
+            assert job['attempts'] == 1 and job['finished_at'] >= job['started_at']
+            job = _wait(queue, bad)
+            assert job['status'] == FAILED and job['error'] == '无法解析该笔记' and job['result'] is None
+            assert queue.get('missing') is None
+        finally:
+            queue.stop()
+
+        try:
+            queue.submit('unknown', {})
+            assert False, '未知任务类型应报错'
+        except ValueError:
+            pass
+    print("✅ 任务执行和结果查询正确")
+
+
+def test_bounded_workers():
+    """同时执行的任务数不超过工作线程数，排队任务报告位置"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.db'), workers=2)
+        lock = threading.Lock()
+        running = [0, 0]
+        release = threading.Event()
+
+        def slow(payload, progress):
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            release.wait(5)
+            with lock:
+                running[0] -= 1
+            return payload
+
+        queue.register('slow', slow)
+        try:
+            job_ids = [queue.submit('slow', {'i': i}) for i in range(6)]
+            time.sleep(0.2)
+            assert queue.get(job_ids[-1])['position'] == 3
+            release.set()
+            assert [_wait(queue, job_id)['result']['i'] for job_id in job_ids] == list(range(6))
+            assert running[1] == 2
+        finally:
+            queue.stop()
+    print("✅ 工作线程数量受限")
+
+
+def test_progress_events():
+    """处理函数报告的进度按顺序记录，事件流在任务结束后关闭，可从断点继续"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.db'))
+
+        def parse(payload, progress):
+            progress('fetched', {'status': 200})
+            for name in ['浅草寺', '晴空塔']:
+                progress('place', {'name': name})
+            return {'places': 2}
+
+        queue.register('parse_note', parse)
+        try:
+            job_id = queue.submit('parse_note', {'url': 'a'})
+            stream = ''.join(queue.stream_events(job_id, poll_interval=0.01))
+        finally:
+            queue.stop()
+
+        stages = [event['stage'] for event in queue.events(job_id)]
+        assert stages == [QUEUED, RUNNING, 'fetched', 'place', 'place', SUCCEEDED]
+        assert [event['seq'] for event in queue.events(job_id)] == list(range(1, 7))
+        assert stream.startswith('retry: 3000\n\n')
+        assert 'id: 4\nevent: place\ndata: {"name": "浅草寺"}\n\n' in stream
+        assert stream.endswith('id: 6\nevent: succeeded\ndata: {}\n\n')
+
+        resumed = ''.join(queue.stream_events(job_id, after=5))
+        assert resumed == 'retry: 3000\n\nid: 6\nevent: succeeded\ndata: {}\n\n'
+    print("✅ 进度事件和事件流正确")
+
+
+def test_stream_without_final_event():
+    """已结束但没有结束事件的任务（早期版本完成的任务）按任务状态补发结束事件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.db')
+        queue = JobQueue(path)
+        insert = 'INSERT INTO jobs (id, kind, status, error, created_at) VALUES (?, ?, ?, ?, ?)'
+        with sqlite3.connect(path) as conn:
+            conn.execute(insert, ('01A', 'parse_note', SUCCEEDED, None, '2024-01-01'))
+            conn.execute(insert, ('01B', 'parse_note', FAILED, '无法解析该笔记', '2024-01-01'))
+
+        assert ''.join(queue.stream_events('01A', poll_interval=0.01)) == 'retry: 3000\n\nevent: succeeded\ndata: {}\n\n'
+        stream = ''.join(queue.stream_events('01B', poll_interval=0.01))
+        assert stream.endswith('event: failed\ndata: {"error": "无法解析该笔记"}\n\n')
+        assert ''.join(queue.stream_events('missing', poll_interval=0.01)).endswith('event: failed\ndata: {"error": "任务不存在"}\n\n')
+    print("✅ 缺少结束事件时事件流仍然关闭")
+
+
+def test_stream_max_duration():
+    """事件流超过最长时间后关闭，浏览器从最后的事件序号继续"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.db'))
+        release = threading.Event()
+
+        def parse(payload, progress):
+            progress('fetched', {'status': 200})
+            release.wait(5)
+            return {}
+
+        queue.register('parse_note', parse)
+        try:
+            job_id = queue.submit('parse_note', {'url': 'a'})
+            started = time.monotonic()
+            stream = ''.join(queue.stream_events(job_id, poll_interval=0.01, max_duration=0.3))
+            assert time.monotonic() - started < 2
+            assert 'id: 3\nevent: fetched' in stream and 'succeeded' not in stream
+            assert stream.endswith('retry: 500\n\n')
+
+            release.set()
+            resumed = ''.join(queue.stream_events(job_id, after=3, poll_interval=0.01, max_duration=5))
+            assert resumed == 'retry: 3000\n\nid: 4\nevent: succeeded\ndata: {}\n\n'
+        finally:
+            release.set()
+            queue.stop()
+    print("✅ 事件流按最长时间关闭")
+
+
+def test_queued_event_first():
+    """工作线程立即领取任务时 queued 仍是第一条事件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.db'), workers=4)
+        queue.register('parse_note', lambda payload, progress: payload)
+        try:
+            job_ids = [queue.submit('parse_note', {'i': i}) for i in range(20)]
+            for job_id in job_ids:
+                _wait(queue, job_id)
+        finally:
+            queue.stop()
+        for job_id in job_ids:
+            assert [event['stage'] for event in queue.events(job_id)] == [QUEUED, RUNNING, SUCCEEDED]
+    print("✅ 事件顺序正确")
+
+
+def test_coalesce_same_key():
+    """多个进程、多个线程同时提交同一笔记只执行一次，结束后再提交则新建任务"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.db')
+        calls = []
+        release = threading.Event()
+
+        def parse(payload, progress):
+            calls.append(payload['url'])
+            release.wait(5)
+            return {'url': payload['url']}
+
+        # 两个队列实例使用各自的连接，相当于两个工作进程
+        queues = [JobQueue(path), JobQueue(path)]
+        for queue in queues:
+            queue.register('parse_note', parse)
+        barrier = threading.Barrier(16)
+        job_ids = []
+
+        def submit(queue, i):
+            barrier.wait()
+            job_ids.append(queue.submit('parse_note', {'url': f'link{i}'}, key='xhs:68ac60e5000000001b035a0b'))
+
+        threads = [threading.Thread(target=submit, args=(queues[i % 2], i)) for i in range(16)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            other = queues[0].submit('parse_note', {'url': 'other'}, key='xhs:111111111111111111111111')
+            assert len(set(job_ids)) == 1 and other not in job_ids
+            release.set()
+
+            job = _wait(queues[1], job_ids[0])
+            assert job['status'] == SUCCEEDED and job['result'] == {'url': calls[0]}
+            _wait(queues[0], other)
+            assert len(calls) == 2 and 'other' in calls
+
+            again = queues[1].submit('parse_note', {'url': 'link0'}, key='xhs:68ac60e5000000001b035a0b')
+            assert again != job_ids[0] and _wait(queues[1], again)['status'] == SUCCEEDED
+            assert len(calls) == 3
+        finally:
+            for queue in queues:
+                queue.stop()
+    print("✅ 同一笔记的并发解析合并为一个任务")
+
+
+def test_survive_restart():
+    """服务重启后继续执行排队的任务，中断的任务在租约过期后重新执行"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.db')
+        JobQueue(path)
+        # 模拟重启前的任务：一个还在排队，一个执行中进程退出（已领取但没有完成，租约已过期）
+        insert = ('INSERT INTO jobs (id, kind, status, payload, attempts, lease_until, created_at) '
+                  'VALUES (?, ?, ?, ?, ?, ?, ?)')
+        with sqlite3.connect(path) as conn:
+            conn.execute(insert, ('01A', 'parse_note', QUEUED, json.dumps({'url': 'a'}), 0, None, '2024-01-01'))
+            conn.execute(insert, ('01B', 'parse_note', RUNNING, json.dumps({'url': 'b'}), 1, '2000-01-01', '2024-01-01'))
+
+        queue = JobQueue(path, max_attempts=2)
+        queue.register('parse_note', lambda payload, progress: {'url': payload['url']})
+        assert queue.run_pending() == 2
+        assert queue.get('01A')['result'] == {'url': 'a'}
+        assert queue.get('01B')['status'] == SUCCEEDED and queue.get('01B')['attempts'] == 2
+
+        # 超过最多执行次数的任务不再执行
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE jobs SET status = ?, attempts = 2, lease_until = '2000-01-01' WHERE id = '01B'",
+                         (RUNNING,))
+        assert queue.run_pending() == 1
+        assert queue.get('01B')['status'] == FAILED and queue.get('01B')['error']
+    print("✅ 重启后任务继续执行")
+
+
+def test_lost_lease_discards_result():
+    """租约过期后任务被其他工作线程重新领取并完成，原工作线程的结果不覆盖"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.db')
+        queue = JobQueue(path)
+
+        def parse(payload, progress):
+            # 执行期间租约过期，另一个进程重新领取并先完成了任务
+            with sqlite3.connect(path) as conn:
+                conn.execute("UPDATE jobs SET worker = 'other', status = ?, result = ? WHERE id = ?",
+                             (SUCCEEDED, json.dumps({'by': 'other'}), job_id))
+            return {'by': 'me'}
+
+        queue.register('parse_note', parse)
+        job_id = '01A'
+        with sqlite3.connect(path) as conn:
+            conn.execute('INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, ?, ?, ?)',
+                         (job_id, 'parse_note', QUEUED, json.dumps({'url': 'a'}), '2024-01-01'))
+        assert queue.run_pending() == 1
+        assert queue.get(job_id)['result'] == {'by': 'other'}
+        assert [event['stage'] for event in queue.events(job_id)] == [RUNNING]
+    print("✅ 失去租约的结果被丢弃")
+
+
+if __name__ == '__main__':
+    test_submit_and_complete()
+    test_bounded_workers()
+    test_progress_events()
+    test_stream_without_final_event()
+    test_stream_max_duration()
+    test_queued_event_first()
+    test_coalesce_same_key()
+    test_survive_restart()
+    test_lost_lease_discards_result()
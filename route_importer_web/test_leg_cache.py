@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试路段距离缓存
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from leg_cache import LegCache, poi_id
+from road_router import RoadRouter
+from route_planner import RoutePlanner
+from test_road_router import _build_grid_graph
+
+
+PLACES = [
+    {'name': '浅草寺', 'coordinates': {'lat': 35.7148, 'lng': 139.7967}},
+    {'name': '雷门', 'coordinates': {'lat': 35.7111, 'lng': 139.7964}},
+    {'name': '晴空塔', 'coordinates': {'lat': 35.7101, 'lng': 139.8107}},
+    {'name': '上野公园', 'coordinates': {'lat': 35.7156, 'lng': 139.7734}},
+]
+
+
+def test_get_matrix_computes_only_missing_cells():
+    """只计算缺失的单元，持久化后新实例也能命中"""
+    path = tempfile.mktemp(suffix='.db')
+    try:
+        cache = LegCache(path)
+        ids = [poi_id(p) for p in PLACES]
+        requested = []
+
+        def compute(pairs):
+            requested.extend(pairs)
+            return {(i, j): float(i + j) for i, j in pairs}
+
+        first = cache.get_matrix(ids[:3], 'straight', compute)
+        assert len(requested) == 3
+        assert first[0][2] == first[2][0] == 2.0
+
+        requested.clear()
+        LegCache(path).get_matrix(ids, 'straight', compute)
+        assert sorted(requested) == [(0, 3), (1, 3), (2, 3)]
+        assert LegCache(path).get(ids[2], ids[0], 'straight') == 2.0
+        print("✅ 只计算缺失的路段")
+    finally:
+        os.remove(path)
+
+
+def test_planner_with_leg_cache():
+    """使用缓存与不使用缓存的规划结果一致；没有路网时不写入缓存"""
+    path = tempfile.mktemp(suffix='.db')
+    graph_path = tempfile.mktemp(suffix='.graph')
+    _build_grid_graph(graph_path)
+    router = RoadRouter(graph_path)
+    try:
+        cache = LegCache(path)
+        RoutePlanner(leg_cache=cache).plan_walking_route(PLACES)
+        assert _cached_modes(cache) == []
+
+        places = [
+            {'name': '日暮里站', 'coordinates': {'lat': 35.7278, 'lng': 139.7708}},
+            {'name': '朝仓雕塑馆', 'coordinates': {'lat': 35.7265, 'lng': 139.7690}},
+            {'name': '谷中银座商业街', 'coordinates': {'lat': 35.7260, 'lng': 139.7680}},
+            {'name': '根津神社', 'coordinates': {'lat': 35.7202, 'lng': 139.7607}},
+        ]
+        cached_planner = RoutePlanner(router=router, leg_cache=cache)
+        expected = RoutePlanner(router=router).plan_walking_route(places)
+        for _ in range(2):
+            result = cached_planner.plan_walking_route(places)
+            assert result['order'] == expected['order']
+            assert abs(result['distance'] - expected['distance']) < 1e-9
+        assert _cached_modes(cache) == [f'road:{router.identity}']
+        print("✅ 缓存规划结果一致")
+    finally:
+        router.close()
+        os.remove(graph_path)
+        os.remove(path)
+
+
+def test_graph_update_invalidates_legs():
+    """路网文件更新后缓存键改变，不会读到旧路网的距离"""
+    graph_path = tempfile.mktemp(suffix='.graph')
+    try:
+        _build_grid_graph(graph_path, seed=0)
+        router = RoadRouter(graph_path)
+        old_identity = router.identity
+        assert RoadRouter(graph_path).identity == old_identity
+        router.close()
+
+        _build_grid_graph(graph_path, seed=1)
+        os.utime(graph_path, ns=(0, os.stat(graph_path).st_mtime_ns + 1))
+        router = RoadRouter(graph_path)
+        assert router.identity != old_identity
+        router.close()
+        print("✅ 路网更新后缓存失效")
+    finally:
+        os.remove(graph_path)
+
+
+def _cached_modes(cache):
+    rows = cache.connections.get().execute('SELECT DISTINCT mode FROM legs').fetchall()
+    return [row[0] for row in rows]
+
+
+if __name__ == '__main__':
+    test_get_matrix_computes_only_missing_cells()
+    test_planner_with_leg_cache()
+    test_graph_update_invalidates_legs()
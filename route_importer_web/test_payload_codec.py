@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试路线字段的存储编码
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import payload_codec
+from database import Database
+
+
+def _route(i, place='朝仓雕塑馆'):
+    return {
+        'id': f'route_{i}',
+        'name': f'谷中散步路线{i}',
+        'places': [
+            {'name': place, 'city': '东京', 'coordinates': {'lat': 35.7 + j * 0.001, 'lng': 139.76}, 'order': j}
+            for j in range(5)
+        ],
+        'route': {'polyline': '_p~iF~ps|U_ulLnnqC_mqNvxq`@'},
+        'route_lod': {'10': '_p~iF~ps|U'},
+        'tags': ['东京', '散步']
+    }
+
+
+def test_codec_round_trip():
+    """编码后可以解码，字典ID写在头部"""
+    value = _route(1)['places']
+    samples = [payload_codec.ZlibJsonCodec().serialize(_route(i)['places']) for i in range(20)]
+    dictionary = payload_codec.train_dictionary('json+zlib', samples)
+    assert dictionary and len(dictionary) <= payload_codec.ZLIB_MAX_DICTIONARY
+
+    codec = payload_codec.get_codec('json+zlib', dictionary, 7)
+    encoded = codec.encode(value)
+    assert isinstance(encoded, bytes) and payload_codec.dictionary_id(encoded) == 7
+    assert len(encoded) < len(payload_codec.JsonCodec().encode(value).encode('utf-8'))
+    assert payload_codec.decode(encoded, {7: dictionary}) == value
+    assert payload_codec.decode(payload_codec.JsonCodec().encode(value)) == value
+
+    try:
+        payload_codec.decode(encoded, {})
+        assert False, '缺少字典应当报错'
+    except ValueError:
+        pass
+    try:
+        payload_codec.get_codec('unknown')
+        assert False, '未知编码应当报错'
+    except ValueError:
+        pass
+    print("✅ 编码解码正确")
+
+
+def test_database_codec():
+    """按数据库选择编码，迁移后新旧数据都可读取，全文索引不受影响"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'routes.db')
+        db = Database(path)
+        for i in range(10):
+            db.save_route(_route(i))
+        expected = db.get_route('route_3')
+
+        assert db.migrate_codec('json+zlib') == 10
+        assert db.get_route('route_3') == expected
+        types = {row[0] for row in db.connections.get().execute('SELECT typeof(places) FROM routes')}
+        assert types == {'blob'}
+
+        # 重新打开时沿用数据库保存的编码
+        reopened = Database(path)
+        assert reopened.codec.name == 'json+zlib' and reopened.codec.dictionary_id
+        reopened.save_route(_route(20, place='浅草寺'))
+        assert db.get_route('route_20')['places'][0]['name'] == '浅草寺'
+        assert [r['route']['id'] for r in db.search('浅草寺')] == ['route_20']
+        assert len(db.search('朝仓')) == 10
+        assert db.get_statistics()['by_city'][0]['total_routes'] == 11
+
+        # 切换回JSON：已有的压缩数据仍可读取
+        db.set_codec('json')
+        db.save_route(_route(21))
+        assert db.get_route('route_21')['places'] == _route(21)['places']
+        assert db.get_route('route_3') == expected
+    print("✅ 数据库存储编码正确")
+
+
+def test_migrate_existing_routes():
+    """旧数据库补充地点名称列，全文索引仍能搜索地点"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'routes.db')
+        with sqlite3.connect(path) as conn:
+            conn.execute('''CREATE TABLE routes (id TEXT PRIMARY KEY, name TEXT NOT NULL, description TEXT,
+                source TEXT, source_url TEXT, places TEXT, route TEXT, distance REAL, duration INTEGER,
+                tags TEXT, created_at TEXT, updated_at TEXT)''')
+            conn.execute("INSERT INTO routes (id, name, places, tags) VALUES ('route_1', '旧路线', "
+                         "'[{\"name\": \"朝仓雕塑馆\"}]', '[]')")
+        db = Database(path, codec='json+zlib')
+        assert db.codec.name == 'json+zlib'
+        assert [r['route']['id'] for r in db.search('朝仓雕塑')] == ['route_1']
+        assert db.get_route('route_1')['places'] == [{'name': '朝仓雕塑馆'}]
+    print("✅ 旧数据迁移正确")
+
+
+if __name__ == '__main__':
+    test_codec_round_trip()
+    test_database_codec()
+    test_migrate_existing_routes()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试增量路线规划会话
+"""
+
+import os
+import random
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from planning_session import PlanningSession
+from route_planner import RoutePlanner
+
+
+def _random_place(rng, i):
+    """浅草附近的随机地点"""
+    return {'name': f'地点{i}', 'coordinates': {'lat': 35.70 + rng.random() * 0.03, 'lng': 139.78 + rng.random() * 0.03}}
+
+
+def test_incremental_edits_keep_distance_consistent():
+    """任意编辑序列后，增量维护的距离与完整重算一致，变化区间与完整路线一致"""
+    rng = random.Random(5)
+    for round_trip in (False, True):
+        session = PlanningSession([_random_place(rng, i) for i in range(20)], RoutePlanner(), round_trip=round_trip)
+        next_index = 100
+        for _ in range(200):
+            choice = rng.random()
+            if choice < 0.4 or len(session.tour) < 3:
+                delta = session.insert(_random_place(rng, next_index))
+                next_index += 1
+            elif choice < 0.7:
+                delta = session.remove(rng.choice(session.tour))
+            else:
+                delta = session.move(rng.choice(session.tour), rng.randrange(len(session.tour)),
+                                     reoptimize=rng.random() < 0.5)
+
+            assert abs(session.length - session._full_length()) < 1e-9
+            order = session.state()['order']
+            segment = [p['place_id'] for p in delta['segment']]
+            assert order[delta['changed_from']:delta['changed_to'] + 1] == segment
+    print("✅ 增量编辑结果一致")
+
+
+def test_cheapest_insertion():
+    """插入位于两点之间的地点时放在两者中间"""
+    planner = RoutePlanner()
+    places = [
+        {'name': '上野公园', 'coordinates': {'lat': 35.7156, 'lng': 139.7734}},
+        {'name': '浅草寺', 'coordinates': {'lat': 35.7148, 'lng': 139.7967}},
+        {'name': '晴空塔', 'coordinates': {'lat': 35.7101, 'lng': 139.8107}},
+    ]
+    session = PlanningSession(places, planner, optimize=False)
+
+    delta = session.insert({'name': '合羽桥道具街', 'coordinates': {'lat': 35.7140, 'lng': 139.7880}})
+
+    assert session.state()['order'] == [0, 3, 1, 2]
+    assert delta['distance_delta'] > 0
+    print("✅ 最便宜插入位置正确")
+
+
+def test_invalid_position():
+    """位置不是范围内的整数、地点ID不存在时报错，且会话不被修改"""
+    rng = random.Random(7)
+    session = PlanningSession([_random_place(rng, i) for i in range(5)], RoutePlanner())
+    state = session.state()
+    place = _random_place(rng, 5)
+
+    for position in ('2', 1.5, True, -1, 6, [1]):
+        for edit in (lambda: session.insert(place, position), lambda: session.move(session.tour[0], position)):
+            try:
+                edit()
+                assert False, f'无效位置应报错: {position!r}'
+            except ValueError:
+                pass
+    for place_id in ('0', 99, None, [0]):
+        try:
+            session.remove(place_id)
+            assert False, f'无效地点ID应报错: {place_id!r}'
+        except ValueError:
+            pass
+    assert session.state() == state
+
+    session.move(session.tour[0], 4)
+    session.insert(place, 5)
+    assert sorted(session.tour) == list(range(6))
+    print("✅ 无效位置被拒绝")
+
+
+def test_invalid_places():
+    """地点不是数组、地点不是对象或坐标无效时报错"""
+    planner = RoutePlanner()
+    place = {'name': '浅草寺', 'coordinates': {'lat': 35.7148, 'lng': 139.7967}}
+    for places in ('浅草寺', {'name': '浅草寺'}, [place, '雷门'], [place, None], [place, {'coordinates': '35.7,139.8'}],
+                   [place, {'coordinates': {'lat': 'abc', 'lng': 139.8}}], [place, {'coordinates': {'lat': 35.7}}]):
+        try:
+            PlanningSession(places, planner)
+            assert False, f'应报错: {places!r}'
+        except ValueError:
+            pass
+
+    session = PlanningSession([place, {'name': '雷门', 'coordinates': {'latitude': '35.7111', 'longitude': '139.7964'}}],
+                              planner)
+    for bad in ('雷门', [place], {'coordinates': None}, {'coordinates': {'lat': float('nan'), 'lng': 139.8}}):
+        try:
+            session.insert(bad)
+            assert False, f'应报错: {bad!r}'
+        except ValueError:
+            pass
+    assert len(session.tour) == 2
+    print("✅ 无效地点被拒绝")
+
+
+if __name__ == '__main__':
+    test_incremental_edits_keep_distance_consistent()
+    test_cheapest_insertion()
+    test_invalid_position()
+    test_invalid_places()
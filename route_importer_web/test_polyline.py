@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试编码折线
+"""
+
+import json
+import os
+import random
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from polyline import encode, decode, geometry_points
+from route_planner import RoutePlanner
+
+
+def test_google_reference_example():
+    """与Google文档中的示例一致"""
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode(points) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+    assert decode('_p~iF~ps|U_ulLnnqC_mqNvxq`@') == points
+    print("✅ Google示例编码正确")
+
+
+def test_round_trip_precision():
+    """按精度往返编码"""
+    rng = random.Random(7)
+    points = [(35.7 + rng.random() * 0.1, 139.7 + rng.random() * 0.1) for _ in range(200)]
+    for precision in (5, 6):
+        decoded = decode(encode(points, precision), precision)
+        assert all(abs(a[0] - b[0]) <= 0.5 / 10 ** precision + 1e-12 and
+                   abs(a[1] - b[1]) <= 0.5 / 10 ** precision + 1e-12
+                   for a, b in zip(points, decoded))
+    print("✅ 往返编码精度正确")
+
+
+def test_planner_polyline_geometry_is_smaller():
+    """编码折线格式的路线体积约为点列表的十分之一"""
+    rng = random.Random(1)
+    places = [
+        {'name': f'地点{i}', 'coordinates': {'lat': 35.71 + rng.random() * 0.02, 'lng': 139.77 + rng.random() * 0.02}}
+        for i in range(30)
+    ]
+    points_route = RoutePlanner().plan_walking_route(places)
+    polyline_route = RoutePlanner(geometry_format='polyline').plan_walking_route(places)
+
+    assert len(json.dumps(polyline_route['route'])) * 10 < len(json.dumps(points_route['route']))
+    expected = geometry_points(points_route['route'])
+    assert all(abs(a[0] - b[0]) < 1e-5 and abs(a[1] - b[1]) < 1e-5
+               for a, b in zip(geometry_points(polyline_route['route']), expected))
+    print("✅ 编码折线体积缩小超过10倍")
+
+
+if __name__ == '__main__':
+    test_google_reference_example()
+    test_round_trip_precision()
+    test_planner_polyline_geometry_is_smaller()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试离线步行路网路由器
+"""
+
+import os
+import random
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from road_router import RoadRouter, write_graph, _haversine_m
+from route_planner import RoutePlanner
+
+
+def _build_grid_graph(path, size=30, seed=0):
+    """生成谷中附近的随机网格路网"""
+    rng = random.Random(seed)
+    nodes = [(35.72 + i * 0.0009, 139.76 + j * 0.0011) for i in range(size) for j in range(size)]
+    edges = []
+    for i in range(size):
+        for j in range(size):
+            u = i * size + j
+            neighbours = []
+            if i + 1 < size:
+                neighbours.append((i + 1) * size + j)
+            if j + 1 < size:
+                neighbours.append(i * size + j + 1)
+            for v in neighbours:
+                if rng.random() < 0.85:
+                    edges.append((u, v, _haversine_m(*nodes[u], *nodes[v]) * rng.uniform(1.0, 1.3)))
+    write_graph(path, nodes, edges)
+    return nodes
+
+
+def test_bidirectional_astar_matches_dijkstra():
+    """双向A*与Dijkstra结果一致"""
+    path = tempfile.mktemp(suffix='.graph')
+    nodes = _build_grid_graph(path)
+    router = RoadRouter(path)
+    rng = random.Random(1)
+    try:
+        for _ in range(50):
+            s, t = rng.randrange(len(nodes)), rng.randrange(len(nodes))
+            result = router._bidirectional_astar(s, t)
+            expected = router._dijkstra(s, {t})
+            if result is None:
+                assert t not in expected
+                continue
+            assert abs(result[0] - expected[t]) < 1e-3
+            assert result[1][0] == s and result[1][-1] == t
+        print("✅ 双向A*结果正确")
+    finally:
+        router.close()
+        os.remove(path)
+
+
+def test_planner_uses_road_distances():
+    """配置路网后规划距离不小于直线距离，且路线沿道路展开"""
+    path = tempfile.mktemp(suffix='.graph')
+    _build_grid_graph(path)
+    router = RoadRouter(path)
+    try:
+        places = [
+            {'name': '日暮里站', 'coordinates': {'lat': 35.7278, 'lng': 139.7708}},
+            {'name': '朝仓雕塑馆', 'coordinates': {'lat': 35.7265, 'lng': 139.7690}},
+            {'name': '谷中银座商业街', 'coordinates': {'lat': 35.7260, 'lng': 139.7680}},
+        ]
+        straight = RoutePlanner().plan_walking_route(places)
+        road = RoutePlanner(router=router).plan_walking_route(places)
+
+        assert road['distance'] >= straight['distance']
+        assert len(road['route']) > len(straight['route'])
+        print(f"✅ 直线 {straight['distance']:.3f}km，路网 {road['distance']:.3f}km")
+    finally:
+        router.close()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    test_bidirectional_astar_matches_dijkstra()
+    test_planner_uses_road_distances()
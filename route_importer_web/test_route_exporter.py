@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试路线导出（GPX / KML / GeoJSON）
+"""
+
+import json
+import os
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+from polyline import to_geometry
+from route_exporter import export_geojson, export_gpx, export_kml
+
+
+def _make_db(tmp, n=3):
+    db = Database(os.path.join(tmp, 'routes.db'))
+    for i in range(n):
+        places = [
+            {'name': f'地点{i}-{j} & <店>', 'category': 'attraction',
+             'coordinates': {'lat': 35.72 + j * 0.001, 'lng': 139.77 + i * 0.001}}
+            for j in range(4)
+        ]
+        db.save_route({
+            'id': f'route_{i}',
+            'name': f'路线{i}',
+            'places': places,
+            'route': to_geometry([(p['coordinates']['lat'], p['coordinates']['lng']) for p in places]),
+            'created_at': f'2024-01-0{i + 1}'
+        })
+    return db
+
+
+def test_gpx_is_valid_and_ordered():
+    """GPX可解析，所有wpt在trk之前"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _make_db(tmp)
+        root = ET.fromstring(''.join(export_gpx(db.iter_routes)))
+        ns = '{http://www.topografix.com/GPX/1/1}'
+        tags = [child.tag.replace(ns, '') for child in root]
+        assert tags == ['wpt'] * 12 + ['trk'] * 3
+        assert len(root.findall(f'{ns}trk/{ns}trkseg/{ns}trkpt')) == 12
+    print("✅ GPX导出正确")
+
+
+def test_kml_and_geojson():
+    """KML可解析，GeoJSON包含路线与地点要素"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _make_db(tmp)
+        kml = ET.fromstring(''.join(export_kml(db.iter_routes)))
+        assert len(kml.findall('.//{http://www.opengis.net/kml/2.2}Placemark')) == 15
+
+        collection = json.loads(''.join(export_geojson(lambda: db.iter_routes(['route_1']))))
+        kinds = [feature['geometry']['type'] for feature in collection['features']]
+        assert kinds == ['LineString'] + ['Point'] * 4
+        assert collection['features'][0]['geometry']['coordinates'][0] == [139.771, 35.72]
+    print("✅ KML / GeoJSON导出正确")
+
+
+def test_export_streams_lazily():
+    """导出器逐段输出，开始输出时不读取全部路线"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _make_db(tmp)
+        consumed = []
+
+        def routes():
+            for route in db.iter_routes():
+                consumed.append(route['id'])
+                yield route
+
+        chunks = export_geojson(routes)
+        next(chunks)
+        next(chunks)
+        assert len(consumed) == 1
+        assert json.loads(next(chunks)[2:])['properties']['route_id'] == 'route_2'
+        chunks.close()
+    print("✅ 导出为流式输出")
+
+
+def test_export_many_ids():
+    """指定的路线ID超过SQL参数数量限制时分批查询，整体仍按创建时间倒序"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _make_db(tmp, n=5)
+        ids = [f'missing_{i}' for i in range(40000)] + ['route_1', 'route_3', 'route_4', 'route_1']
+        exported = [route['id'] for route in db.iter_routes(ids, chunk_size=2)]
+        assert exported == ['route_4', 'route_3', 'route_1']
+        assert [route['id'] for route in db.iter_routes(ids)] == exported
+    print("✅ 大量路线ID分批导出")
+
+
+if __name__ == '__main__':
+    test_gpx_is_valid_and_ordered()
+    test_kml_and_geojson()
+    test_export_streams_lazily()
+    test_export_many_ids()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试路线ID生成
+"""
+
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from route_ids import ULID_LENGTH, UlidGenerator, new_route_id, new_ulid, ulid_datetime
+
+
+def test_format_and_order():
+    """ID按时间排序，同一毫秒内严格递增"""
+    generator = UlidGenerator()
+    ids = [generator.generate(1700000000000) for _ in range(1000)]
+    assert all(len(id_) == ULID_LENGTH for id_ in ids)
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert generator.generate(1700000000001) > ids[-1]
+    # 时钟回拨时仍然递增
+    assert generator.generate(1699999999999) > ids[-1]
+
+    route_id = new_route_id()
+    assert route_id.startswith('route_')
+    assert abs(ulid_datetime(route_id).timestamp() - time.time()) < 5
+    assert ulid_datetime('route_20240101_120000') is None
+    print("✅ ID格式和顺序正确")
+
+
+def test_concurrent_unique():
+    """多线程同时生成不重复"""
+    results = []
+
+    def worker():
+        results.append([new_ulid() for _ in range(5000)])
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    all_ids = [id_ for ids in results for id_ in ids]
+    assert len(set(all_ids)) == len(all_ids)
+    assert all(ids == sorted(ids) for ids in results)
+    print("✅ 并发生成不重复")
+
+
+if __name__ == '__main__':
+    test_format_and_order()
+    test_concurrent_unique()
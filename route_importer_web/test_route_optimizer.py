@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试访问顺序优化器
+"""
+
+import itertools
+import random
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from route_optimizer import RouteOptimizer
+from route_planner import RoutePlanner
+
+
+def _random_matrix(n, seed):
+    """生成随机平面点的距离矩阵"""
+    rng = random.Random(seed)
+    points = [(rng.random(), rng.random()) for _ in range(n)]
+    return [[((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5 for b in points] for a in points]
+
+
+def test_exact_small_routes():
+    """小规模路线应得到最优解"""
+    optimizer = RouteOptimizer()
+    matrix = _random_matrix(7, seed=1)
+
+    for round_trip, start, end in [(False, None, None), (True, None, None), (False, 0, 6), (False, None, 3)]:
+        order = optimizer.optimize(matrix, round_trip=round_trip, start=start, end=end)
+        candidates = [
+            p for p in itertools.permutations(range(7))
+            if (start is None or p[0] == start) and (end is None or p[-1] == end)
+        ]
+        best = min(optimizer.tour_length(matrix, p, round_trip) for p in candidates)
+
+        assert abs(optimizer.tour_length(matrix, order, round_trip) - best) < 1e-9
+        if start is not None:
+            assert order[0] == start
+        if end is not None:
+            assert order[-1] == end
+
+    print("✅ 小规模路线求得最优解")
+
+
+def test_large_route_within_budget():
+    """大规模路线在时间预算内得到明显改进"""
+    optimizer = RouteOptimizer(time_budget=0.3)
+    matrix = _random_matrix(120, seed=2)
+
+    order = optimizer.optimize(matrix, start=0)
+
+    assert sorted(order) == list(range(120))
+    assert order[0] == 0
+    assert optimizer.tour_length(matrix, order) < optimizer.tour_length(matrix, list(range(120))) / 3
+    print("✅ 大规模路线优化完成")
+
+
+def test_planner_open_path_has_no_closing_leg():
+    """开放路径不应计算回到起点的距离"""
+    planner = RoutePlanner()
+    places = [
+        {'name': '日暮里站', 'coordinates': {'lat': 35.7278, 'lng': 139.7708}},
+        {'name': '谷中银座商业街', 'coordinates': {'lat': 35.7260, 'lng': 139.7680}},
+        {'name': '朝仓雕塑馆', 'coordinates': {'latitude': 35.7265, 'longitude': 139.7690}},
+    ]
+
+    open_route = planner.plan_walking_route(places, start_index=0)
+    loop_route = planner.plan_walking_route(places, start_index=0, round_trip=True)
+
+    assert open_route['order'] == [0, 2, 1]
+    assert open_route['distance'] < loop_route['distance']
+    print(f"✅ 开放路径 {open_route['distance']:.3f}km，环形路线 {loop_route['distance']:.3f}km")
+
+
+if __name__ == '__main__':
+    test_exact_small_routes()
+    test_large_route_within_budget()
+    test_planner_open_path_has_no_closing_leg()
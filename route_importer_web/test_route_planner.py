@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试多路线并行规划
+"""
+
+import random
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from route_planner import RoutePlanner
+
+
+def _tokyo_routes():
+    """两天的东京行程"""
+    return [
+        {
+            'route_id': 'day1',
+            'route_name': 'Day1 谷中',
+            'places': [
+                {'name': '日暮里站', 'coordinates': {'lat': 35.7278, 'lng': 139.7708}},
+                {'name': '朝仓雕塑馆', 'coordinates': {'lat': 35.7265, 'lng': 139.7690}},
+                {'name': '谷中银座商业街', 'coordinates': {'lat': 35.7260, 'lng': 139.7680}},
+            ]
+        },
+        {
+            'route_id': 'day2',
+            'route_name': 'Day2 浅草',
+            'places': [
+                {'name': '浅草寺', 'coordinates': {'lat': 35.7148, 'lng': 139.7967}},
+                {'name': '雷门', 'coordinates': {'lat': 35.7111, 'lng': 139.7964}},
+            ]
+        }
+    ]
+
+
+def test_plan_multi_route():
+    """每条路线独立规划，并汇总距离和时间"""
+    planner = RoutePlanner()
+    routes = _tokyo_routes()
+
+    result = planner.plan_multi_route(routes)
+
+    assert [r['route_id'] for r in result['routes']] == ['day1', 'day2']
+    assert all(r['success'] for r in result['routes'])
+    assert abs(result['distance'] - sum(r['distance'] for r in result['routes'])) < 1e-9
+    assert result['waypoints'] == 5
+    # 不应出现跨天的连接距离（谷中到浅草约2.5公里）
+    assert result['distance'] < 1.5
+    print(f"✅ 多路线规划成功，总距离 {result['distance']:.3f}km")
+
+
+def test_plan_multi_route_cache():
+    """修改一天的行程只重新规划该天"""
+    planner = RoutePlanner()
+    routes = _tokyo_routes()
+    planner.plan_multi_route(routes)
+
+    calls = []
+    original = planner.plan_walking_route
+
+    def counting_plan(places, **kwargs):
+        calls.append(places)
+        return original(places, **kwargs)
+
+    planner.plan_walking_route = counting_plan
+    routes[1]['places'].append({'name': '晴空塔', 'coordinates': {'lat': 35.7101, 'lng': 139.8107}})
+    result = planner.plan_multi_route(routes)
+
+    assert len(calls) == 1
+    assert result['routes'][1]['waypoints'] == 3
+    print("✅ 未修改的路线命中缓存")
+
+
+def test_executor_reused_and_cache_copies():
+    """并行规划默认使用进程池并在多次请求间复用；修改返回结果不影响缓存"""
+    planner = RoutePlanner()
+    assert planner.use_processes and not RoutePlanner(max_workers=1).use_processes
+    routes = _tokyo_routes()
+    try:
+        planner.plan_multi_route(routes)
+        executor = planner._executor
+        routes[0]['places'].append({'name': '根津神社', 'coordinates': {'lat': 35.7202, 'lng': 139.7607}})
+        routes[1]['places'].append({'name': '晴空塔', 'coordinates': {'lat': 35.7101, 'lng': 139.8107}})
+        planner.plan_multi_route(routes)
+        assert planner._executor is executor
+
+        cached = planner.plan_multi_route(routes)
+        cached['routes'][0]['places'].clear()
+        cached['routes'][1]['order'].reverse()
+        again = planner.plan_multi_route(routes)
+        assert len(again['routes'][0]['places']) == 4
+        assert again['routes'][1]['order'] != cached['routes'][1]['order']
+    finally:
+        planner.close()
+    assert planner._executor is None
+    print("✅ 进程池复用，缓存返回副本")
+
+
+def test_split_into_days():
+    """没有Day标记的长列表按步行时间预算拆分为多天"""
+    planner = RoutePlanner()
+    rng = random.Random(3)
+    centers = [(35.7148, 139.7967), (35.6896, 139.7006), (35.7260, 139.7680)]
+    places = []
+    for i in range(36):
+        lat, lng = centers[i % 3]
+        places.append({
+            'name': f'地点{i}',
+            'coordinates': {'lat': lat + rng.gauss(0, 0.004), 'lng': lng + rng.gauss(0, 0.004)}
+        })
+
+    days = planner.split_into_days(places, max_day_minutes=120)
+
+    assert len(days) >= 2
+    assert sorted(p['name'] for d in days for p in d['places']) == sorted(p['name'] for p in places)
+    for day in days:
+        assert planner._estimate_duration(planner._calculate_total_distance(day['places'])) <= 120
+    print(f"✅ 拆分为 {len(days)} 天: {[len(d['places']) for d in days]}")
+
+
+def test_split_duplicate_coordinates():
+    """坐标相同的地点（同一地点重复列出或回退到同一坐标）每个只出现在一天中"""
+    planner = RoutePlanner()
+    places = [{'name': f'p{i}', 'coordinates': {'lat': 35.7148, 'lng': 139.7967}} for i in range(4)]
+    places.append({'name': '东京塔', 'coordinates': {'lat': 35.6586, 'lng': 139.7454}})
+
+    for n_days in (None, 3, 5):
+        days = planner.split_into_days(places, n_days=n_days)
+        names = [p['name'] for d in days for p in d['places']]
+        assert sorted(names) == sorted(p['name'] for p in places)
+        assert len(days) <= 2
+    assert len(planner.split_into_days(places[:4], n_days=3)) == 1
+    print("✅ 重复坐标不产生重复的地点")
+
+
+def test_split_invalid_options():
+    """天数不是正整数、每天时间上限不是正数时报错"""
+    planner = RoutePlanner()
+    places = _tokyo_routes()[0]['places']
+    for n_days, minutes in (('2', 180), (0, 180), (-1, 180), (True, 180), (2.5, 180),
+                            (None, 0), (None, -30), (None, '180'), (None, None), (None, float('nan'))):
+        try:
+            planner.split_into_days(places, n_days=n_days, max_day_minutes=minutes)
+            assert False, f'应报错: {n_days!r}, {minutes!r}'
+        except ValueError:
+            pass
+    assert len(planner.split_into_days(places, n_days=2, max_day_minutes=90.5)) == 2
+    print("✅ 无效的拆分选项被拒绝")
+
+
+if __name__ == '__main__':
+    test_plan_multi_route()
+    test_plan_multi_route_cache()
+    test_executor_reused_and_cache_copies()
+    test_split_into_days()
+    test_split_duplicate_coordinates()
+    test_split_invalid_options()
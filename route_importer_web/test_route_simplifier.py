@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试路线几何简化与LOD层级
+"""
+
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from polyline import geometry_points, to_geometry
+from route_simplifier import build_lod_tiers, douglas_peucker, select_tier
+from database import Database
+
+
+def _wiggly_route(n=3000):
+    """模拟沿道路的密集路线点：大致向东北，带小幅抖动"""
+    rng = random.Random(3)
+    return [
+        (35.70 + i * 0.00002 + rng.uniform(-0.000005, 0.000005),
+         139.70 + i * 0.00003 + 0.0005 * math.sin(i / 100))
+        for i in range(n)
+    ]
+
+
+def test_straight_line_collapses():
+    """共线点只保留两端"""
+    points = [(35.0 + i * 0.001, 139.0 + i * 0.001) for i in range(50)]
+    assert douglas_peucker(points, 1.0) == [0, 49]
+    print("✅ 共线点简化为两端")
+
+
+def test_keep_indices_and_tolerance():
+    """必须保留的点始终保留，删除的点偏差不超过容差"""
+    points = _wiggly_route(500)
+    indices = douglas_peucker(points, 20.0, keep=[123, 321])
+    assert 123 in indices and 321 in indices
+    assert indices[0] == 0 and indices[-1] == 499
+    assert len(indices) < len(points) / 5
+    print(f"✅ 500点简化为{len(indices)}点")
+
+
+def test_tiers_get_finer_with_zoom():
+    """缩放级别越高保留的点越多，并保留途经地点"""
+    points = _wiggly_route()
+    route = to_geometry(points)
+    places = [{'name': '途经', 'coordinates': {'lat': points[1500][0], 'lng': points[1500][1]}}]
+    tiers = build_lod_tiers(route, places)
+
+    sizes = [len(geometry_points(tiers[z])) for z in sorted(tiers, key=int)]
+    assert sizes == sorted(sizes) and sizes[-1] < len(points)
+    coarse = geometry_points(tiers['10'])
+    assert any(abs(lat - points[1500][0]) < 1e-5 and abs(lng - points[1500][1]) < 1e-5 for lat, lng in coarse)
+
+    assert select_tier(route, tiers, 8) == tiers['10']
+    assert select_tier(route, tiers, 12) == tiers['13']
+    assert select_tier(route, tiers, 18) == route
+    assert select_tier(route, tiers, None) == route
+    print(f"✅ LOD层级点数: {sizes}，完整路线 {len(points)} 点")
+
+
+def test_database_stores_tiers_and_migrates():
+    """简化几何随路线保存，旧数据库自动补充列"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'routes.db')
+        with sqlite3.connect(path) as conn:
+            conn.execute('''CREATE TABLE routes (id TEXT PRIMARY KEY, name TEXT NOT NULL, description TEXT,
+                source TEXT, source_url TEXT, places TEXT, route TEXT, distance REAL, duration INTEGER,
+                tags TEXT, created_at TEXT, updated_at TEXT)''')
+        db = Database(path)
+        route = to_geometry(_wiggly_route(200))
+        tiers = build_lod_tiers(route)
+        assert db.save_route({'id': 'r1', 'name': '测试', 'route': route, 'route_lod': tiers})
+        saved = db.get_route('r1')
+        assert saved['route'] == route and saved['route_lod'] == tiers
+    print("✅ 简化几何随路线保存")
+
+
+if __name__ == '__main__':
+    test_straight_line_collapses()
+    test_keep_indices_and_tolerance()
+    test_tiers_get_finer_with_zoom()
+    test_database_stores_tiers_and_migrates()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试服务端会话存储
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from session_store import SessionStore
+
+
+def _itinerary(places=30):
+    """多天行程：超过Cookie 4KB限制的会话数据"""
+    return {'parsed_note': {'title': '东京三日游', 'routes': [
+        {'route_id': f'day{day}', 'places': [
+            {'name': f'地点{day}_{i}', 'description': '从雷门进入，沿仲见世通逛到本堂', 'address': '東京都台東区浅草2丁目3-1',
+             'coordinates': {'lat': 35.7, 'lng': 139.8}}
+            for i in range(places // 3)
+        ]} for day in range(3)
+    ]}}
+
+
+def test_save_and_load():
+    """保存、读取、覆盖和删除；会话ID随机且不重复"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(os.path.join(tmp, 'sessions.db'))
+        sid = store.new_id()
+        assert len(sid) >= 43 and sid != store.new_id()
+        assert store.load(sid) is None
+
+        data = json.dumps(_itinerary(), ensure_ascii=False)
+        assert len(data.encode('utf-8')) > 4096
+        store.save(sid, data)
+        assert json.loads(store.load(sid)) == _itinerary()
+
+        store.save(sid, '{"planned_route": {}}')
+        assert store.load(sid) == '{"planned_route": {}}'
+        store.delete(sid)
+        assert store.load(sid) is None
+    print("✅ 会话读写正确")
+
+
+def test_expiry():
+    """过期会话不可读取并被清理；读取时超过半个有效期则续期"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(os.path.join(tmp, 'sessions.db'), ttl=1, purge_interval=0)
+        store.save('old', '{}')
+        store.save('active', '{}')
+        time.sleep(0.6)
+        assert store.load('active') == '{}'
+        time.sleep(0.6)
+        assert store.load('old') is None
+        assert store.load('active') == '{}'
+        rows = [row[0] for row in store.connections.get().execute('SELECT id FROM sessions')]
+        assert rows == ['active']
+    print("✅ 会话过期和续期正确")
+
+
+if __name__ == '__main__':
+    test_save_and_load()
+    test_expiry()
@@ -7,9 +7,49 @@
 import json
 import requests
 import logging
-from typing import Dict, Optional
+import time
+from typing import Callable, Dict, List, Optional
 from datetime import datetime, timedelta
 
+class _PlaceScanner:
+    """增量扫描AI流式输出的JSON文本，找出已经完整的地点对象"""
+    
+    def __init__(self):
+        self.text = ''
+        self.pos = 0
+        self.starts = []  # 尚未闭合的 { 的位置
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, chunk: str) -> List[Dict]:
+        """追加一段输出，返回其中新闭合的地点（嵌套在外层对象中、含name字段的对象）"""
+        self.text += chunk
+        places = []
+        while self.pos < len(self.text):
+            ch = self.text[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == '{':
+                self.starts.append(self.pos)
+            elif ch == '}' and self.starts:
+                start = self.starts.pop()
+                if self.starts:
+                    try:
+                        obj = json.loads(self.text[start:self.pos + 1])
+                    except ValueError:
+                        obj = None
+                    if isinstance(obj, dict) and 'name' in obj:
+                        places.append(obj)
+            self.pos += 1
+        return places
+
 class VolcengineDoubanParser:
     """使用火山引擎豆包大模型的智能POI解析器"""
     
@@ -67,8 +107,13 @@ class VolcengineDoubanParser:
         """记录API调用"""
         self.call_history.append(datetime.now())
     
-    def parse_note(self, text: str, url: str = "") -> Optional[Dict]:
-        """使用火山引擎豆包大模型解析小红书笔记"""
+    def parse_note(self, text: str, url: str = "", progress: Optional[Callable] = None) -> Optional[Dict]:
+        """
+        使用火山引擎豆包大模型解析小红书笔记
+        
+        指定进度回调 progress(stage, data) 时使用流式响应，边接收边报告
+        ai_tokens（已接收字符数）和 place（每个已完整输出的地点），解析出完整结果后报告 parsed（地点总数）
+        """
         if not self.can_make_call():
             self.logger.warning("API调用受限")
             return None
@@ -78,6 +123,8 @@ class VolcengineDoubanParser:
         for attempt in range(max_retries):
             try:
                 self.logger.info(f"开始使用火山引擎豆包大模型解析笔记 (尝试 {attempt + 1}/{max_retries})")
+                if progress:
+                    progress('ai_request', {'attempt': attempt + 1})
                 
                 # 构建提示词
                 prompt = self._build_prompt(text)
@@ -97,6 +144,8 @@ class VolcengineDoubanParser:
                         }
                     ]
                 }
+                if progress:
+                    request_data["stream"] = True
                 
                 # 记录调用
                 self.record_call()
@@ -110,29 +159,42 @@ class VolcengineDoubanParser:
                     self.api_url,
                     headers=self.headers,
                     json=request_data,
-                    timeout=120  # 增加超时时间到120秒，给API充足的响应时间
+                    stream=bool(progress),
+                    timeout=120  # 增加超时时间到120秒，给API充足的响应时间（流式响应时为两段输出之间的最长间隔）
                 )
                 
                 print(f"响应状态码: {response.status_code}")
                 print(f"响应头: {dict(response.headers)}")
-                print(f"响应内容: {response.text[:500]}...")
+                if not progress:
+                    print(f"响应内容: {response.text[:500]}...")
                 
                 if response.status_code == 200:
                     try:
-                        result = response.json()
-                        print(f"解析后的响应: {json.dumps(result, ensure_ascii=False, indent=2)}")
-                        
-                        if 'choices' in result and len(result['choices']) > 0:
-                            ai_response = result['choices'][0]['message']['content']
-                            parsed_data = self._parse_ai_response(ai_response)
-                            if parsed_data:
-                                self.logger.info(f"火山引擎豆包AI解析成功，提取到 {len(parsed_data.get('places', []))} 个POI")
-                                return parsed_data
+                        if progress:
+                            ai_response = self._read_stream(response, progress)
+                        else:
+                            result = response.json()
+                            print(f"解析后的响应: {json.dumps(result, ensure_ascii=False, indent=2)}")
+                            
+                            if 'choices' in result and len(result['choices']) > 0:
+                                ai_response = result['choices'][0]['message']['content']
                             else:
-                                self.logger.warning("火山引擎豆包AI返回的数据格式无效")
+                                self.logger.error("火山引擎豆包API返回格式异常")
                                 return None
+                        
+                        parsed_data = self._parse_ai_response(ai_response)
+                        if parsed_data:
+                            # 多路线结构统计所有路线的地点，单路线结构统计顶层地点
+                            if parsed_data.get('routes'):
+                                places_count = sum(len(route.get('places') or []) for route in parsed_data['routes'])
+                            else:
+                                places_count = len(parsed_data.get('places') or [])
+                            self.logger.info(f"火山引擎豆包AI解析成功，提取到 {places_count} 个POI")
+                            if progress:
+                                progress('parsed', {'places': places_count})
+                            return parsed_data
                         else:
-                            self.logger.error("火山引擎豆包API返回格式异常")
+                            self.logger.warning("火山引擎豆包AI返回的数据格式无效")
                             return None
                     except json.JSONDecodeError:
                         self.logger.error("响应不是有效的JSON格式")
@@ -158,6 +220,35 @@ class VolcengineDoubanParser:
         
         return None
     
+    def _read_stream(self, response, progress: Callable, report_interval: float = 0.5) -> str:
+        """读取流式响应（每行 data: {...}），返回完整的AI输出文本"""
+        # 事件流响应通常不声明字符集，requests会按ISO-8859-1解码
+        response.encoding = 'utf-8'
+        content = []
+        scanner = _PlaceScanner()
+        received = 0
+        last_report = 0.0
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            data = line[5:].strip()
+            if data == '[DONE]':
+                break
+            choices = json.loads(data).get('choices') or []
+            delta = (choices[0].get('delta') or {}) if choices else {}
+            # 深度思考模型先输出推理过程，同样计入已接收的字符数
+            received += len(delta.get('reasoning_content') or '')
+            if delta.get('content'):
+                content.append(delta['content'])
+                received += len(delta['content'])
+                for place in scanner.feed(delta['content']):
+                    progress('place', {'place': place})
+            if time.monotonic() - last_report >= report_interval:
+                progress('ai_tokens', {'chars': received})
+                last_report = time.monotonic()
+        progress('ai_tokens', {'chars': received, 'done': True})
+        return ''.join(content)
+    
     def _build_prompt(self, text: str) -> str:
         """构建发送给豆包的提示词"""
         prompt = f"""